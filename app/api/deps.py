@@ -1,9 +1,43 @@
-from typing import Generator
+from typing import Generator, Optional
 from app.db.base import SessionLocal, get_db
-from app.llm.openai_client import LLMClient
+from app.llm.openai_client import LLMClient, AsyncLLMClient
+from app.llm.http_pool import create_http_client
+
+# Process-wide LLM clients, so every request reuses one HTTP connection pool
+_llm_client: Optional[LLMClient] = None
+_async_llm_client: Optional[AsyncLLMClient] = None
 
 def get_llm_client() -> LLMClient:
     """
     Dependency for getting the LLM client.
     """
-    return LLMClient()
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
+
+def open_async_llm_client() -> AsyncLLMClient:
+    """
+    Create the shared async LLM client and its connection pool.
+    Called on application startup.
+    """
+    global _async_llm_client
+    if _async_llm_client is None:
+        _async_llm_client = AsyncLLMClient(http_client=create_http_client())
+    return _async_llm_client
+
+async def close_async_llm_client() -> None:
+    """
+    Close the shared async LLM client's connections.
+    Called on application shutdown.
+    """
+    global _async_llm_client
+    if _async_llm_client is not None:
+        await _async_llm_client.close()
+        _async_llm_client = None
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """
+    Dependency for getting the shared async LLM client.
+    """
+    return open_async_llm_client()
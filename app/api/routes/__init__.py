@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 from app.api.routes.query import router as query_router
+from app.api.routes.metrics import router as metrics_router
 
 api_router = APIRouter()
 api_router.include_router(query_router, prefix="/query", tags=["query"])
+api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
@@ -0,0 +1,140 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+
+from app.api.deps import get_async_llm_client
+from app.core.config import settings
+from app.db.base import engine
+from app.db.index_advisor import get_index_advisor
+from app.db.query import inflight_queries
+from app.db.result_cache import get_result_cache
+from app.db.routing import all_routers
+from app.db.statement_cache import get_statement_cache
+from app.llm.cache import get_sql_cache
+from app.llm.http_pool import pool_stats
+from app.llm.prompt import prompt_stats
+from app.llm.schema import get_database_schema, get_schema_digest
+from app.llm.semantic_cache import get_semantic_cache
+from app.llm.template_cache import get_template_cache
+
+router = APIRouter()
+
+@router.get("/cache")
+def sql_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the SQL generation cache
+    """
+    cache = get_sql_cache()
+    if cache is None:
+        return {"backend": "none", "hits": 0, "misses": 0, "llm_calls_saved": 0}
+    return cache.stats()
+
+@router.get("/semantic-cache")
+def semantic_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the semantic (paraphrase) cache
+    """
+    cache = get_semantic_cache()
+    if cache is None:
+        return {"backend": "none", "hits": 0, "misses": 0, "llm_calls_saved": 0}
+    return cache.stats()
+
+@router.get("/template-cache")
+def template_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss counters of the SQL template cache and the templates it
+    didn't trust enough to use
+    """
+    cache = get_template_cache()
+    if cache is None:
+        return {"backend": "none", "hits": 0, "misses": 0, "llm_calls_saved": 0}
+    return cache.stats()
+
+@router.get("/llm-pool")
+def llm_pool_stats() -> Dict[str, Any]:
+    """
+    Connection pool metrics of the shared LLM client
+    """
+    llm_client = get_async_llm_client()
+    if llm_client.http_client is None:
+        return {}
+    return pool_stats(llm_client.http_client)
+
+@router.get("/prompt")
+def prompt_token_stats() -> Dict[str, Any]:
+    """
+    Schema tokens sent to the LLM and saved by the compact, pruned schema
+    """
+    return prompt_stats.stats()
+
+@router.get("/schema")
+def schema_snapshot_stats() -> Dict[str, Any]:
+    """
+    Digest of the schema description in use and the approximate row counts
+    of its tables
+    """
+    return {
+        "digest": get_schema_digest(),
+        "tables": {table["name"]: table.get("row_count") for table in get_database_schema()["tables"]}
+    }
+
+@router.get("/result-cache")
+def result_cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss and invalidation counters of the query result cache
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return {"entries": 0, "hits": 0, "misses": 0}
+    return cache.stats()
+
+@router.get("/statement-cache")
+def statement_cache_stats() -> Dict[str, Any]:
+    """
+    Hit rate of the compiled statement cache and the build time it saved
+    """
+    return get_statement_cache().stats()
+
+@router.get("/db-routing")
+def db_routing_stats() -> Dict[str, Any]:
+    """
+    Health and load of the read engines behind each primary engine
+    """
+    return {"routers": [engine_router.stats() for engine_router in all_routers()]}
+
+@router.get("/single-flight")
+def single_flight_stats() -> Dict[str, Any]:
+    """
+    Calls made and calls shared by coalescing identical in-flight LLM
+    requests and queries
+    """
+    return {
+        "llm": get_async_llm_client().inflight.stats(),
+        "queries": inflight_queries.stats()
+    }
+
+@router.get("/index-advisor")
+def index_advisor_report() -> Dict[str, Any]:
+    """
+    Slow generated queries, the tables they scan in full and the indexes
+    recommended for them, with the expected speedup and, for indexes
+    created by INDEX_ADVISOR_AUTO_CREATE, the measured one.
+    
+    This is the report of the latest analysis (run every
+    INDEX_ADVISOR_INTERVAL seconds, or by POST), so polling it doesn't
+    load the database.
+    """
+    advisor = get_index_advisor()
+    if advisor is None:
+        return {"enabled": False, "slow_statements": [], "recommendations": [], "created": []}
+    return {"enabled": True, "auto_create": settings.INDEX_ADVISOR_AUTO_CREATE, **advisor.last_report()}
+
+@router.post("/index-advisor")
+def analyze_index_advisor() -> Dict[str, Any]:
+    """
+    Explain the slow statements recorded so far and return the new report;
+    indexes are only recommended, never created, from here
+    """
+    advisor = get_index_advisor()
+    if advisor is None:
+        return {"enabled": False, "slow_statements": [], "recommendations": [], "created": []}
+    return {"enabled": True, "auto_create": settings.INDEX_ADVISOR_AUTO_CREATE, **advisor.analyze(engine)}
@@ -1,15 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Awaitable
 
-from app.db.base import get_db
-from app.api.deps import get_llm_client
-from app.llm.openai_client import LLMClient
-from app.db.query import QueryExecutor
-from pydantic import BaseModel
+from app.core.config import settings
+from app.db.base import get_async_db, get_async_sessionmaker
+from app.db.limits import QueryBudget, QueryBudgetExceeded
+from app.db.pagination import get_cursor_store
+from app.api.deps import get_async_llm_client
+from app.llm import validator
+from app.llm.cache import normalize_query
+from app.llm.openai_client import AsyncLLMClient
+from app.db.query import AsyncQueryExecutor, ARROW_MEDIA_TYPE, arrow_available, encode_arrow_ipc
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+# Status codes of queries stopped by their execution budget; others are 400
+BUDGET_ERROR_STATUS = {
+    "timeout": 504,
+}
+
+# Seconds between checks for a disconnected client while a query runs
+DISCONNECT_POLL_INTERVAL = 0.1
+
 class QueryRequest(BaseModel):
     query: str
 
@@ -18,28 +42,72 @@ class QueryResponse(BaseModel):
     parameters: List[Dict[str, Any]]
     explanation: str
     results: Dict[str, Any]
+    next_cursor: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1)
+
+class BatchItemResponse(BaseModel):
+    query: str
+    success: bool
+    sql_query: Optional[str] = None
+    parameters: Optional[List[Dict[str, Any]]] = None
+    explanation: Optional[str] = None
+    results: Optional[Dict[str, Any]] = None
+    error: Optional[Any] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchItemResponse]
 
 @router.post("/process", response_model=QueryResponse)
-def process_query(
+async def process_query(
     request: QueryRequest,
-    db: Session = Depends(get_db),
-    llm_client: LLMClient = Depends(get_llm_client)
-) -> Dict[str, Any]:
+    http_request: Request,
+    result_format: str = Query("rows", alias="format", pattern="^(rows|columns|arrow)$"),
+    page_size: Optional[int] = Query(None, ge=1, le=settings.PAGINATION_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    llm_client: AsyncLLMClient = Depends(get_async_llm_client)
+) -> Any:
     """
     Process a natural language query:
     1. Generate SQL using LLM
     2. Validate SQL
     3. Execute SQL
     4. Return results
+    
+    Results are a list of row objects by default. format=columns returns
+    {"columns": [...], "data": {column: [values]}} instead, and format=arrow
+    returns an Apache Arrow IPC stream whose schema metadata carries the
+    generated SQL, parameters and explanation.
+    
+    With page_size, only the first page is returned together with a
+    next_cursor for GET /query/{cursor}/next when there are more rows.
+    
+    Execution is bounded by the configured time, row and byte limits and is
+    cancelled if the client disconnects.
     """
+    if result_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=406, detail="The Arrow result format requires the pyarrow package")
+    fetch_format = "rows" if result_format == "rows" else "columns"
+    
     # Generate SQL from natural language
-    llm_response = llm_client.generate_sql(request.query)
+    llm_response = await llm_client.generate_sql(request.query)
     
     if "error" in llm_response:
         raise HTTPException(status_code=400, detail=llm_response["error"])
     
+    query_executor = AsyncQueryExecutor(db)
+    budget = QueryBudget.from_settings()
+    
     # Validate SQL
-    validation = llm_client.validate_sql(llm_response["sql_query"])
+    if settings.SPECULATIVE_EXECUTION and page_size is None:
+        validation, results = await cancel_on_disconnect(http_request, budget, validate_and_execute_speculatively(
+            llm_client, query_executor, llm_response["sql_query"], llm_response["parameters"], fetch_format, budget
+        ))
+    else:
+        validation = await llm_client.validate_sql(llm_response["sql_query"], llm_response["parameters"])
+        results = None
+    
     if not validation["is_safe"]:
         raise HTTPException(
             status_code=400, 
@@ -47,19 +115,338 @@ def process_query(
         )
     
     # Execute SQL query
-    query_executor = QueryExecutor(db)
-    results = query_executor.execute_query(
-        llm_response["sql_query"], 
-        llm_response["parameters"]
-    )
+    if page_size is not None:
+        results = await cancel_on_disconnect(http_request, budget, query_executor.execute_page(
+            llm_response["sql_query"],
+            llm_response["parameters"],
+            page_size,
+            result_format=fetch_format,
+            budget=budget
+        ))
+    elif results is None:
+        results = await cancel_on_disconnect(http_request, budget, query_executor.execute_query(
+            llm_response["sql_query"], 
+            llm_response["parameters"],
+            fetch_format,
+            budget
+        ))
     
-    if not results["success"]:
-        raise HTTPException(status_code=400, detail=results["error"])
+    raise_for_error(results)
+    
+    return build_response(llm_response, results, result_format, page_size)
+
+@router.get("/{cursor}/next", response_model=QueryResponse)
+async def next_page(
+    cursor: str,
+    http_request: Request,
+    result_format: str = Query("rows", alias="format", pattern="^(rows|columns|arrow)$"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
+    """
+    Fetch the next page of a paginated query. The SQL generated and validated
+    for the first page is reused, so no LLM calls are made.
+    """
+    if result_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=406, detail="The Arrow result format requires the pyarrow package")
+    
+    state = get_cursor_store().load(cursor)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Cursor not found or expired")
+    
+    budget = QueryBudget.from_settings()
+    results = await cancel_on_disconnect(http_request, budget, AsyncQueryExecutor(db).execute_page(
+        state["sql_query"],
+        state["parameters"],
+        state["page_size"],
+        state["page"],
+        "rows" if result_format == "rows" else "columns",
+        budget
+    ))
+    
+    raise_for_error(results)
+    
+    return build_response(state, results, result_format, state["page_size"])
+
+async def cancel_on_disconnect(request: Request, budget: QueryBudget, awaitable: Awaitable[Any]) -> Any:
+    """
+    Await a query, cancelling it through its budget if the client disconnects
+    """
+    task = asyncio.ensure_future(awaitable)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            logger.info("Client disconnected, cancelling query")
+            budget.cancel()
+            return await task
+
+async def watch_disconnect(request: Request, budget: QueryBudget) -> None:
+    """
+    Cancel a query through its budget once the client disconnects; runs
+    next to a streamed response until the stream ends
+    """
+    while not budget.cancelled:
+        if await request.is_disconnected():
+            logger.info("Client disconnected, cancelling query")
+            budget.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+def raise_for_error(results: Dict[str, Any]) -> None:
+    """
+    Raise the HTTP error for failed results; queries stopped by their budget
+    get a structured detail with the exceeded limit
+    """
+    if results["success"]:
+        return
+    if "error_type" in results:
+        raise HTTPException(
+            status_code=BUDGET_ERROR_STATUS.get(results["error_type"], 400),
+            detail={key: results[key] for key in ("error", "error_type", "limit")}
+        )
+    raise HTTPException(status_code=400, detail=results["error"])
+
+def build_response(
+    llm_response: Dict[str, Any],
+    results: Dict[str, Any],
+    result_format: str,
+    page_size: Optional[int] = None
+) -> Any:
+    """
+    Build the response for executed results, issuing a continuation cursor
+    when a paginated query has more rows
+    """
+    next_cursor = None
+    next_page_state = results.pop("next_page", None)
+    if next_page_state is not None:
+        next_cursor = get_cursor_store().save({
+            "sql_query": llm_response["sql_query"],
+            "parameters": llm_response["parameters"],
+            "explanation": llm_response["explanation"],
+            "page_size": page_size,
+            "page": next_page_state
+        })
+    
+    if result_format == "arrow" and "data" in results:
+        return Response(
+            content=encode_arrow_ipc(results["columns"], results["data"], {
+                "sql_query": llm_response["sql_query"],
+                "parameters": llm_response["parameters"],
+                "explanation": llm_response["explanation"],
+                "next_cursor": next_cursor
+            }),
+            media_type=ARROW_MEDIA_TYPE
+        )
     
     # Return results
     return {
         "sql_query": llm_response["sql_query"],
         "parameters": llm_response["parameters"],
         "explanation": llm_response["explanation"],
-        "results": results
+        "results": results,
+        "next_cursor": next_cursor
+    }
+
+@router.post("/batch", response_model=BatchQueryResponse)
+async def process_batch(
+    request: BatchQueryRequest,
+    http_request: Request,
+    session_factory: async_sessionmaker = Depends(get_async_sessionmaker),
+    llm_client: AsyncLLMClient = Depends(get_async_llm_client)
+) -> Any:
+    """
+    Process several natural language queries in one request.
+    
+    Repeated questions are answered once, SQL for the rest is generated
+    through the LLM client's batch call (cached SQL is reused, uncached
+    questions are packed into as few LLM calls as the provider allows), and
+    at most BATCH_CONCURRENCY queries are validated and executed at a time.
+    Results come back in input order; a failing query gets its own error
+    instead of failing the batch. Queries still running when the client
+    disconnects are cancelled.
+    """
+    if len(request.queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {settings.BATCH_MAX_QUERIES} queries"
+        )
+    
+    # First occurrence of each distinct question
+    questions: Dict[str, str] = {}
+    for query in request.queries:
+        questions.setdefault(normalize_query(query), query)
+    
+    llm_responses = await llm_client.generate_sql_batch(list(questions.values()))
+    semaphore = asyncio.Semaphore(max(settings.BATCH_CONCURRENCY, 1))
+    
+    async def run(llm_response: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await execute_batch_item(session_factory, llm_client, llm_response, http_request)
+    
+    outcomes = dict(zip(questions, await asyncio.gather(*(run(llm_response) for llm_response in llm_responses))))
+    return {
+        "results": [{"query": query, **outcomes[normalize_query(query)]} for query in request.queries]
     }
+
+async def execute_batch_item(
+    session_factory: async_sessionmaker,
+    llm_client: AsyncLLMClient,
+    llm_response: Dict[str, Any],
+    http_request: Request
+) -> Dict[str, Any]:
+    """
+    Validate and execute one query of a batch on its own session
+    """
+    if "error" in llm_response:
+        return {"success": False, "error": llm_response["error"]}
+    
+    generated = {key: llm_response[key] for key in ("sql_query", "parameters", "explanation")}
+    validation = await llm_client.validate_sql(llm_response["sql_query"], llm_response["parameters"])
+    if not validation["is_safe"]:
+        return {
+            **generated,
+            "success": False,
+            "error": f"Generated SQL query failed security validation: {validation['analysis']}"
+        }
+    
+    budget = QueryBudget.from_settings()
+    async with session_factory() as db:
+        results = await cancel_on_disconnect(http_request, budget, AsyncQueryExecutor(db).execute_query(
+            llm_response["sql_query"],
+            llm_response["parameters"],
+            budget=budget
+        ))
+    
+    if not results["success"]:
+        error = results["error"]
+        if "error_type" in results:
+            error = {key: results[key] for key in ("error", "error_type", "limit")}
+        return {**generated, "success": False, "error": error}
+    return {**generated, "success": True, "results": results}
+
+@router.post("/stream")
+async def stream_query(
+    request: QueryRequest,
+    http_request: Request,
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
+    session_factory: async_sessionmaker = Depends(get_async_sessionmaker),
+    llm_client: AsyncLLMClient = Depends(get_async_llm_client)
+) -> StreamingResponse:
+    """
+    Process a natural language query and stream the results as they are fetched,
+    as NDJSON lines or Server-Sent Events. The stream consists of a "meta" event
+    (generated SQL, explanation and column names), one "rows" event per batch,
+    and a final "end" event with the row count, or an "error" event.
+    
+    The stream is bounded by the configured time limit and is cancelled if
+    the client disconnects; rows are not capped, since they aren't held in
+    memory.
+    """
+    llm_response = await llm_client.generate_sql(request.query)
+    
+    if "error" in llm_response:
+        raise HTTPException(status_code=400, detail=llm_response["error"])
+    
+    validation = await llm_client.validate_sql(llm_response["sql_query"], llm_response["parameters"])
+    
+    if not validation["is_safe"]:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Generated SQL query failed security validation: {validation['analysis']}"
+        )
+    
+    return StreamingResponse(
+        stream_results(session_factory, llm_response, stream_format, http_request),
+        media_type=STREAM_MEDIA_TYPES[stream_format]
+    )
+
+def encode_event(stream_format: str, event: str, payload: Dict[str, Any]) -> str:
+    """
+    Encode one stream event as an NDJSON line or a Server-Sent Event
+    """
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+    return json.dumps({"type": event, **payload}, default=str) + "\n"
+
+async def stream_results(
+    session_factory: async_sessionmaker,
+    llm_response: Dict[str, Any],
+    stream_format: str,
+    request: Optional[Request] = None
+) -> AsyncIterator[str]:
+    """
+    Execute the generated SQL on its own session, since the response body is
+    produced after the request handler has returned, and encode each batch
+    """
+    row_count = 0
+    budget = QueryBudget.from_settings()
+    watcher = asyncio.ensure_future(watch_disconnect(request, budget)) if request is not None else None
+    async with session_factory() as db:
+        stream = AsyncQueryExecutor(db).stream_query(
+            llm_response["sql_query"],
+            llm_response["parameters"],
+            settings.STREAM_BATCH_SIZE,
+            budget
+        )
+        finished = False
+        try:
+            async for batch in stream:
+                if "columns" in batch:
+                    yield encode_event(stream_format, "meta", {
+                        "sql_query": llm_response["sql_query"],
+                        "parameters": llm_response["parameters"],
+                        "explanation": llm_response["explanation"],
+                        "columns": batch["columns"]
+                    })
+                else:
+                    row_count += len(batch["rows"])
+                    yield encode_event(stream_format, "rows", {"rows": batch["rows"]})
+            finished = True
+        except QueryBudgetExceeded as e:
+            logger.warning(f"Stream stopped: {str(e)}")
+            yield encode_event(stream_format, "error", {key: e.as_result()[key] for key in ("error", "error_type", "limit")})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming query results: {str(e)}")
+            yield encode_event(stream_format, "error", {"error": str(e)})
+            return
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if not finished:
+                # Also reached when the server stops sending because the client
+                # went away: interrupt the running statement before closing
+                budget.cancel()
+            await stream.aclose()
+    
+    yield encode_event(stream_format, "end", {"row_count": row_count})
+
+async def validate_and_execute_speculatively(
+    llm_client: AsyncLLMClient,
+    query_executor: AsyncQueryExecutor,
+    sql_query: str,
+    parameters: List[Dict[str, Any]],
+    result_format: str = "rows",
+    budget: Optional[QueryBudget] = None
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Run validation and a speculative execution of the SQL at the same time.
+    Only SQL that passes the local validator is executed speculatively, and
+    the caller must discard the results unless validation passes.
+    
+    Returns:
+        Tuple of (validation, results); results is None when the query still
+        has to be executed normally, e.g. because it hit the row cap
+    """
+    pre_validation = validator.validate_sql(sql_query, parameters)
+    if not pre_validation["is_safe"]:
+        return pre_validation, None
+    
+    validation, results = await asyncio.gather(
+        llm_client.validate_sql(sql_query, parameters),
+        query_executor.execute_speculative(sql_query, parameters, settings.SPECULATIVE_ROW_CAP, result_format, budget)
+    )
+    if results.pop("truncated", False):
+        return validation, None
+    return validation, results
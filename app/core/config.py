@@ -1,6 +1,7 @@
 import os
 import logging
 from pathlib import Path
+from typing import List
 from dotenv import load_dotenv
 
 # Set up logging
@@ -26,11 +27,117 @@ class Settings:
     USE_LOCAL_AI: bool = os.getenv("USE_LOCAL_AI", "false").lower() == "true"
     LOCAL_AI_BASE_URL: str = os.getenv("LOCAL_AI_BASE_URL", "http://localhost:8080/v1")
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+
+    # Keep-alive HTTP connection pool shared by all LLM requests
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    LLM_HTTP_MAX_KEEPALIVE: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_HTTP_TIMEOUT: float = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+
+    # SQL Generation Cache Settings
+    SQL_CACHE_BACKEND: str = os.getenv("SQL_CACHE_BACKEND", "memory")  # memory, sqlite or none
+    SQL_CACHE_TTL: int = int(os.getenv("SQL_CACHE_TTL", "3600"))
+    SQL_CACHE_MAX_ENTRIES: int = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1024"))
+    SQL_CACHE_PATH: str = os.getenv("SQL_CACHE_PATH", "./data/sql_cache.db")
+
+    # Semantic (embedding similarity) cache for paraphrased questions
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+    SEMANTIC_CACHE_DIM: int = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+
+    # SQL templates reused for questions that only differ by literals
+    TEMPLATE_CACHE_ENABLED: bool = os.getenv("TEMPLATE_CACHE_ENABLED", "false").lower() == "true"
+    TEMPLATE_CACHE_MIN_CONFIDENCE: float = float(os.getenv("TEMPLATE_CACHE_MIN_CONFIDENCE", "0.8"))
+    TEMPLATE_CACHE_MAX_ENTRIES: int = int(os.getenv("TEMPLATE_CACHE_MAX_ENTRIES", "1024"))
+
+    # Send the LLM only the schema tables and columns a question mentions
+    PROMPT_SCHEMA_PRUNING: bool = os.getenv("PROMPT_SCHEMA_PRUNING", "true").lower() == "true"
+
+    # Ask the LLM for a second opinion after the local SQL validator passes
+    SQL_VALIDATION_LLM_REVIEW: bool = os.getenv("SQL_VALIDATION_LLM_REVIEW", "false").lower() == "true"
+
+    # Execute SQL speculatively (read-only, rolled back, row-capped) while
+    # validation runs, releasing the results only if validation passes
+    SPECULATIVE_EXECUTION: bool = os.getenv("SPECULATIVE_EXECUTION", "false").lower() == "true"
+    SPECULATIVE_ROW_CAP: int = int(os.getenv("SPECULATIVE_ROW_CAP", "1000"))
+
+    # Rows fetched per round trip when streaming results
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+    # Continuation cursors of paginated query results
+    PAGINATION_CURSOR_TTL: int = int(os.getenv("PAGINATION_CURSOR_TTL", "900"))
+    PAGINATION_MAX_CURSORS: int = int(os.getenv("PAGINATION_MAX_CURSORS", "10000"))
+    PAGINATION_MAX_PAGE_SIZE: int = int(os.getenv("PAGINATION_MAX_PAGE_SIZE", "10000"))
+
+    # Cache of SELECT results, invalidated by writes to the tables they read
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_TTL: int = int(os.getenv("RESULT_CACHE_TTL", "60"))
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Execution budget of each generated query (0 disables a limit)
+    QUERY_TIMEOUT: float = float(os.getenv("QUERY_TIMEOUT", "30"))  # seconds
+    QUERY_MAX_ROWS: int = int(os.getenv("QUERY_MAX_ROWS", "100000"))
+    QUERY_MAX_BYTES: int = int(os.getenv("QUERY_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    # Batch endpoint: questions per request, questions processed at once and
+    # questions packed into one LLM call (1 disables packing)
+    BATCH_MAX_QUERIES: int = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_LLM_PACK_SIZE: int = int(os.getenv("BATCH_LLM_PACK_SIZE", "10"))
+
+    # Schema description reflected from the live database at startup, cached
+    # on disk by DDL fingerprint and re-checked every SCHEMA_REFRESH_INTERVAL
+    # seconds (0 disables the background check)
+    SCHEMA_INTROSPECTION: bool = os.getenv("SCHEMA_INTROSPECTION", "true").lower() == "true"
+    SCHEMA_SNAPSHOT_PATH: str = os.getenv("SCHEMA_SNAPSHOT_PATH", "./data/schema_snapshot.json")
+    SCHEMA_REFRESH_INTERVAL: float = float(os.getenv("SCHEMA_REFRESH_INTERVAL", "60"))
     
+    # Summary tables of orders maintained by triggers (SQLite), installed at
+    # startup and advertised to the LLM for aggregate questions
+    ROLLUPS_ENABLED: bool = os.getenv("ROLLUPS_ENABLED", "true").lower() == "true"
+
     # Database Settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
     logger.info(f"Using database URL: {DATABASE_URL}")
     
+    # Comma separated read-only engines for generated SELECTs, routed
+    # round_robin or least_busy with fallback to DATABASE_URL
+    DATABASE_READ_URLS: List[str] = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+    READ_ROUTING_STRATEGY: str = os.getenv("READ_ROUTING_STRATEGY", "round_robin")
+    READ_HEALTH_CHECK_INTERVAL: float = float(os.getenv("READ_HEALTH_CHECK_INTERVAL", "30"))
+    
+    # Connection pool and SQLite tuning ("performance" or "default" profile)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "performance")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative values are KiB
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+    
+    # Compiled statements kept by QueryExecutor, and prepared statements kept
+    # per connection by the driver (sqlite3, asyncpg; psycopg 3 prepares on
+    # the server after PG_PREPARE_THRESHOLD executions)
+    STATEMENT_CACHE_SIZE: int = int(os.getenv("STATEMENT_CACHE_SIZE", "512"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+    PG_PREPARE_THRESHOLD: int = int(os.getenv("PG_PREPARE_THRESHOLD", "5"))
+    # Parameter sets sent per driver executemany() call by QueryExecutor.execute_many
+    EXECUTEMANY_BATCH_SIZE: int = int(os.getenv("EXECUTEMANY_BATCH_SIZE", "1000"))
+    
+    # Index advisor: records generated SELECTs with their timings, explains
+    # those slower than INDEX_ADVISOR_SLOW_MS on average and recommends
+    # indexes of up to INDEX_ADVISOR_MAX_COLUMNS columns for full scans,
+    # every INDEX_ADVISOR_INTERVAL seconds (0 only analyzes on request).
+    # INDEX_ADVISOR_AUTO_CREATE also creates them
+    INDEX_ADVISOR_ENABLED: bool = os.getenv("INDEX_ADVISOR_ENABLED", "true").lower() == "true"
+    INDEX_ADVISOR_SLOW_MS: float = float(os.getenv("INDEX_ADVISOR_SLOW_MS", "50"))
+    INDEX_ADVISOR_MAX_STATEMENTS: int = int(os.getenv("INDEX_ADVISOR_MAX_STATEMENTS", "500"))
+    INDEX_ADVISOR_MAX_COLUMNS: int = int(os.getenv("INDEX_ADVISOR_MAX_COLUMNS", "4"))
+    INDEX_ADVISOR_AUTO_CREATE: bool = os.getenv("INDEX_ADVISOR_AUTO_CREATE", "false").lower() == "true"
+    INDEX_ADVISOR_INTERVAL: float = float(os.getenv("INDEX_ADVISOR_INTERVAL", "300"))
+    
     # App Settings
     APP_ENV: str = os.getenv("APP_ENV", "development")
 
@@ -1,14 +1,148 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.routing import EngineRouter, register_router
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async drivers for the sync database URLs we accept in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Translate a sync database URL to the matching async driver
+    """
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+def sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    PRAGMAs applied to every new SQLite connection for an engine profile.
+    
+    The "performance" profile switches to WAL so readers no longer block
+    behind a writer, relaxes fsyncs to once per checkpoint (safe with WAL),
+    memory-maps the file and enlarges the page cache. "default" keeps
+    SQLite's own settings.
+    """
+    profile = profile or settings.SQLITE_PROFILE
+    if profile != "performance":
+        return {}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": "MEMORY",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+    }
+
+def _is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+def statement_cache_args(drivername: str) -> Dict[str, Any]:
+    """
+    Driver arguments that keep prepared statements around between executions.
+    
+    sqlite3 (and aiosqlite, which wraps it) caches prepared statements per
+    connection; psycopg 3 prepares statements on the server once they ran
+    PG_PREPARE_THRESHOLD times. psycopg2 has no server-side prepared
+    statements. asyncpg's cache is configured in the URL, see
+    create_async_database_engine.
+    """
+    backend, _, driver = drivername.partition("+")
+    if backend == "sqlite":
+        return {"cached_statements": settings.DB_STATEMENT_CACHE_SIZE}
+    if backend == "postgresql" and driver == "psycopg":
+        return {"prepare_threshold": settings.PG_PREPARE_THRESHOLD}
+    return {}
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        options = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW, "pool_pre_ping": True}
+        connect_args = statement_cache_args(url.drivername)
+        if connect_args:
+            options["connect_args"] = connect_args
+        return options
+    options: Dict[str, Any] = {"connect_args": {"check_same_thread": False, **statement_cache_args(url.drivername)}}
+    # In-memory databases live in a single connection and keep SQLAlchemy's pool
+    if url.database and url.database != ":memory:":
+        options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+    return options
+
+def apply_sqlite_pragmas(engine: Engine, profile: Optional[str] = None) -> None:
+    """
+    Run the profile's PRAGMAs on each connection the engine opens
+    """
+    pragmas = sqlite_pragmas(profile)
+    if make_url(str(engine.url)).query.get("mode") == "ro":
+        # Read-only connections can't change the journal mode or sync policy
+        pragmas = {name: value for name, value in pragmas.items() if name not in ("journal_mode", "synchronous")}
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+def create_database_engine(database_url: str, profile: Optional[str] = None) -> Engine:
+    """
+    Create the sync engine with the configured pool and SQLite profile
+    """
+    engine = create_engine(database_url, **_engine_options(database_url))
+    if _is_sqlite(database_url):
+        apply_sqlite_pragmas(engine, profile)
+    return engine
+
+def create_async_database_engine(database_url: str, profile: Optional[str] = None) -> AsyncEngine:
+    """
+    Create the async engine for a sync database URL, see create_database_engine
+    """
+    async_url = make_url(get_async_database_url(database_url))
+    if async_url.drivername == "postgresql+asyncpg" and "prepared_statement_cache_size" not in async_url.query:
+        async_url = async_url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    engine = create_async_engine(async_url, **_engine_options(database_url))
+    if _is_sqlite(database_url):
+        apply_sqlite_pragmas(engine.sync_engine, profile)
+    return engine
+
+engine = create_database_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_database_engine(settings.DATABASE_URL)
+
+# Read engines (replicas, or read-only SQLite URIs such as
+# sqlite:///file:./data/app.db?mode=ro&uri=true) that QueryExecutor routes
+# validated SELECTs to
+read_engines = [create_database_engine(url) for url in settings.DATABASE_READ_URLS]
+async_read_engines = [create_async_database_engine(url) for url in settings.DATABASE_READ_URLS]
+if read_engines:
+    register_router(EngineRouter(
+        engine, read_engines, settings.READ_ROUTING_STRATEGY, settings.READ_HEALTH_CHECK_INTERVAL
+    ))
+    # Async sessions run QueryExecutor on the sync facade of the async engines
+    register_router(EngineRouter(
+        async_engine.sync_engine,
+        [read_engine.sync_engine for read_engine in async_read_engines],
+        settings.READ_ROUTING_STRATEGY,
+        settings.READ_HEALTH_CHECK_INTERVAL
+    ))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency to get DB session
@@ -18,3 +152,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for responses that outlive the request handler (streaming),
+# which must open and close their own session
+def get_async_sessionmaker() -> async_sessionmaker:
+    return AsyncSessionLocal
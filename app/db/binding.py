@@ -0,0 +1,224 @@
+import datetime
+import logging
+import math
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, DateTime, String, bindparam, text
+from sqlalchemy.sql.elements import TextClause
+
+logger = logging.getLogger(__name__)
+
+# Same rule text() uses to find bind parameters, so what is validated here is
+# exactly what SQLAlchemy binds
+_PLACEHOLDER_RE = re.compile(r"(?<![:\w\x5c]):(\w+)(?!:)")
+_INTEGER_RE = re.compile(r"[+-]?\d+")
+
+
+class BindingError(ValueError):
+    """
+    Raised when parameters don't fit the SQL they are bound to
+    """
+
+
+def coerce_number(value: Any) -> Any:
+    """
+    Convert to int when the value is integral text, float otherwise
+    """
+    if isinstance(value, bool):
+        raise BindingError(f"Expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return value
+    text_value = str(value).strip()
+    if _INTEGER_RE.fullmatch(text_value):
+        return int(text_value)
+    try:
+        number = float(text_value)
+    except ValueError:
+        raise BindingError(f"Expected a number, got {value!r}") from None
+    if not math.isfinite(number):
+        raise BindingError(f"Expected a finite number, got {value!r}")
+    return number
+
+
+def coerce_date(value: Any) -> Any:
+    """
+    Convert ISO 8601 text to datetime.date, or datetime.datetime when it has a time
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    text_value = str(value).strip().strip("'\"")
+    try:
+        if len(text_value) == 10:
+            return datetime.date.fromisoformat(text_value)
+        return datetime.datetime.fromisoformat(text_value)
+    except ValueError:
+        raise BindingError(f"Expected an ISO date, got {value!r}") from None
+
+
+def coerce_string(value: Any) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+# How the value of each LLM parameter type is converted before binding
+COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "string": coerce_string,
+    "number": coerce_number,
+    "date": coerce_date,
+}
+
+# SQL types of the bind parameters; numbers keep their Python int or float
+BIND_TYPES = {
+    "string": String,
+    "date": Date,
+    "datetime": DateTime,
+}
+
+
+def placeholders(sql: str) -> List[str]:
+    """
+    Names of the :name placeholders in a SQL statement, in order of first use
+    """
+    return list(dict.fromkeys(_PLACEHOLDER_RE.findall(sql)))
+
+
+def _shape(parameter: Dict[str, Any]) -> Tuple[str, str, bool]:
+    # (name, bind type, whether the value is a list for an IN clause)
+    param_type = parameter.get("type", "string")
+    if param_type not in COERCERS:
+        raise BindingError(f"Unknown type {param_type!r} for parameter {parameter.get('name')}")
+    value = parameter.get("value")
+    expanding = isinstance(value, (list, tuple))
+    if param_type == "date":
+        sample = value[0] if expanding and value else value
+        if isinstance(sample, datetime.datetime) or (isinstance(sample, str) and len(sample.strip().strip("'\"")) > 10):
+            # Date and DateTime make the dialect store the value the way the column does
+            param_type = "datetime"
+    return parameter["name"], param_type, expanding
+
+
+def signature(parameters: Optional[Sequence[Dict[str, Any]]]) -> Tuple[Tuple[str, str, bool], ...]:
+    """
+    Names, bind types and list-ness of parameters, which decide the binding plan
+    """
+    return tuple(_shape(parameter) for parameter in parameters or ())
+
+
+class BindingPlan:
+    """
+    A statement compiled for one parameter signature: the TextClause with
+    typed (and, for lists, expanding) bind parameters and the coercer of
+    each parameter.
+    """
+
+    __slots__ = ("sql", "clause", "names", "coercers", "expanding")
+
+    def __init__(
+        self,
+        sql: str,
+        clause: TextClause,
+        names: Tuple[str, ...],
+        coercers: Tuple[Callable[[Any], Any], ...],
+        expanding: Tuple[bool, ...]
+    ):
+        self.sql = sql
+        self.clause = clause
+        self.names = names
+        self.coercers = coercers
+        self.expanding = expanding
+
+    def bind(self, parameters: Optional[Sequence[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Coerce parameter values for this plan
+
+        Raises:
+            BindingError: If the parameters don't match the plan or a value
+                can't be converted to its type
+        """
+        parameters = parameters or ()
+        if len(parameters) != len(self.names):
+            raise BindingError(f"Expected {len(self.names)} parameters, got {len(parameters)}")
+        bound = {}
+        for name, coerce, expanding, parameter in zip(self.names, self.coercers, self.expanding, parameters):
+            value = parameter.get("value")
+            if parameter.get("name") != name or isinstance(value, (list, tuple)) != expanding:
+                raise BindingError(f"Parameter {parameter.get('name')} doesn't match the statement's parameters")
+            try:
+                bound[name] = [coerce(item) for item in value] if expanding else coerce(value)
+            except BindingError as e:
+                raise BindingError(f"Parameter {name}: {str(e)}") from None
+        return bound
+
+    def bind_many(self, parameter_sets: Iterable[Sequence[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Coerce several parameter sets for this plan, failing on the first bad one
+        """
+        bound = []
+        for index, parameters in enumerate(parameter_sets):
+            try:
+                bound.append(self.bind(parameters))
+            except BindingError as e:
+                raise BindingError(f"Parameter set {index}: {str(e)}") from None
+        return bound
+
+
+def plan_binding(
+    sql: str,
+    parameters: Optional[Sequence[Dict[str, Any]]] = None,
+    reserved: Iterable[str] = ()
+) -> BindingPlan:
+    """
+    Compile a statement for a parameter signature and check it against the
+    statement's placeholders
+
+    Args:
+        sql: SQL with :name placeholders
+        parameters: Parameters (name, value, type); values are only used to
+            tell lists and dates from datetimes
+        reserved: Placeholders bound by the caller itself (e.g. pagination limits)
+
+    Returns:
+        The binding plan
+
+    Raises:
+        BindingError: If a placeholder has no parameter, a parameter has no
+            placeholder, a name repeats, or a list isn't used in an IN clause
+    """
+    parameters = parameters or ()
+    shapes = signature(parameters)
+    names = [name for name, _, _ in shapes]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise BindingError(f"Duplicate parameters: {', '.join(duplicates)}")
+
+    present = set(placeholders(sql))
+    missing = sorted(present - set(names) - set(reserved))
+    if missing:
+        raise BindingError(f"Missing value for parameter :{missing[0]}")
+    unused = sorted(set(names) - present)
+    if unused:
+        raise BindingError(f"Parameter {unused[0]} is not used in the query")
+
+    binds = []
+    for name, bind_kind, expanding in shapes:
+        if expanding:
+            in_clause = re.compile(rf"\bIN\s*\(\s*:{name}\s*\)", re.IGNORECASE)
+            if in_clause.search(sql):
+                # An expanding parameter renders its own parentheses
+                sql = in_clause.sub(f"IN :{name}", sql)
+            elif not re.search(rf"\bIN\s+:{name}\b", sql, re.IGNORECASE):
+                raise BindingError(f"List value for :{name} can only be used in an IN clause")
+        bind_type = BIND_TYPES.get(bind_kind)
+        if expanding or bind_type is not None:
+            binds.append(bindparam(name, expanding=expanding, type_=bind_type() if bind_type else None))
+
+    clause = text(sql)
+    if binds:
+        clause = clause.bindparams(*binds)
+    return BindingPlan(
+        sql,
+        clause,
+        tuple(names),
+        tuple(COERCERS["date" if bind_kind == "datetime" else bind_kind] for _, bind_kind, _ in shapes),
+        tuple(expanding for _, _, expanding in shapes)
+    )
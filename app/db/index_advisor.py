@@ -0,0 +1,552 @@
+import asyncio
+import json
+import logging
+import math
+import re
+import statistics
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.db.binding import plan_binding
+from app.db.introspection import approximate_row_counts
+from app.llm.validator import KEYWORDS, SQLValidationError, Token, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Comparisons that an index can serve by seeking to one key or to a range
+EQUALITY_OPERATORS = frozenset({"=", "==", "in", "is"})
+RANGE_OPERATORS = frozenset({"<", ">", "<=", ">=", "between", "like"})
+
+# Keywords that start the clauses we tell columns apart by
+_CLAUSES = {"select": "select", "from": "from", "join": "from", "where": "filter", "on": "filter",
+            "having": "having", "limit": "limit", "offset": "limit"}
+
+# "SCAN orders", "SCAN o", "SCAN TABLE orders AS o" (SQLite before 3.36), optionally "USING ... INDEX ..."
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$")
+
+
+def _name(token: Token) -> Optional[str]:
+    if token.kind == "ident":
+        return token.value.lower()
+    if token.kind == "quoted":
+        return token.value[1:-1].lower()
+    return None
+
+
+class ColumnUsage:
+    """
+    How one query uses the columns of one table
+    """
+
+    def __init__(self):
+        self.equality: List[str] = []
+        self.range: List[str] = []
+        self.join: List[str] = []
+        self.group: List[str] = []
+        self.order: List[str] = []
+        self.referenced: Set[str] = set()
+        self.select_star = False
+
+    @staticmethod
+    def _add(columns: List[str], column: str) -> None:
+        if column not in columns:
+            columns.append(column)
+
+
+def table_aliases(tokens: List[Token], tables: Set[str]) -> Dict[str, str]:
+    """
+    Map the names tables are referred to by (their own and their aliases) to the tables
+
+    Args:
+        tokens: Tokens of the statement
+        tables: Known table names, lowercase
+    """
+    aliases = {}
+    for index, token in enumerate(tokens):
+        if token.kind != "ident" or token.value.lower() not in ("from", "join"):
+            continue
+        name = _name(tokens[index + 1]) if index + 1 < len(tokens) else None
+        if name not in tables:
+            continue
+        aliases[name] = name
+        position = index + 2
+        if position < len(tokens) and tokens[position].value.lower() == "as":
+            position += 1
+        alias = _name(tokens[position]) if position < len(tokens) else None
+        if alias is not None and alias not in KEYWORDS:
+            aliases[alias] = name
+    return aliases
+
+
+def column_usage(sql: str, columns: Dict[str, Set[str]]) -> Dict[str, ColumnUsage]:
+    """
+    Find the columns a query filters, joins, groups and orders on, per table
+
+    Args:
+        sql: SQL query
+        columns: Column names of every known table, lowercase
+
+    Returns:
+        ColumnUsage of each table the query reads
+    """
+    try:
+        tokens = tokenize(sql)
+    except SQLValidationError:
+        return {}
+    aliases = table_aliases(tokens, set(columns))
+    usage = {table: ColumnUsage() for table in set(aliases.values())}
+
+    def reference(index: int) -> Optional[Tuple[str, str, int]]:
+        # (table, column, index after the reference) of a column at index
+        name = _name(tokens[index])
+        if name is None or name in KEYWORDS or (index + 1 < len(tokens) and tokens[index + 1].value == "("):
+            return None
+        if index > 0 and tokens[index - 1].value == ".":
+            return None
+        if index + 2 < len(tokens) and tokens[index + 1].value == ".":
+            column = _name(tokens[index + 2])
+            table = aliases.get(name)
+            if table is None or column not in columns[table]:
+                return None
+            return table, column, index + 3
+        owners = [table for table in usage if name in columns[table]]
+        return (owners[0], name, index + 1) if len(owners) == 1 else None
+
+    clause = None
+    index = 0
+    while index < len(tokens):
+        word = tokens[index].value.lower()
+        if tokens[index].kind == "ident" and word in ("group", "order") and \
+                index + 1 < len(tokens) and tokens[index + 1].value.lower() == "by":
+            clause = word
+            index += 2
+            continue
+        if tokens[index].kind == "ident" and word in _CLAUSES:
+            clause = _CLAUSES[word]
+            index += 1
+            continue
+        if clause == "select" and tokens[index].value == "*" and tokens[index - 1].value.lower() in ("select", ",", "."):
+            for table in usage:
+                usage[table].select_star = True
+        found = reference(index)
+        if found is None:
+            index += 1
+            continue
+        table, column, after = found
+        entry = usage[table]
+        entry.referenced.add(column)
+        if clause == "group":
+            ColumnUsage._add(entry.group, column)
+        elif clause == "order":
+            ColumnUsage._add(entry.order, column)
+        elif clause == "filter" and after < len(tokens):
+            operator = tokens[after].value.lower()
+            if operator == "not" and after + 1 < len(tokens):
+                operator = tokens[after + 1].value.lower()
+            other = reference(after + 1) if after + 1 < len(tokens) else None
+            if operator in ("=", "==") and other is not None and other[0] != table:
+                ColumnUsage._add(entry.join, column)
+                ColumnUsage._add(usage[other[0]].join, other[1])
+                usage[other[0]].referenced.add(other[1])
+                index = other[2]
+                continue
+            if operator in EQUALITY_OPERATORS:
+                ColumnUsage._add(entry.equality, column)
+            elif operator in RANGE_OPERATORS:
+                ColumnUsage._add(entry.range, column)
+        index = after
+    return usage
+
+
+def full_scans(connection: Connection, params: Dict[str, Any], clause_for: Callable[[str], Any]) -> List[str]:
+    """
+    Names (tables or aliases) the database plans to read in full for a query
+
+    Args:
+        connection: Connection to explain the query on
+        params: Bound parameters of the query
+        clause_for: Statement of the query with a prefix such as "EXPLAIN "
+
+    Returns:
+        The scanned names; empty for databases whose plans we don't read
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        scans = []
+        for row in connection.execute(clause_for("EXPLAIN QUERY PLAN "), params):
+            match = _SQLITE_SCAN_RE.match(row[-1])
+            # Scans of a (covering) index already read less than the table
+            if match is not None and "INDEX" not in match.group(3) and not match.group(1).startswith("("):
+                scans.append((match.group(2) or match.group(1)).lower())
+        return scans
+    if dialect == "postgresql":
+        plan = connection.execute(clause_for("EXPLAIN (FORMAT JSON) "), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Node Type") == "Seq Scan":
+                scans.append(node.get("Alias", node.get("Relation Name", "")).lower())
+            nodes.extend(node.get("Plans", []))
+        return scans
+    return []
+
+
+def recommend_columns(
+    usage: ColumnUsage,
+    table_columns: int,
+    max_columns: int,
+    primary_key: Sequence[str] = ()
+) -> Tuple[List[str], str]:
+    """
+    Index columns for a table read in full: equality filters first, then
+    join columns and one range filter; without filters the GROUP BY or
+    ORDER BY columns. Other columns the query reads are appended to make
+    the index covering while it stays within max_columns (the primary key
+    is in every index already).
+
+    Returns:
+        Tuple of (columns, kind of access the index serves); no columns
+        when the query gives the index nothing to seek or sort by
+    """
+    key = usage.equality + [column for column in usage.join if column not in usage.equality]
+    kind = "join" if usage.join and not usage.equality else "filter"
+    ranges = [column for column in usage.range if column not in key]
+    if ranges:
+        key.append(ranges[0])
+    if not key and usage.group:
+        key, kind = list(usage.group), "group"
+    elif not key and usage.order:
+        key, kind = list(usage.order), "order"
+    if not key:
+        return [], ""
+    key = key[:max_columns]
+    extra = sorted(usage.referenced - set(key) - set(primary_key))
+    if not usage.select_star and extra and len(key) + len(extra) <= max_columns and len(key) + len(extra) < table_columns:
+        key += extra
+    return key, kind
+
+
+def expected_speedup(
+    kind: str,
+    table_rows: int,
+    rows: float,
+    table_columns: int,
+    index_columns: int,
+    mean_ms: float,
+    floor_ms: float
+) -> float:
+    """
+    Rough speedup of reading through the index instead of the whole table:
+    a seek reads about the returned rows plus a tree descent, a GROUP BY
+    reads the narrower index in full. No query gets faster than the fastest
+    one recorded (floor_ms), which bounds the estimate by the per-query
+    overhead.
+    """
+    if kind == "group":
+        speedup = table_columns / max(index_columns, 1)
+    else:
+        speedup = table_rows / (rows + math.log2(table_rows + 1))
+    if floor_ms > 0:
+        speedup = min(speedup, mean_ms / floor_ms)
+    return max(speedup, 1.0)
+
+
+def index_name(table: str, columns: List[str]) -> str:
+    return f"ix_advisor_{table}_{'_'.join(columns)}"[:63]
+
+
+class IndexAdvisor:
+    """
+    Records the SELECTs QueryExecutor runs with their timings, explains the
+    ones that are slow on average and recommends indexes for tables they
+    read in full. With `create=True`, analyze() also creates the
+    recommended indexes and times the statements again.
+    """
+
+    def __init__(self, slow_ms: float, max_statements: int, max_columns: int = 4, verify_runs: int = 3,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.max_columns = max_columns
+        self.verify_runs = verify_runs
+        self.clock = clock
+        self._statements: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        self._created: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_report: Optional[Dict[str, Any]] = None
+        self.analyses = 0
+
+    def record(
+        self,
+        sql: str,
+        parameters: Optional[List[Dict[str, Any]]],
+        elapsed: float,
+        rows: int,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Record one execution of a SELECT
+
+        Args:
+            sql: SQL query as generated, with placeholders
+            parameters: Its parameters (name, value, type)
+            elapsed: Execution time in seconds
+            rows: Rows returned
+            extra: Values bound by the executor itself, e.g. page limits
+        """
+        if self.max_statements <= 0:
+            return
+        key = (sql, tuple(sorted(extra or ())))
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    # Forget the statement that cost the least in total
+                    del self._statements[min(self._statements, key=lambda k: self._statements[k]["seconds"])]
+                entry = self._statements[key] = {"sql": sql, "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0}
+            entry["calls"] += 1
+            entry["seconds"] += elapsed
+            entry["rows"] += rows
+            if elapsed >= entry["max_seconds"]:
+                # The slowest call's values are the ones worth explaining
+                entry["max_seconds"] = elapsed
+                entry["parameters"] = parameters
+                entry["extra"] = dict(extra or {})
+
+    def _slow_statements(self) -> Tuple[List[Dict[str, Any]], float]:
+        # Slow statements, most total time first, and the fastest mean time in ms
+        with self._lock:
+            entries = [dict(entry) for entry in self._statements.values() if entry["calls"]]
+        means = [entry["seconds"] / entry["calls"] * 1000 for entry in entries]
+        slow = [entry for entry, mean_ms in zip(entries, means) if mean_ms >= self.slow_ms]
+        return sorted(slow, key=lambda entry: entry["seconds"], reverse=True), min(means, default=0.0)
+
+    @staticmethod
+    def _statement(entry: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Callable[[str], Any]]:
+        # SQL as executed, its bound parameters and its statement behind a prefix
+        plan = plan_binding(entry["sql"], entry["parameters"], reserved=entry["extra"])
+        params = {**plan.bind(entry["parameters"]), **entry["extra"]}
+
+        def clause_for(prefix: str):
+            if not prefix:
+                return plan.clause
+            return plan_binding(prefix + entry["sql"], entry["parameters"], reserved=entry["extra"]).clause
+        return plan.sql, params, clause_for
+
+    def _time(self, connection: Connection, clause_for: Callable[[str], Any], params: Dict[str, Any]) -> float:
+        samples = []
+        for _ in range(max(self.verify_runs, 1)):
+            started = self.clock()
+            connection.execute(clause_for(""), params).fetchall()
+            samples.append(self.clock() - started)
+        return statistics.median(samples)
+
+    def analyze(self, engine: Engine, create: bool = False) -> Dict[str, Any]:
+        """
+        Explain the slow statements and recommend indexes
+
+        Args:
+            engine: Primary engine of the database
+            create: Create the recommended indexes and measure the statements again
+
+        Returns:
+            Report with the slow statements, their full scans and the
+            recommended (or created) indexes with expected and measured speedups
+        """
+        self.analyses += 1
+        inspector = inspect(engine)
+        columns = {
+            table.lower(): {column["name"].lower() for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()
+        }
+        primary_keys = {
+            table: [name.lower() for name in inspector.get_pk_constraint(table).get("constrained_columns") or []]
+            for table in columns
+        }
+        indexes = {
+            table: [[name.lower() for name in index["column_names"] if name] for index in inspector.get_indexes(table)]
+            + [primary_keys[table]]
+            for table in columns
+        }
+
+        statements = []
+        recommendations: Dict[str, Dict[str, Any]] = {}
+        with engine.connect() as connection:
+            row_counts = approximate_row_counts(connection, list(columns))
+            slow, floor_ms = self._slow_statements()
+            for entry in slow:
+                mean_ms = entry["seconds"] / entry["calls"] * 1000
+                report = {"sql": entry["sql"], "calls": entry["calls"], "mean_ms": mean_ms,
+                          "max_ms": entry["max_seconds"] * 1000, "full_scans": []}
+                statements.append(report)
+                try:
+                    sql, params, clause_for = self._statement(entry)
+                    scans = full_scans(connection, params, clause_for)
+                except Exception as e:
+                    report["error"] = str(e)
+                    continue
+                finally:
+                    connection.rollback()
+
+                try:
+                    aliases = table_aliases(tokenize(sql), set(columns))
+                except SQLValidationError:
+                    aliases = {}
+                usage = column_usage(sql, columns)
+                for scanned in scans:
+                    table = aliases.get(scanned, scanned if scanned in columns else None)
+                    if table is None:
+                        continue
+                    report["full_scans"].append(table)
+                    if table not in usage:
+                        continue
+                    index_columns, kind = recommend_columns(
+                        usage[table], len(columns[table]), self.max_columns, primary_keys[table]
+                    )
+                    if not index_columns or any(existing[:len(index_columns)] == index_columns for existing in indexes[table]):
+                        continue
+                    name = index_name(table, index_columns)
+                    recommendation = recommendations.setdefault(name, {
+                        "name": name,
+                        "table": table,
+                        "columns": index_columns,
+                        "kind": kind,
+                        "ddl": f"CREATE INDEX {name} ON {table} ({', '.join(index_columns)})",
+                        "statements": [],
+                        "calls": 0,
+                        "mean_ms": 0.0,
+                        "expected_speedup": 0.0,
+                        "created": False,
+                    })
+                    expected = expected_speedup(kind, row_counts.get(table, 0), entry["rows"] / entry["calls"],
+                                                len(columns[table]), len(index_columns), mean_ms, floor_ms)
+                    recommendation["statements"].append(entry["sql"])
+                    recommendation["mean_ms"] = max(recommendation["mean_ms"], mean_ms)
+                    recommendation["calls"] += entry["calls"]
+                    recommendation["expected_speedup"] = round(max(recommendation["expected_speedup"], expected), 1)
+                    recommendation.setdefault("_samples", []).append((clause_for, params, mean_ms, entry))
+
+        if create:
+            for recommendation in recommendations.values():
+                self._create(engine, recommendation)
+                indexes[recommendation["table"]].append(recommendation["columns"])
+
+        with self._lock:
+            created = [dict(record) for record in self._created.values()]
+        report = {
+            "slow_ms": self.slow_ms,
+            "statements_recorded": len(self._statements),
+            "analyzed_at": time.time(),
+            "slow_statements": statements,
+            "recommendations": [
+                {key: value for key, value in recommendation.items() if not key.startswith("_")}
+                for recommendation in recommendations.values() if not recommendation["created"]
+            ],
+            "created": created,
+        }
+        with self._lock:
+            self._last_report = report
+        return report
+
+    def last_report(self) -> Dict[str, Any]:
+        """
+        Report of the latest analyze() call, without touching the database;
+        before the first analysis only the created indexes are listed
+        """
+        with self._lock:
+            report = self._last_report
+            created = [dict(record) for record in self._created.values()]
+            recorded = len(self._statements)
+        if report is None:
+            report = {"analyzed_at": None, "slow_statements": [], "recommendations": []}
+        return {**report, "slow_ms": self.slow_ms, "statements_recorded": recorded, "created": created}
+
+    def _create(self, engine: Engine, recommendation: Dict[str, Any]) -> None:
+        logger.info(f"Creating index: {recommendation['ddl']}")
+        with engine.begin() as connection:
+            connection.exec_driver_sql(recommendation["ddl"])
+            connection.exec_driver_sql(f"ANALYZE {recommendation['table']}")
+        recommendation["created"] = True
+
+        measured = []
+        with engine.connect() as connection:
+            for clause_for, params, before_ms, entry in recommendation["_samples"]:
+                try:
+                    after_ms = self._time(connection, clause_for, params) * 1000
+                except Exception as e:
+                    logger.warning(f"Could not time a statement after creating {recommendation['name']}: {str(e)}")
+                    continue
+                measured.append((before_ms, after_ms))
+                # Later timings of the statement are with the index
+                with self._lock:
+                    self._statements.pop((entry["sql"], tuple(sorted(entry["extra"]))), None)
+        record = {key: value for key, value in recommendation.items() if not key.startswith("_")}
+        if measured:
+            before = sum(before_ms for before_ms, _ in measured)
+            after = sum(after_ms for _, after_ms in measured)
+            record.update(measured_ms=after / len(measured), measured_speedup=round(before / after, 1) if after else None)
+        with self._lock:
+            self._created[recommendation["name"]] = record
+
+    async def start(self, engine: Engine, interval: float, create: bool = False) -> None:
+        """
+        Analyze every `interval` seconds in the background, creating the
+        recommended indexes when `create` is set
+        """
+        if interval > 0:
+            self._task = asyncio.create_task(self._watch(engine, interval, create))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, engine: Engine, interval: float, create: bool) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.analyze, engine, create)
+            except Exception as e:
+                logger.warning(f"Index analysis failed: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._created.clear()
+            self._last_report = None
+            self.analyses = 0
+
+
+_index_advisor: Optional[IndexAdvisor] = None
+_index_advisor_lock = threading.Lock()
+
+
+def get_index_advisor() -> Optional[IndexAdvisor]:
+    """
+    Get the process-wide index advisor, or None when it is disabled
+    """
+    global _index_advisor
+    if not settings.INDEX_ADVISOR_ENABLED:
+        return None
+    if _index_advisor is None:
+        with _index_advisor_lock:
+            if _index_advisor is None:
+                _index_advisor = IndexAdvisor(
+                    settings.INDEX_ADVISOR_SLOW_MS,
+                    settings.INDEX_ADVISOR_MAX_STATEMENTS,
+                    settings.INDEX_ADVISOR_MAX_COLUMNS
+                )
+    return _index_advisor
@@ -1,8 +1,10 @@
+import argparse
 import datetime
 import logging
 import os
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -12,8 +14,11 @@ logger = logging.getLogger(__name__)
 
 # Import the models and base only when necessary
 # This helps avoid issues when running the script in different environments
-from app.db.base import Base
+from app.core.config import settings
+from app.db.base import Base, create_database_engine
 from app.db.models import Customer, Order
+from app.db.rollups import install_rollups_on
+from app.db.synthetic import bulk_load
 
 def get_engine():
     """Get database engine with environment-aware configuration"""
@@ -21,11 +26,8 @@ def get_engine():
     database_url = os.environ.get("DATABASE_URL", "sqlite:///./app.db")
     logger.info(f"Using database: {database_url}")
     
-    # Create engine with appropriate connect_args for SQLite
-    if database_url.startswith('sqlite'):
-        return create_engine(database_url, connect_args={"check_same_thread": False})
-    else:
-        return create_engine(database_url)
+    # Same pool and SQLite profile as the application's engine
+    return create_database_engine(database_url)
 
 def init_db(db: Session, engine) -> None:
     """Initialize database with tables and sample data"""
@@ -141,13 +143,52 @@ def init_db(db: Session, engine) -> None:
         raise
 
 
-def main() -> None:
-    """Initialize the database with sample data."""
+def parse_count(value: str) -> int:
+    """Parse a row count such as 5000, 10k or 1.5m"""
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    try:
+        count = int(float(value.rstrip("km")) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid row count: {value}")
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"Invalid row count: {value}")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Initialize the database with sample data, or with generated data when
+    --orders is given:
+
+        python -m app.db.init_db --customers 1m --orders 10m
+    """
+    parser = argparse.ArgumentParser(description="Create the tables and load sample or generated data")
+    parser.add_argument("--orders", type=parse_count, help="generate this many orders instead of the sample data")
+    parser.add_argument("--customers", type=parse_count,
+                        help="customers to generate (default: a tenth of --orders)")
+    parser.add_argument("--days", type=int, default=730, help="days of order history")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated data")
+    parser.add_argument("--batch-size", type=parse_count, default=100_000, help="rows per executemany call")
+    parser.add_argument("--replace", action="store_true", help="delete existing customers and orders first")
+    args = parser.parse_args(argv)
+
     logger.info("Creating initial data")
     
     try:
         # Get engine
         engine = get_engine()
+
+        if args.orders is not None:
+            customers = args.customers if args.customers is not None else max(args.orders // 10, 1)
+            try:
+                bulk_load(engine, customers, args.orders, seed=args.seed, days=args.days,
+                          batch_size=args.batch_size, replace=args.replace)
+                if settings.ROLLUPS_ENABLED:
+                    install_rollups_on(engine)
+            finally:
+                engine.dispose()
+            return
         
         # Create session
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -155,6 +196,8 @@ def main() -> None:
         
         try:
             init_db(db, engine)
+            if settings.ROLLUPS_ENABLED:
+                install_rollups_on(engine)
             logger.info("Initial data created successfully")
         finally:
             db.close()
@@ -0,0 +1,326 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.llm.schema import SCHEMA_ANNOTATIONS, schema_digest, set_database_schema
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the snapshot file layout changes, so old files are ignored
+SNAPSHOT_FORMAT = 1
+
+
+def ddl_fingerprint(engine: Engine) -> str:
+    """
+    Cheap hash of the database's DDL, used to tell whether a snapshot is stale
+    without reflecting every table
+
+    Args:
+        engine: Engine of the database
+
+    Returns:
+        Hex digest that changes whenever tables, columns or indexes change
+    """
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.execute(text(
+                "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name"
+            )).all()
+        elif engine.dialect.name == "postgresql":
+            rows = connection.execute(text(
+                "SELECT table_name, column_name, data_type, is_nullable FROM information_schema.columns "
+                "WHERE table_schema = current_schema() ORDER BY table_name, ordinal_position"
+            )).all()
+            rows += connection.execute(text(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() ORDER BY indexname"
+            )).all()
+        else:
+            inspector = inspect(connection)
+            rows = [
+                (table, [(column["name"], str(column["type"])) for column in inspector.get_columns(table)],
+                 [index["name"] for index in inspector.get_indexes(table)])
+                for table in sorted(inspector.get_table_names())
+            ]
+    payload = json.dumps([list(row) for row in rows], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def approximate_row_counts(connection, tables: List[str]) -> Dict[str, int]:
+    """
+    Row count estimates that don't scan the tables where the database keeps
+    statistics (Postgres reltuples, SQLite sqlite_stat1 or the largest rowid)
+    """
+    counts: Dict[str, int] = {}
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        rows = connection.execute(text(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' "
+            "AND relnamespace = current_schema()::regnamespace"
+        )).all()
+        counts.update({name: max(int(estimate), 0) for name, estimate in rows if name in tables})
+    elif dialect == "sqlite":
+        # sqlite_stat1 only exists after ANALYZE; the first number of a
+        # table's stat rows is its row count
+        if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first():
+            for name, stat in connection.execute(text("SELECT tbl, stat FROM sqlite_stat1")).all():
+                if name in tables:
+                    counts.setdefault(name, int(stat.split()[0]))
+
+    for table in tables:
+        if table in counts:
+            continue
+        quoted = connection.dialect.identifier_preparer.quote(table)
+        count = None
+        if dialect == "sqlite":
+            try:
+                # Largest rowid is an index lookup; it overestimates after deletes
+                count = connection.execute(text(f"SELECT max(rowid) FROM {quoted}")).scalar()
+            except Exception:
+                # WITHOUT ROWID tables
+                count = None
+        if count is None:
+            count = connection.execute(text(f"SELECT COUNT(*) FROM {quoted}")).scalar()
+        counts[table] = int(count or 0)
+    return counts
+
+
+def reflect_schema(engine: Engine, annotations: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build a schema description by reflecting the live database
+
+    Args:
+        engine: Engine of the database
+        annotations: Schema description whose table, column and relationship
+            descriptions are merged in by name (default: SCHEMA_ANNOTATIONS)
+
+    Returns:
+        Schema description in the DATABASE_SCHEMA layout, with primary keys,
+        indexes and approximate row counts added
+    """
+    annotations = SCHEMA_ANNOTATIONS if annotations is None else annotations
+    described = {table["name"]: table for table in annotations.get("tables", [])}
+    described_relationships = {
+        tuple(relationship["tables"]): relationship for relationship in annotations.get("relationships", [])
+    }
+
+    tables = []
+    relationships = []
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        names = sorted(name for name in inspector.get_table_names() if not name.startswith("sqlite_"))
+        row_counts = approximate_row_counts(connection, names)
+
+        for name in names:
+            annotation = described.get(name, {})
+            column_descriptions = {
+                column["name"]: column.get("description") for column in annotation.get("columns", [])
+            }
+            primary_key = set(inspector.get_pk_constraint(name).get("constrained_columns") or [])
+
+            columns = []
+            for column in inspector.get_columns(name):
+                entry = {"name": column["name"], "type": str(column["type"])}
+                if column["name"] in primary_key:
+                    entry["primary_key"] = True
+                description = column_descriptions.get(column["name"]) or column.get("comment")
+                if description:
+                    entry["description"] = description
+                columns.append(entry)
+
+            table = {"name": name}
+            description = annotation.get("description") or inspector.get_table_comment(name).get("text")
+            if description:
+                table["description"] = description
+            table["columns"] = columns
+            table["indexes"] = [
+                {"name": index["name"], "columns": index["column_names"], "unique": bool(index["unique"])}
+                for index in inspector.get_indexes(name)
+            ]
+            table["row_count"] = row_counts.get(name, 0)
+            tables.append(table)
+
+            for foreign_key in inspector.get_foreign_keys(name):
+                if len(foreign_key["constrained_columns"]) != 1:
+                    continue
+                parent = foreign_key["referred_table"]
+                relationship = {
+                    "type": "1:N",
+                    "description": described_relationships.get((parent, name), {}).get(
+                        "description", f"One {parent} row has many {name} rows"
+                    ),
+                    "tables": [parent, name],
+                    "keys": [foreign_key["referred_columns"][0], foreign_key["constrained_columns"][0]]
+                }
+                relationships.append(relationship)
+
+    return {"tables": tables, "relationships": relationships}
+
+
+class SchemaSnapshot:
+    """
+    Reflected schema description together with the DDL fingerprint it was
+    taken at and its digest (the key of the SQL and prompt caches)
+    """
+
+    def __init__(self, schema: Dict[str, Any], fingerprint: str, created_at: Optional[float] = None):
+        self.schema = schema
+        self.fingerprint = fingerprint
+        self.digest = schema_digest(schema)
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self, database_url: str) -> Dict[str, Any]:
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "database_url": database_url,
+            "fingerprint": self.fingerprint,
+            "digest": self.digest,
+            "created_at": self.created_at,
+            "schema": self.schema,
+        }
+
+
+def load_snapshot(path: str, database_url: str, fingerprint: str) -> Optional[SchemaSnapshot]:
+    """
+    Load the snapshot cached on disk if it was taken of the same database at
+    the same DDL fingerprint
+    """
+    try:
+        with open(path) as snapshot_file:
+            data = json.load(snapshot_file)
+    except (OSError, ValueError):
+        return None
+    if (data.get("format") != SNAPSHOT_FORMAT or data.get("database_url") != database_url
+            or data.get("fingerprint") != fingerprint):
+        return None
+    snapshot = SchemaSnapshot(data["schema"], fingerprint, data.get("created_at"))
+    if snapshot.digest != data.get("digest"):
+        logger.warning(f"Schema snapshot {path} doesn't match its digest, ignoring it")
+        return None
+    return snapshot
+
+
+def save_snapshot(path: str, database_url: str, snapshot: SchemaSnapshot) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as snapshot_file:
+        json.dump(snapshot.to_dict(database_url), snapshot_file)
+    os.replace(temporary, path)
+
+
+def take_snapshot(engine: Engine, path: Optional[str] = None, reuse: bool = True) -> SchemaSnapshot:
+    """
+    Snapshot the database schema, reusing the copy on disk when the DDL
+    fingerprint still matches so restarts skip reflection
+
+    Args:
+        engine: Engine of the database
+        path: Snapshot file (default: SCHEMA_SNAPSHOT_PATH; "" disables the file)
+        reuse: Whether a matching snapshot on disk may be used
+
+    Returns:
+        The snapshot
+    """
+    path = settings.SCHEMA_SNAPSHOT_PATH if path is None else path
+    database_url = engine.url.render_as_string(hide_password=True)
+    fingerprint = ddl_fingerprint(engine)
+
+    if path and reuse:
+        snapshot = load_snapshot(path, database_url, fingerprint)
+        if snapshot is not None:
+            logger.info(f"Loaded schema snapshot {snapshot.digest} from {path}")
+            return snapshot
+
+    started = time.perf_counter()
+    snapshot = SchemaSnapshot(reflect_schema(engine), fingerprint)
+    logger.info(
+        f"Reflected {len(snapshot.schema['tables'])} tables in {time.perf_counter() - started:.3f}s, "
+        f"schema digest {snapshot.digest}"
+    )
+    if path:
+        try:
+            save_snapshot(path, database_url, snapshot)
+        except OSError as e:
+            logger.warning(f"Could not save schema snapshot to {path}: {str(e)}")
+    return snapshot
+
+
+def publish_snapshot(snapshot: SchemaSnapshot) -> bool:
+    """
+    Make a snapshot the schema used by prompts, validation and cache keys
+
+    Returns:
+        False when the snapshot has no tables (e.g. the database isn't
+        initialized yet) and the current schema was kept
+    """
+    if not snapshot.schema["tables"]:
+        logger.warning("Reflected schema has no tables, keeping the current schema description")
+        return False
+    set_database_schema(snapshot.schema, snapshot.digest)
+    return True
+
+
+class SchemaWatcher:
+    """
+    Keeps the published schema in sync with the database: takes a snapshot
+    on start and re-checks the DDL fingerprint every `interval` seconds in
+    the background, reflecting again when it changed.
+    """
+
+    def __init__(self, engine: Engine, interval: float = 60.0, path: Optional[str] = None):
+        self.engine = engine
+        self.interval = interval
+        self.path = path
+        self.snapshot: Optional[SchemaSnapshot] = None
+        self.refreshes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self) -> bool:
+        """
+        Take and publish a new snapshot if the DDL changed
+
+        Returns:
+            Whether a new schema was published
+        """
+        if self.snapshot is not None and ddl_fingerprint(self.engine) == self.snapshot.fingerprint:
+            return False
+        snapshot = take_snapshot(self.engine, self.path, reuse=self.snapshot is None)
+        if self.snapshot is not None:
+            logger.info(f"Schema changed: {self.snapshot.digest} -> {snapshot.digest}")
+            self.refreshes += 1
+        self.snapshot = snapshot
+        return publish_snapshot(snapshot)
+
+    async def start(self) -> None:
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            logger.error(f"Schema introspection failed, using the built-in description: {str(e)}")
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Schema refresh failed: {str(e)}")
@@ -0,0 +1,228 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# SQLite VM instructions between checks of the deadline and cancellation flag
+_PROGRESS_INTERVAL = 1000
+
+_FETCH_BATCH = 500
+
+_active_budget: ContextVar[Optional["QueryBudget"]] = ContextVar("active_query_budget", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a query runs past its time limit, row cap or byte cap, or is cancelled
+    """
+
+    MESSAGES = {
+        "timeout": "Query exceeded the time limit of {limit} seconds",
+        "max_rows": "Query returned more than the limit of {limit} rows",
+        "max_bytes": "Query result exceeded the limit of {limit} bytes",
+        "cancelled": "Query was cancelled",
+    }
+
+    def __init__(self, error_type: str, limit: Any = None):
+        self.error_type = error_type
+        self.limit = limit
+        super().__init__(self.MESSAGES[error_type].format(limit=limit))
+
+    def as_result(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": str(self),
+            "error_type": self.error_type,
+            "limit": self.limit
+        }
+
+
+def _row_size(row: Sequence[Any]) -> int:
+    # Rough size of a row once serialized; exact enough to stop runaway results
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+
+def _sqlite3_connection(dbapi_connection: Any) -> Optional[sqlite3.Connection]:
+    driver_connection = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+    if isinstance(driver_connection, sqlite3.Connection):
+        return driver_connection
+    # aiosqlite runs a plain sqlite3 connection in its worker thread
+    connection = getattr(driver_connection, "_conn", None)
+    return connection if isinstance(connection, sqlite3.Connection) else None
+
+
+class QueryBudget:
+    """
+    Execution budget of a single query: wall-clock timeout, maximum rows and
+    maximum result bytes, plus cancellation (e.g. when the client disconnects).
+
+    The timeout is enforced inside the database: SQLite checks the deadline
+    from a progress handler and aborts the statement, Postgres gets a
+    statement_timeout for the transaction. Rows and bytes are counted while
+    fetching, so a runaway result is never fully materialized.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.deadline: Optional[float] = None
+        self.cancelled = False
+        self._attached: List[Any] = []
+        self._timers: List[threading.Timer] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "QueryBudget":
+        return cls(
+            timeout=settings.QUERY_TIMEOUT or None,
+            max_rows=settings.QUERY_MAX_ROWS or None,
+            max_bytes=settings.QUERY_MAX_BYTES or None,
+        )
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def cancel(self) -> None:
+        """
+        Stop the query; safe to call from another thread or task
+        """
+        self.cancelled = True
+        with self._lock:
+            attached = list(self._attached)
+        for dbapi_connection in attached:
+            connection = _sqlite3_connection(dbapi_connection)
+            if connection is not None:
+                connection.interrupt()
+                continue
+            driver_connection = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+            # psycopg2 can cancel the running statement server side
+            if hasattr(driver_connection, "cancel"):
+                try:
+                    driver_connection.cancel()
+                except Exception as e:
+                    logger.warning(f"Could not cancel query: {str(e)}")
+
+    def check(self) -> None:
+        """
+        Raise if the query was cancelled or ran out of time
+        """
+        if self.cancelled:
+            raise QueryBudgetExceeded("cancelled")
+        if self.expired:
+            raise QueryBudgetExceeded("timeout", self.timeout)
+
+    @contextmanager
+    def enforce(self) -> Iterator["QueryBudget"]:
+        """
+        Apply the budget to every statement executed inside the block
+        """
+        if self.timeout is not None and self.deadline is None:
+            self.deadline = self.clock() + self.timeout
+        token = _active_budget.set(self)
+        try:
+            yield self
+        except DBAPIError as e:
+            # An aborted statement surfaces as a driver error (sqlite "interrupted",
+            # Postgres "canceling statement due to statement timeout")
+            if self.cancelled or self.expired:
+                self.check()
+            raise
+        finally:
+            _active_budget.reset(token)
+            self._detach()
+
+    def fetch(self, result) -> List[Any]:
+        """
+        Fetch all rows of a result in batches within the row and byte caps
+        """
+        rows: List[Any] = []
+        size = 0
+        while True:
+            self.check()
+            batch = result.fetchmany(_FETCH_BATCH)
+            if not batch:
+                return rows
+            rows.extend(batch)
+            if self.max_rows is not None and len(rows) > self.max_rows:
+                raise QueryBudgetExceeded("max_rows", self.max_rows)
+            if self.max_bytes is not None:
+                size += sum(_row_size(row) for row in batch)
+                if size > self.max_bytes:
+                    raise QueryBudgetExceeded("max_bytes", self.max_bytes)
+
+    def _attach(self, conn, cursor) -> None:
+        dbapi_connection = conn.connection.dbapi_connection
+        with self._lock:
+            if any(attached is dbapi_connection for attached in self._attached):
+                return
+            self._attached.append(dbapi_connection)
+
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            connection = _sqlite3_connection(dbapi_connection)
+            try:
+                if connection is not None:
+                    connection.set_progress_handler(self._progress, _PROGRESS_INTERVAL)
+            except sqlite3.ProgrammingError:
+                # Connections opened without check_same_thread=False only
+                # allow interrupt() from other threads, so use a timer
+                if self.deadline is not None:
+                    timer = threading.Timer(max(self.deadline - self.clock(), 0), connection.interrupt)
+                    timer.daemon = True
+                    timer.start()
+                    with self._lock:
+                        self._timers.append(timer)
+        elif dialect == "postgresql" and self.deadline is not None:
+            remaining = max(int((self.deadline - self.clock()) * 1000), 1)
+            cursor.execute(f"SET LOCAL statement_timeout = {remaining}")
+
+    def _detach(self) -> None:
+        with self._lock:
+            attached, self._attached = self._attached, []
+            timers, self._timers = self._timers, []
+        for timer in timers:
+            timer.cancel()
+        for dbapi_connection in attached:
+            connection = _sqlite3_connection(dbapi_connection)
+            try:
+                if connection is not None:
+                    connection.set_progress_handler(None, 0)
+            except sqlite3.ProgrammingError:
+                pass
+
+    def _progress(self) -> int:
+        # A non-zero return makes SQLite abort the running statement
+        return 1 if self.cancelled or self.expired else 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _apply_active_budget(conn, cursor, statement, parameters, context, executemany):
+    budget = _active_budget.get()
+    if budget is not None:
+        budget._attach(conn, cursor)
@@ -0,0 +1,245 @@
+import logging
+import secrets
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.llm.cache import InMemoryCache
+from app.llm.schema import get_database_schema
+from app.llm.validator import SQLValidationError, referenced_tables, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Result columns that can serve as a unique, sortable keyset key when the
+# query reads a single table
+KEYSET_COLUMNS = ("id",)
+
+_CLAUSE_BREAKERS = frozenset({"limit", "offset", "union", "intersect", "except", "fetch"})
+
+
+def strip_statement(sql: str) -> str:
+    """
+    Remove the trailing semicolon so the query can be used as a subquery
+    """
+    return sql.strip().rstrip(";").rstrip()
+
+
+def plan_pagination(sql: str, columns: List[str]) -> Dict[str, Any]:
+    """
+    Decide how a query's results are paged.
+
+    Keyset pagination ("WHERE id > :last ORDER BY id LIMIT n") is used when
+    the query reads a single table, selects that table's primary key id
+    column as it is (not an alias of another column or expression), doesn't
+    group or deduplicate rows and is either unordered or ordered by that id,
+    so every page is an index range scan. Anything else (joins, subqueries in
+    FROM, other orderings, LIMIT, set operations) is paged with LIMIT/OFFSET
+    over the original query, which keeps its ordering.
+
+    Args:
+        sql: Validated SQL query
+        columns: Column names of the query's result
+
+    Returns:
+        Page state for the first page
+    """
+    offset_plan = {"mode": "offset", "offset": 0}
+    try:
+        tokens = tokenize(strip_statement(sql))
+    except SQLValidationError:
+        return offset_plan
+    tables = referenced_tables(sql)
+    if not tokens or tokens[0].value.lower() != "select" or len(tables) != 1:
+        return offset_plan
+
+    key = next((column for column in KEYSET_COLUMNS if columns.count(column) == 1), None)
+    if key is None:
+        return offset_plan
+
+    descending = False
+    depth = 0
+    select_end = None
+    for index, token in enumerate(tokens):
+        value = token.value.lower()
+        if value == "(":
+            depth += 1
+        elif value == ")":
+            depth -= 1
+        elif depth == 0 and token.kind == "ident" and value in _CLAUSE_BREAKERS:
+            return offset_plan
+        elif depth == 0 and value == "from" and select_end is None:
+            select_end = index
+            # The table itself, not a subquery that may rename its columns
+            if index + 1 >= len(tokens) or _name(tokens[index + 1]) not in tables:
+                return offset_plan
+        elif depth == 0 and value in ("group", "having", "distinct"):
+            # The id no longer identifies a result row
+            return offset_plan
+        elif depth == 0 and value == "order":
+            order = _order_key(tokens[index + 2:])
+            if order is None or order[0] != key:
+                return offset_plan
+            descending = order[1]
+            break
+
+    if select_end is None or not _selects_column(tokens[1:select_end], key):
+        return offset_plan
+    if not _is_primary_key(next(iter(tables)), key):
+        return offset_plan
+
+    return {"mode": "keyset", "key": key, "descending": descending, "after": None}
+
+
+def _name(token: Any) -> Optional[str]:
+    # Lowercased identifier of a bare or quoted name token
+    if token.kind == "ident":
+        return token.value.lower()
+    if token.kind == "quoted":
+        return token.value[1:-1].lower()
+    return None
+
+
+def _select_items(tokens: List[Any]) -> List[List[Any]]:
+    # Split a select list on its top-level commas
+    items: List[List[Any]] = [[]]
+    depth = 0
+    for token in tokens:
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif token.value == "," and depth == 0:
+            items.append([])
+            continue
+        items[-1].append(token)
+    return items
+
+
+def _selects_column(tokens: List[Any], column: str) -> bool:
+    # Whether the select list returns `column` of the table unchanged, by
+    # name or through *, and no expression under that name
+    star = False
+    direct = False
+    for item in _select_items(tokens):
+        values = [token.value for token in item]
+        if values == ["*"] or (len(values) == 3 and values[1:] == [".", "*"]):
+            star = True
+            continue
+        expression = item
+        if len(item) >= 2 and item[-2].value.lower() == "as":
+            name, expression = _name(item[-1]), item[:-2]
+        elif len(item) >= 2 and _name(item[-1]) is not None and item[-2].value != "." \
+                and _name(item[-2]) is not None:
+            name, expression = _name(item[-1]), item[:-1]
+        else:
+            name = _name(item[-1]) if item else None
+        if name != column:
+            continue
+        is_column = len(expression) == 1 or (len(expression) == 3 and expression[1].value == ".")
+        if not is_column or _name(expression[-1]) != column:
+            return False
+        direct = True
+    return direct or star
+
+
+def _is_primary_key(table_name: str, column: str) -> bool:
+    for table in get_database_schema()["tables"]:
+        if table["name"].lower() != table_name:
+            continue
+        primary_key = [entry["name"].lower() for entry in table["columns"] if entry.get("primary_key")]
+        if primary_key or "row_count" in table:
+            # A reflected table: its primary key is known
+            return primary_key == [column]
+        # The hand-written description doesn't mark keys; its tables are keyed by id
+        return column in {entry["name"].lower() for entry in table["columns"]}
+    return False
+
+
+def _order_key(tokens: List[Any]) -> Optional[Tuple[str, bool]]:
+    # ORDER BY [table.]column [ASC|DESC] and nothing after it
+    values = [token.value.lower() for token in tokens]
+    descending = False
+    if values and values[-1] in ("asc", "desc"):
+        descending = values.pop() == "desc"
+    if len(values) == 3 and values[1] == ".":
+        values = values[2:]
+    if len(values) != 1 or tokens[0].kind not in ("ident", "quoted"):
+        return None
+    return values[0].strip('"`[]'), descending
+
+
+def page_query(sql: str, state: Dict[str, Any], page_size: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Wrap a query so it returns one page plus one row to detect further pages
+
+    Args:
+        sql: Validated SQL query
+        state: Page state from plan_pagination or next_page_state
+        page_size: Number of rows per page
+
+    Returns:
+        Tuple of (wrapped query, extra bind parameters)
+    """
+    sql = strip_statement(sql)
+    params: Dict[str, Any] = {"_page_limit": page_size + 1}
+    if state["mode"] == "keyset":
+        key = f'"{state["key"]}"'
+        where = ""
+        if state["after"] is not None:
+            where = f" WHERE {key} {'<' if state['descending'] else '>'} :_page_after"
+            params["_page_after"] = state["after"]
+        order = f"{key} DESC" if state["descending"] else key
+        return f"SELECT * FROM ({sql}) AS _page{where} ORDER BY {order} LIMIT :_page_limit", params
+
+    params["_page_offset"] = state["offset"]
+    return f"SELECT * FROM ({sql}) AS _page LIMIT :_page_limit OFFSET :_page_offset", params
+
+
+def next_page_state(state: Dict[str, Any], columns: List[str], rows: List[Any], page_size: int) -> Dict[str, Any]:
+    """
+    Page state that continues after the given page
+    """
+    if state["mode"] == "keyset":
+        return {**state, "after": rows[page_size - 1][columns.index(state["key"])]}
+    return {**state, "offset": state["offset"] + page_size}
+
+
+class CursorStore:
+    """
+    Continuation cursors of paginated queries.
+
+    Each cursor is an opaque random token for the state of the next page,
+    including the already validated SQL, so fetching it costs no LLM calls.
+    Cursors are immutable: fetching a page issues a new cursor for the page
+    after it, so retrying a request returns the same page.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self._cache = InMemoryCache(ttl, max_entries)
+
+    def save(self, state: Dict[str, Any]) -> str:
+        cursor = secrets.token_urlsafe(16)
+        self._cache.set(cursor, state)
+        return cursor
+
+    def load(self, cursor: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(cursor)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+_cursor_store: Optional[CursorStore] = None
+_cursor_store_lock = threading.Lock()
+
+
+def get_cursor_store() -> CursorStore:
+    """
+    Get the process-wide cursor store
+    """
+    global _cursor_store
+    if _cursor_store is None:
+        with _cursor_store_lock:
+            if _cursor_store is None:
+                _cursor_store = CursorStore(settings.PAGINATION_CURSOR_TTL, settings.PAGINATION_MAX_CURSORS)
+    return _cursor_store
@@ -1,13 +1,157 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Awaitable, Sequence, Tuple
+from itertools import groupby
+import json
 import logging
-from sqlalchemy import text
+import time
+from contextlib import ExitStack
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.db.binding import BindingError
+from app.db.index_advisor import IndexAdvisor, get_index_advisor
+from app.db.pagination import next_page_state, page_query, plan_pagination, strip_statement
+from app.db.limits import QueryBudget, QueryBudgetExceeded
+from app.db.statement_cache import StatementCache, get_statement_cache
+from app.db.result_cache import ResultCache, cacheable_tables, get_result_cache, make_result_key
+from app.db.routing import EngineRouter, get_engine_router, is_select
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
 
 logger = logging.getLogger(__name__)
 
+# Result formats: "rows" is a list of {column: value} dicts, "columns" is
+# {"columns": [...], "data": {column: [values]}} and doesn't repeat the
+# column names in every row
+RESULT_FORMATS = ("rows", "columns")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Identical SELECTs (same SQL, parameters and format) executing at the same
+# time share one database query
+inflight_queries = SingleFlight()
+
+def format_results(columns: List[str], rows: Sequence[Sequence[Any]], result_format: str = "rows") -> Dict[str, Any]:
+    """
+    Build the results payload of a query in the requested format
+    
+    Args:
+        columns: Column names
+        rows: Fetched rows
+        result_format: "rows" or "columns"
+        
+    Returns:
+        Dict with the columns, the rows or per-column data, and the row count
+    """
+    if result_format == "columns":
+        data = {column: [row[index] for row in rows] for index, column in enumerate(columns)}
+        return {"columns": columns, "data": data, "row_count": len(rows)}
+    return {
+        "columns": columns,
+        "rows": [dict(zip(columns, row)) for row in rows],
+        "row_count": len(rows)
+    }
+
+def arrow_available() -> bool:
+    return pa is not None
+
+def _arrow_array(column: str, values: List[Any]) -> "pa.Array":
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        # SQLite columns can mix types (e.g. a CASE returning numbers and
+        # text), which an Arrow column can't hold; send them as strings
+        logger.warning(f"Encoding column {column} as strings for Arrow: {str(e)}")
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+def encode_arrow_ipc(columns: List[str], data: Dict[str, List[Any]], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serialize columnar results as an Apache Arrow IPC stream
+    
+    Args:
+        columns: Column names, in order
+        data: Values of each column, as returned by the "columns" format
+        metadata: Extra values stored JSON-encoded in the schema metadata
+        
+    Returns:
+        The IPC stream bytes
+    """
+    if pa is None:
+        raise RuntimeError("The Arrow result format requires the pyarrow package")
+    table = pa.table({column: _arrow_array(column, data[column]) for column in columns})
+    if metadata:
+        table = table.replace_schema_metadata({key: json.dumps(value, default=str) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
 class QueryExecutor:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        result_cache: Optional[ResultCache] = None,
+        router: Optional[EngineRouter] = None,
+        statement_cache: Optional[StatementCache] = None,
+        index_advisor: Optional[IndexAdvisor] = None
+    ):
         self.db = db
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
+        self.router = router if router is not None else get_engine_router(db.get_bind())
+        self.statements = statement_cache if statement_cache is not None else get_statement_cache()
+        self.index_advisor = index_advisor if index_advisor is not None else get_index_advisor()
+    
+    def _execute_read(
+        self,
+        statement,
+        params: Dict[str, Any],
+        execution_options: Optional[Dict[str, Any]] = None,
+        in_flight: Optional[ExitStack] = None
+    ):
+        """
+        Execute a read-only statement on a read engine when the session's
+        engine has any. If the read engine fails a statement that the primary
+        can run, the read engine is marked unhealthy.
+        
+        The read engine counts as in flight until `in_flight` is closed, which
+        callers do once the rows are fetched; without it, only while executing.
+        """
+        execution_options = execution_options or {}
+        bind = self.router.read_engine() if self.router is not None else None
+        if bind is None or bind is self.router.primary:
+            return self.db.execute(statement, params, execution_options=execution_options)
+        try:
+            with ExitStack() as usage:
+                usage.enter_context(self.router.use(bind))
+                result = self.db.execute(statement, params, execution_options=execution_options, bind_arguments={"bind": bind})
+                if in_flight is not None:
+                    in_flight.enter_context(usage.pop_all())
+                return result
+        except OperationalError as e:
+            logger.warning(f"Read engine failed, retrying on the primary: {str(e)}")
+            result = self.db.execute(statement, params, execution_options=execution_options)
+            self.router.mark_failed(bind)
+            return result
+    
+    def _record(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]],
+        elapsed: float,
+        rows: int,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Hand a SELECT's timing to the index advisor
+        """
+        if self.index_advisor is not None and is_select(sql_query):
+            self.index_advisor.record(sql_query, parameters, elapsed, rows, extra)
     
     def apply_parameters(self, sql_query: str, parameters: List[Dict[str, Any]]) -> tuple:
         """
@@ -18,66 +162,98 @@ class QueryExecutor:
             parameters: List of parameters with name, value and type
             
         Returns:
-            Tuple of (query with named parameters, parameters dict)
+            Tuple of (query with named parameters, parameters dict); IN
+            clauses given a list are rewritten for expanding parameters
+            
+        Raises:
+            BindingError: If the parameters don't fit the query's placeholders
+        """
+        plan = self.statements.get(sql_query, parameters)
+        return plan.sql, plan.bind(parameters)
+    
+    def prepare(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Tuple[TextClause, Dict[str, Any]]:
         """
-        params_dict = {}
+        Get the cached compiled statement for a query and bind its parameters
         
-        # Convert SQL to use named parameters
-        modified_sql = sql_query
+        Args:
+            sql_query: SQL query with placeholders
+            parameters: Optional list of parameters
+            extra: Values bound as they are, for placeholders the executor adds itself
         
-        for param in parameters:
-            param_name = param["name"]
-            param_value = param["value"]
-            param_type = param["type"]
-            
-            # Convert parameter value based on type
-            if param_type == "number":
-                try:
-                    param_value = float(param_value)
-                except ValueError:
-                    logger.warning(f"Could not convert {param_value} to number, using as string")
-            
-            # Add to parameters dictionary
-            params_dict[param_name] = param_value
+        Returns:
+            Tuple of (statement, parameters dict)
             
-            # For date parameters, ensure proper formatting
-            if param_type == "date":
-                if not (param_value.startswith("'") and param_value.endswith("'")):
-                    param_value = f"'{param_value}'"
-        
-        return modified_sql, params_dict
+        Raises:
+            BindingError: If the parameters don't fit the query's placeholders
+        """
+        plan = self.statements.get(sql_query, parameters, reserved=extra or ())
+        params_dict = plan.bind(parameters)
+        if extra:
+            params_dict.update(extra)
+        return plan.clause, params_dict
     
-    def execute_query(self, sql_query: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    def execute_query(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
         """
         Execute SQL query with parameters and return results
         
         Args:
             sql_query: SQL query to execute
             parameters: Optional list of parameters
+            result_format: "rows" or "columns", see format_results
+            budget: Time, row and byte limits; defaults to the configured limits
             
         Returns:
-            Dict with results or error message
+            Dict with results or error message; errors from exceeding the
+            budget also carry `error_type` and `limit`
         """
+        budget = budget or QueryBudget.from_settings()
         try:
-            params_dict = {}
-            if parameters:
-                sql_query, params_dict = self.apply_parameters(sql_query, parameters)
+            statement, params_dict = self.prepare(sql_query, parameters)
+            
+            # Serve repeated SELECTs from the result cache
+            cache_key = make_result_key(sql_query, params_dict, result_format) if self.result_cache is not None else None
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Result cache hit for query: {sql_query}")
+                    return cached
+                tables = cacheable_tables(sql_query)
+                version = self.result_cache.version(tables)
             
             # Execute query
             logger.info(f"Executing query: {sql_query} with params: {params_dict}")
-            result = self.db.execute(text(sql_query), params_dict)
+            started = time.perf_counter()
+            with budget.enforce(), ExitStack() as in_flight:
+                if is_select(sql_query):
+                    result = self._execute_read(statement, params_dict, in_flight=in_flight)
+                else:
+                    result = self.db.execute(statement, params_dict)
+                
+                if result.returns_rows:
+                    columns = list(result.keys())
+                    rows = budget.fetch(result)
             
             # Get column names
             if result.returns_rows:
-                columns = result.keys()
-                rows = [dict(zip(columns, row)) for row in result.fetchall()]
-                
-                return {
+                self._record(sql_query, parameters, time.perf_counter() - started, len(rows))
+                results = {
                     "success": True,
-                    "columns": list(columns),
-                    "rows": rows,
-                    "row_count": len(rows)
+                    **format_results(columns, rows, result_format)
                 }
+                if cache_key is not None and tables:
+                    self.result_cache.set(cache_key, results, tables, version)
+                return results
             else:
                 row_count = result.rowcount
                 return {
@@ -86,9 +262,381 @@ class QueryExecutor:
                     "message": f"Query executed successfully. {row_count} rows affected."
                 }
                 
+        except QueryBudgetExceeded as e:
+            logger.warning(f"Query stopped: {str(e)}")
+            return e.as_result()
         except Exception as e:
             logger.error(f"Error executing query: {str(e)}")
             return {
                 "success": False,
                 "error": str(e)
             }
+
+
+    def execute_page(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        page_size: int = 100,
+        state: Optional[Dict[str, Any]] = None,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute one page of a query, see app.db.pagination
+        
+        Args:
+            sql_query: SQL query to execute
+            parameters: Optional list of parameters
+            page_size: Number of rows per page
+            state: Page state returned with the previous page, None for the first page
+            result_format: "rows" or "columns", see format_results
+            budget: Time and byte limits; defaults to the configured limits
+            
+        Returns:
+            Dict with the page's results or error message; `next_page` is the
+            state of the following page, or None on the last page
+        """
+        budget = budget or QueryBudget.from_settings()
+        try:
+            started = time.perf_counter()
+            with budget.enforce(), ExitStack() as in_flight:
+                if state is None:
+                    # Only the column names are needed to plan the pagination
+                    probe_statement, params_dict = self.prepare(
+                        f"SELECT * FROM ({strip_statement(sql_query)}) AS _page LIMIT 0", parameters
+                    )
+                    probe = self._execute_read(probe_statement, params_dict, in_flight=in_flight)
+                    state = plan_pagination(sql_query, list(probe.keys()))
+                    probe.close()
+                
+                page_sql, page_params = page_query(sql_query, state, page_size)
+                page_statement, params_dict = self.prepare(page_sql, parameters, page_params)
+                logger.info(f"Executing page: {page_sql} with params: {params_dict}")
+                result = self._execute_read(page_statement, params_dict, in_flight=in_flight)
+                columns = list(result.keys())
+                fetched = budget.fetch(result)
+            self._record(page_sql, parameters, time.perf_counter() - started, len(fetched), page_params)
+            has_more = len(fetched) > page_size
+            return {
+                "success": True,
+                **format_results(columns, fetched[:page_size], result_format),
+                "pagination": state["mode"],
+                "next_page": next_page_state(state, columns, fetched, page_size) if has_more else None
+            }
+        except QueryBudgetExceeded as e:
+            logger.warning(f"Query stopped: {str(e)}")
+            return e.as_result()
+        except Exception as e:
+            logger.error(f"Error executing page: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def stream_query(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500,
+        budget: Optional[QueryBudget] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Execute a query on a server-side cursor and yield its rows in batches,
+        so memory stays flat however many rows the query returns
+        
+        Args:
+            sql_query: SQL query to execute
+            parameters: Optional list of parameters
+            batch_size: Number of rows fetched per round trip
+            budget: Time limit and cancellation for the whole stream; the row
+                and byte caps don't apply, streamed rows aren't held in memory
+            
+        Yields:
+            {"columns": [...]} once, then {"rows": [[...], ...]} per batch
+            
+        Raises:
+            QueryBudgetExceeded: The stream ran out of time or was cancelled
+        """
+        budget = budget or QueryBudget.from_settings()
+        statement, params_dict = self.prepare(sql_query, parameters)
+        
+        logger.info(f"Streaming query: {sql_query} with params: {params_dict}")
+        with budget.enforce(), ExitStack() as in_flight:
+            result = self._execute_read(statement, params_dict, {"stream_results": True}, in_flight)
+            try:
+                yield {"columns": list(result.keys())}
+                for partition in result.partitions(batch_size):
+                    budget.check()
+                    yield {"rows": [list(row) for row in partition]}
+            finally:
+                result.close()
+    
+    def execute_speculative(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        row_cap: int = 1000,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a query before it has been fully validated.
+        The connection is switched to read-only, at most row_cap rows are
+        fetched and the transaction is always rolled back.
+        
+        Args:
+            sql_query: SQL query to execute
+            parameters: Optional list of parameters
+            row_cap: Maximum number of rows to fetch
+            result_format: "rows" or "columns", see format_results
+            budget: Time limit and cancellation; defaults to the configured limits
+            
+        Returns:
+            Dict with results or error message; `truncated` tells whether
+            the query returned more than row_cap rows
+        """
+        budget = budget or QueryBudget.from_settings()
+        connection = self.db.connection()
+        dialect = connection.dialect.name
+        try:
+            if dialect == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = ON")
+            elif dialect == "postgresql":
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            
+            statement, params_dict = self.prepare(sql_query, parameters)
+            
+            logger.info(f"Speculatively executing query: {sql_query} with params: {params_dict}")
+            started = time.perf_counter()
+            with budget.enforce():
+                result = connection.execute(statement, params_dict)
+                if not result.returns_rows:
+                    return {"success": False, "error": "Speculative execution only supports queries that return rows"}
+                
+                columns = list(result.keys())
+                fetched = result.fetchmany(row_cap + 1)
+            self._record(sql_query, parameters, time.perf_counter() - started, len(fetched))
+            return {
+                "success": True,
+                **format_results(columns, fetched[:row_cap], result_format),
+                "truncated": len(fetched) > row_cap
+            }
+        except QueryBudgetExceeded as e:
+            logger.warning(f"Speculative query stopped: {str(e)}")
+            return e.as_result()
+        except Exception as e:
+            logger.error(f"Error executing query speculatively: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        finally:
+            if dialect == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = OFF")
+            self.db.rollback()
+    
+    def execute_many(
+        self,
+        sql_query: str,
+        parameter_sets: List[List[Dict[str, Any]]],
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute one query template for many parameter sets.
+        Every set is coerced and checked against the template before anything
+        reaches the database. Statements that don't return rows are sent with
+        the driver's executemany() in batches of EXECUTEMANY_BATCH_SIZE; queries
+        run once per set on the same compiled statement.
+        
+        Args:
+            sql_query: SQL query with placeholders
+            parameter_sets: Parameters of each execution
+            result_format: "rows" or "columns", see format_results
+            budget: Time, row and byte limits; defaults to the configured limits
+            
+        Returns:
+            Dict with `results` (one per parameter set) for queries, or the
+            total `affected_rows` for other statements, or an error message
+        """
+        budget = budget or QueryBudget.from_settings()
+        try:
+            bound = []
+            for index, parameters in enumerate(parameter_sets):
+                plan = self.statements.get(sql_query, parameters)
+                try:
+                    bound.append((plan, plan.bind(parameters)))
+                except BindingError as e:
+                    raise BindingError(f"Parameter set {index}: {str(e)}") from None
+            
+            logger.info(f"Executing query for {len(bound)} parameter sets: {sql_query}")
+            if is_select(sql_query):
+                results = []
+                with budget.enforce():
+                    for plan, params_dict in bound:
+                        with ExitStack() as in_flight:
+                            result = self._execute_read(plan.clause, params_dict, in_flight=in_flight)
+                            columns = list(result.keys())
+                            results.append(format_results(columns, budget.fetch(result), result_format))
+                return {"success": True, "results": results}
+            
+            affected_rows = 0
+            batch_size = max(settings.EXECUTEMANY_BATCH_SIZE, 1)
+            with budget.enforce():
+                # Consecutive sets with the same plan share executemany() calls,
+                # so the statements still run in the order given
+                for plan, group in groupby(bound, key=lambda item: item[0]):
+                    params_list = [params_dict for _, params_dict in group]
+                    if any(plan.expanding):
+                        # Expanded IN lists render different SQL for each set
+                        batches = [[params_dict] for params_dict in params_list]
+                    else:
+                        batches = [params_list[i:i + batch_size] for i in range(0, len(params_list), batch_size)]
+                    for batch in batches:
+                        result = self.db.execute(plan.clause, batch if len(batch) > 1 else batch[0])
+                        affected_rows += max(result.rowcount, 0)
+            return {
+                "success": True,
+                "affected_rows": affected_rows,
+                "message": f"Query executed for {len(bound)} parameter sets. {affected_rows} rows affected."
+            }
+        except QueryBudgetExceeded as e:
+            logger.warning(f"Query stopped: {str(e)}")
+            return e.as_result()
+        except Exception as e:
+            logger.error(f"Error executing query for many parameter sets: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+
+class AsyncQueryExecutor:
+    """
+    Runs QueryExecutor against an AsyncSession.
+
+    The sync executor runs inside AsyncSession.run_sync, so every database
+    round trip is awaited on the async driver while the parameter handling
+    and result building stay in one place.
+    """
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def execute_query(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute SQL query with parameters and return results, see QueryExecutor.execute_query.
+        A SELECT identical to one already executing waits for that query's
+        results instead of running again.
+        """
+        def execute() -> Awaitable[Dict[str, Any]]:
+            return self.db.run_sync(
+                lambda session: QueryExecutor(session).execute_query(sql_query, parameters, result_format, budget)
+            )
+        
+        key = make_result_key(sql_query, {"parameters": parameters or []}, result_format)
+        if key is None:
+            return await execute()
+        
+        results = dict(await inflight_queries.do(key, execute))
+        if results.get("error_type") == "cancelled" and not (budget is not None and budget.cancelled):
+            # The shared query was cancelled by another caller's disconnect
+            return await execute()
+        return results
+
+    async def execute_speculative(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        row_cap: int = 1000,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a query read-only and rolled back, see QueryExecutor.execute_speculative
+        """
+        return await self.db.run_sync(
+            lambda session: QueryExecutor(session).execute_speculative(sql_query, parameters, row_cap, result_format, budget)
+        )
+
+    async def execute_many(
+        self,
+        sql_query: str,
+        parameter_sets: List[List[Dict[str, Any]]],
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute one query template for many parameter sets, see QueryExecutor.execute_many
+        """
+        return await self.db.run_sync(
+            lambda session: QueryExecutor(session).execute_many(sql_query, parameter_sets, result_format, budget)
+        )
+
+    async def execute_page(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        page_size: int = 100,
+        state: Optional[Dict[str, Any]] = None,
+        result_format: str = "rows",
+        budget: Optional[QueryBudget] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute one page of a query, see QueryExecutor.execute_page
+        """
+        return await self.db.run_sync(
+            lambda session: QueryExecutor(session).execute_page(sql_query, parameters, page_size, state, result_format, budget)
+        )
+
+    async def stream_query(
+        self,
+        sql_query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 500,
+        budget: Optional[QueryBudget] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a query's rows in batches, see QueryExecutor.stream_query
+        """
+        budget = budget or QueryBudget.from_settings()
+        statement, params_dict = QueryExecutor(self.db.sync_session).prepare(sql_query, parameters)
+        
+        logger.info(f"Streaming query: {sql_query} with params: {params_dict}")
+        with budget.enforce(), ExitStack() as in_flight:
+            result = await self._stream_read(statement, params_dict, in_flight)
+            try:
+                yield {"columns": list(result.keys())}
+                async for partition in result.partitions(batch_size):
+                    budget.check()
+                    yield {"rows": [list(row) for row in partition]}
+            finally:
+                await result.close()
+
+    async def _stream_read(self, statement, params: Dict[str, Any], in_flight: Optional[ExitStack] = None):
+        """
+        Open a streaming result on a read engine, see QueryExecutor._execute_read
+        """
+        router = get_engine_router(self.db.sync_session.get_bind())
+        # Picking an engine may health-check it, which needs the greenlet context of run_sync
+        bind = await self.db.run_sync(lambda session: router.read_engine()) if router is not None else None
+        if bind is None or bind is router.primary:
+            return await self.db.stream(statement, params)
+        try:
+            with ExitStack() as usage:
+                usage.enter_context(router.use(bind))
+                result = await self.db.stream(statement, params, bind_arguments={"bind": bind})
+                if in_flight is not None:
+                    in_flight.enter_context(usage.pop_all())
+                return result
+        except OperationalError as e:
+            logger.warning(f"Read engine failed, retrying on the primary: {str(e)}")
+            result = await self.db.stream(statement, params)
+            router.mark_failed(bind)
+            return result
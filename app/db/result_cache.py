@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.llm.validator import SQLValidationError, referenced_tables, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Statements that never change table contents
+_READ_ONLY_PREFIXES = ("SELECT", "PRAGMA", "EXPLAIN", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "SHOW", "SET")
+
+_WRITE_TARGET_RE = re.compile(r"""
+    (?:INSERT(?:\s+OR\s+\w+)?\s+INTO
+      |REPLACE\s+INTO
+      |UPDATE(?:\s+OR\s+\w+)?
+      |DELETE\s+FROM
+      |(?:CREATE|DROP|ALTER)\s+TABLE(?:\s+IF(?:\s+NOT)?\s+EXISTS)?
+      |TRUNCATE(?:\s+TABLE)?)
+    \s+(?:\w+\.)?["`\[]?(\w+)
+""", re.IGNORECASE | re.VERBOSE)
+
+_PENDING_KEY = "result_cache_pending_tables"
+
+# Every live cache is invalidated by write events
+_caches: "weakref.WeakSet[ResultCache]" = weakref.WeakSet()
+
+# Tables the database changes along with another table (e.g. through
+# triggers), so writes to the source table invalidate them too
+_derived_tables: Dict[str, FrozenSet[str]] = {}
+
+
+def make_result_key(sql: str, params: Dict[str, Any], result_format: str = "rows") -> Optional[str]:
+    """
+    Cache key of a read-only query's results
+
+    Args:
+        sql: SQL query as executed
+        params: Bound parameters
+        result_format: Format the results are built in
+
+    Returns:
+        Hash of the normalized SQL, parameters and format, or None if the
+        statement isn't a cacheable SELECT
+    """
+    try:
+        tokens = tokenize(sql.strip().rstrip(";"))
+    except SQLValidationError:
+        return None
+    if not tokens or tokens[0].value.lower() not in ("select", "with"):
+        return None
+    # Token-wise normalization collapses whitespace and keyword case without touching literals
+    normalized = " ".join(
+        token.value.lower() if token.kind == "ident" else token.value for token in tokens
+    )
+    raw = json.dumps([normalized, params, result_format], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def written_tables(statement: str) -> Optional[FrozenSet[str]]:
+    """
+    Tables a statement may write to
+
+    Returns:
+        Empty set for read-only statements, None when the statement writes
+        but its tables can't be determined
+    """
+    head = statement.lstrip()[:9].upper()
+    if head.startswith(_READ_ONLY_PREFIXES):
+        return frozenset()
+    tables = frozenset(match.lower() for match in _WRITE_TARGET_RE.findall(statement))
+    if tables or head.startswith("WITH"):
+        return tables
+    return None
+
+
+class ResultCache:
+    """
+    LRU cache of query results with a per-entry TTL and a memory budget.
+
+    Every entry records the tables its query reads. Writing to a table drops
+    the entries that read it and bumps the table's version; results computed
+    while a write was in flight are not stored, because they were read
+    against a version that is already out of date.
+    """
+
+    def __init__(self, ttl: int, max_bytes: int, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, FrozenSet[str], int, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._global_version = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        _caches.add(self)
+
+    def version(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """
+        Current version of a set of tables, taken before executing a query
+        """
+        with self._lock:
+            return (self._global_version,) + tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < self.clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers only read the rows, so a shallow copy is enough
+            return dict(entry[3])
+
+    def set(self, key: str, value: Dict[str, Any], tables: FrozenSet[str], version: Tuple[int, ...]) -> None:
+        """
+        Store results unless one of the tables was written since `version` was taken
+        """
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            current = (self._global_version,) + tuple(self._versions.get(table, 0) for table in sorted(tables))
+            if current != version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, tables, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """
+        Drop the results that read any of `tables`, or everything when tables is None
+        """
+        with self._lock:
+            if tables is None:
+                self._global_version += 1
+                stale = list(self._entries)
+            else:
+                tables = frozenset(tables)
+                for table in tables:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+                stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cacheable_tables(sql: str) -> FrozenSet[str]:
+    """
+    Lowercased names of the tables a query reads
+    """
+    return frozenset(table.lower() for table in referenced_tables(sql))
+
+
+_result_cache: Optional[ResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the process-wide query result cache, or None when it is disabled
+    """
+    global _result_cache
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_MAX_BYTES)
+    return _result_cache
+
+
+def register_derived_tables(source: str, tables: Iterable[str]) -> None:
+    """
+    Make writes to `source` also invalidate the results read from `tables`
+    """
+    source = source.lower()
+    _derived_tables[source] = _derived_tables.get(source, frozenset()) | frozenset(table.lower() for table in tables)
+
+
+def _invalidate(tables: Optional[FrozenSet[str]]) -> None:
+    for cache in list(_caches):
+        cache.invalidate(tables)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _track_writes(conn, cursor, statement, parameters, context, executemany):
+    # Invalidate as soon as a write runs, and again on commit so a reader on
+    # another connection can't re-cache the pre-commit rows in between
+    tables = written_tables(statement)
+    if tables == frozenset():
+        return
+    if tables:
+        tables = tables.union(*(_derived_tables.get(table, ()) for table in tables))
+    _invalidate(tables)
+    pending = conn.info.setdefault(_PENDING_KEY, set())
+    pending.add(tables)
+
+
+@event.listens_for(Engine, "commit")
+def _invalidate_on_commit(conn):
+    for tables in conn.info.pop(_PENDING_KEY, ()):
+        _invalidate(tables)
+
+
+@event.listens_for(Engine, "rollback")
+def _discard_pending(conn):
+    conn.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,160 @@
+import logging
+from typing import Dict, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.result_cache import register_derived_tables
+
+logger = logging.getLogger(__name__)
+
+# Summary tables of orders, kept up to date by triggers on orders so
+# aggregate questions read one row per group instead of every order
+ROLLUP_TABLES = ("customer_order_totals", "daily_order_status")
+
+TABLE_DDL = {
+    "customer_order_totals": (
+        "CREATE TABLE IF NOT EXISTS customer_order_totals ("
+        "customer_id INTEGER NOT NULL PRIMARY KEY REFERENCES customers (id), "
+        "order_count INTEGER NOT NULL, "
+        "total_amount FLOAT NOT NULL)"
+    ),
+    "daily_order_status": (
+        "CREATE TABLE IF NOT EXISTS daily_order_status ("
+        "order_date DATE NOT NULL, "
+        "status VARCHAR NOT NULL, "
+        "order_count INTEGER NOT NULL, "
+        "total_amount FLOAT NOT NULL, "
+        "PRIMARY KEY (order_date, status))"
+    ),
+}
+
+# Orders without the group's key aren't counted in that rollup
+REBUILD_SQL = [
+    "DELETE FROM customer_order_totals",
+    "INSERT INTO customer_order_totals (customer_id, order_count, total_amount) "
+    "SELECT customer_id, COUNT(*), COALESCE(SUM(total_amount), 0) FROM orders "
+    "WHERE customer_id IS NOT NULL GROUP BY customer_id",
+    "DELETE FROM daily_order_status",
+    "INSERT INTO daily_order_status (order_date, status, order_count, total_amount) "
+    "SELECT order_date, status, COUNT(*), COALESCE(SUM(total_amount), 0) FROM orders "
+    "WHERE order_date IS NOT NULL AND status IS NOT NULL GROUP BY order_date, status",
+]
+
+
+def _add(row: str) -> List[str]:
+    # Statements counting the order `row` (NEW or OLD) into the rollups
+    return [
+        "INSERT INTO customer_order_totals (customer_id, order_count, total_amount) "
+        f"SELECT {row}.customer_id, 1, COALESCE({row}.total_amount, 0) WHERE {row}.customer_id IS NOT NULL "
+        "ON CONFLICT (customer_id) DO UPDATE SET order_count = order_count + 1, "
+        "total_amount = total_amount + excluded.total_amount;",
+        "INSERT INTO daily_order_status (order_date, status, order_count, total_amount) "
+        f"SELECT {row}.order_date, {row}.status, 1, COALESCE({row}.total_amount, 0) "
+        f"WHERE {row}.order_date IS NOT NULL AND {row}.status IS NOT NULL "
+        "ON CONFLICT (order_date, status) DO UPDATE SET order_count = order_count + 1, "
+        "total_amount = total_amount + excluded.total_amount;",
+    ]
+
+
+def _remove(row: str) -> List[str]:
+    # Statements taking the order `row` out of the rollups, dropping empty groups
+    return [
+        "UPDATE customer_order_totals SET order_count = order_count - 1, "
+        f"total_amount = total_amount - COALESCE({row}.total_amount, 0) WHERE customer_id = {row}.customer_id;",
+        f"DELETE FROM customer_order_totals WHERE customer_id = {row}.customer_id AND order_count <= 0;",
+        "UPDATE daily_order_status SET order_count = order_count - 1, "
+        f"total_amount = total_amount - COALESCE({row}.total_amount, 0) "
+        f"WHERE order_date = {row}.order_date AND status = {row}.status;",
+        f"DELETE FROM daily_order_status WHERE order_date = {row}.order_date AND status = {row}.status "
+        "AND order_count <= 0;",
+    ]
+
+
+def _trigger(name: str, event: str, statements: List[str]) -> str:
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON orders BEGIN {' '.join(statements)} END"
+
+
+TRIGGER_DDL: Dict[str, str] = {
+    "orders_rollup_insert": _trigger("orders_rollup_insert", "INSERT", _add("NEW")),
+    "orders_rollup_delete": _trigger("orders_rollup_delete", "DELETE", _remove("OLD")),
+    "orders_rollup_update": _trigger(
+        "orders_rollup_update", "UPDATE OF customer_id, order_date, status, total_amount",
+        _remove("OLD") + _add("NEW")
+    ),
+}
+
+# Writes to orders change the rollups through the triggers
+register_derived_tables("orders", ROLLUP_TABLES)
+
+
+def _triggers(connection: Connection) -> List[str]:
+    rows = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'orders'"))
+    return [name for (name,) in rows if name in TRIGGER_DDL]
+
+
+def rollups_supported(connection: Connection) -> bool:
+    """
+    Whether the rollups can be maintained on this database (SQLite triggers)
+    """
+    return connection.dialect.name == "sqlite"
+
+
+def rebuild_rollups(connection: Connection) -> None:
+    """
+    Recompute the rollup tables from orders, e.g. after a bulk load or to
+    drop the rounding drift of many incremental float updates
+    """
+    for statement in REBUILD_SQL:
+        connection.exec_driver_sql(statement)
+
+
+def install_rollups(connection: Connection) -> bool:
+    """
+    Create the rollup tables and their triggers. When any trigger was
+    missing, orders may have changed unseen, so the rollups are rebuilt.
+
+    Args:
+        connection: Connection in a transaction; orders must exist
+
+    Returns:
+        Whether the rollups are maintained on this database
+    """
+    if not rollups_supported(connection):
+        logger.warning(f"Rollup tables need SQLite triggers, not installing them on {connection.dialect.name}")
+        return False
+    if not inspect(connection).has_table("orders"):
+        logger.warning("No orders table yet, not installing the rollup tables")
+        return False
+    if len(_triggers(connection)) == len(TRIGGER_DDL):
+        return True
+    for ddl in TABLE_DDL.values():
+        connection.exec_driver_sql(ddl)
+    rebuild_rollups(connection)
+    for ddl in TRIGGER_DDL.values():
+        connection.exec_driver_sql(ddl)
+    logger.info(f"Installed rollup tables: {', '.join(ROLLUP_TABLES)}")
+    return True
+
+
+def drop_rollup_triggers(connection: Connection) -> bool:
+    """
+    Stop maintaining the rollups, e.g. for the duration of a bulk load
+
+    Returns:
+        Whether any trigger was installed
+    """
+    if not rollups_supported(connection):
+        return False
+    installed = _triggers(connection)
+    for name in installed:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    return bool(installed)
+
+
+def install_rollups_on(engine: Engine) -> bool:
+    """
+    Install the rollups in their own transaction, see install_rollups
+    """
+    with engine.begin() as connection:
+        return install_rollups(connection)
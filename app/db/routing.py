@@ -0,0 +1,173 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.llm.validator import SQLValidationError, tokenize
+
+logger = logging.getLogger(__name__)
+
+ROUTING_STRATEGIES = ("round_robin", "least_busy")
+
+
+def is_select(sql: str) -> bool:
+    """
+    Whether a statement only reads, so it can run on a read engine
+    """
+    try:
+        tokens = tokenize(sql.strip().rstrip(";"))
+    except SQLValidationError:
+        return False
+    return bool(tokens) and tokens[0].value.lower() in ("select", "with")
+
+
+class _ReadEngine:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.retry_at = 0.0
+        self.in_flight = 0
+        self.queries = 0
+        self.failures = 0
+
+
+class EngineRouter:
+    """
+    Routes read-only statements across read engines (replicas or read-only
+    SQLite connections), falling back to the primary engine.
+
+    A read engine that fails a query the primary can run is marked unhealthy
+    and skipped; once `health_check_interval` seconds have passed it is
+    probed with SELECT 1 before being used again.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        read_engines: List[Engine],
+        strategy: str = "round_robin",
+        health_check_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown read routing strategy: {strategy}")
+        self.primary = primary
+        self.strategy = strategy
+        self.health_check_interval = health_check_interval
+        self.clock = clock
+        self._replicas = [_ReadEngine(engine) for engine in read_engines]
+        self._by_engine = {id(replica.engine): replica for replica in self._replicas}
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self.primary_fallbacks = 0
+
+    def read_engine(self) -> Engine:
+        """
+        Pick the engine for the next read, the primary when no read engine is healthy
+        """
+        candidates = [replica for replica in self._replicas if self._available(replica)]
+        if not candidates:
+            with self._lock:
+                self.primary_fallbacks += 1
+            return self.primary
+        with self._lock:
+            if self.strategy == "least_busy":
+                replica = min(candidates, key=lambda candidate: candidate.in_flight)
+            else:
+                replica = candidates[next(self._next) % len(candidates)]
+        return replica.engine
+
+    @contextmanager
+    def use(self, engine: Engine) -> Iterator[Engine]:
+        """
+        Count a statement as in flight on an engine while it runs
+        """
+        replica = self._by_engine.get(id(engine))
+        if replica is None:
+            yield engine
+            return
+        with self._lock:
+            replica.in_flight += 1
+            replica.queries += 1
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                replica.in_flight -= 1
+
+    def mark_failed(self, engine: Engine) -> None:
+        replica = self._by_engine.get(id(engine))
+        if replica is None:
+            return
+        logger.warning(f"Read engine {engine.url!r} failed, routing reads elsewhere")
+        with self._lock:
+            replica.healthy = False
+            replica.failures += 1
+            replica.retry_at = self.clock() + self.health_check_interval
+
+    def _available(self, replica: _ReadEngine) -> bool:
+        if replica.healthy:
+            return True
+        if self.clock() < replica.retry_at:
+            return False
+        with self._lock:
+            # Only one caller probes; the others keep skipping it meanwhile
+            if replica.healthy or self.clock() < replica.retry_at:
+                return replica.healthy
+            replica.retry_at = self.clock() + self.health_check_interval
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning(f"Health check of read engine {replica.engine.url!r} failed: {str(e)}")
+            return False
+        logger.info(f"Read engine {replica.engine.url!r} is healthy again")
+        replica.healthy = True
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "primary": repr(self.primary.url),
+            "strategy": self.strategy,
+            "primary_fallbacks": self.primary_fallbacks,
+            "read_engines": [
+                {
+                    "url": repr(replica.engine.url),
+                    "healthy": replica.healthy,
+                    "in_flight": replica.in_flight,
+                    "queries": replica.queries,
+                    "failures": replica.failures,
+                }
+                for replica in self._replicas
+            ],
+        }
+
+
+# Routers by the id of the primary engine a session is bound to
+_routers: Dict[int, EngineRouter] = {}
+
+
+def register_router(router: EngineRouter) -> None:
+    _routers[id(router.primary)] = router
+
+
+def unregister_router(router: EngineRouter) -> None:
+    _routers.pop(id(router.primary), None)
+
+
+def get_engine_router(primary: Optional[Engine]) -> Optional[EngineRouter]:
+    """
+    Router for sessions bound to `primary`, or None when it has no read engines
+    """
+    if primary is None:
+        return None
+    return _routers.get(id(primary))
+
+
+def all_routers() -> List[EngineRouter]:
+    return list(_routers.values())
@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.binding import BindingPlan, plan_binding, signature
+
+logger = logging.getLogger(__name__)
+
+
+class StatementCache:
+    """
+    Bounded LRU of binding plans keyed by SQL text and the names, types and
+    list-ness of its parameters.
+
+    Counts hits and misses and the time spent building statements, from
+    which the time saved per hit is estimated.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.perf_counter):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[Any, ...], BindingPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+
+    def get(
+        self,
+        sql: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        reserved: Iterable[str] = ()
+    ) -> BindingPlan:
+        """
+        Get the binding plan for a query, building and checking it on a miss
+
+        Args:
+            sql: SQL query text
+            parameters: Parameters as generated by the LLM (name, value, type)
+            reserved: Placeholders bound by the caller itself
+
+        Returns:
+            The binding plan
+
+        Raises:
+            BindingError: If the parameters don't fit the query
+        """
+        reserved = tuple(sorted(reserved))
+        key = (sql, signature(parameters), reserved)
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return plan
+
+        started = self.clock()
+        plan = plan_binding(sql, parameters, reserved)
+        elapsed = self.clock() - started
+
+        with self._lock:
+            self.misses += 1
+            self.build_seconds += elapsed
+            if self.max_entries > 0:
+                self._entries[key] = plan
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return plan
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.build_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        build_ms = self.build_seconds / self.misses * 1000 if self.misses else 0.0
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_build_ms": build_ms,
+            "time_saved_ms": build_ms * self.hits,
+        }
+
+
+_statement_cache: Optional[StatementCache] = None
+_statement_cache_lock = threading.Lock()
+
+
+def get_statement_cache() -> StatementCache:
+    """
+    Get the process-wide statement cache
+    """
+    global _statement_cache
+    if _statement_cache is None:
+        with _statement_cache_lock:
+            if _statement_cache is None:
+                _statement_cache = StatementCache(settings.STATEMENT_CACHE_SIZE)
+    return _statement_cache
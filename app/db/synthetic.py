@@ -0,0 +1,228 @@
+import datetime
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Date, Table, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.base import Base
+from app.db.models import Customer, Order
+from app.db.rollups import drop_rollup_triggers, install_rollups
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Margaret", "Steven", "Emily",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+]
+STREETS = ["Main", "Elm", "Oak", "Pine", "Maple", "Cedar", "Park", "Lake", "Hill", "Washington"]
+CITIES = ["Anytown", "Somewhere", "Nowhere", "Elsewhere", "Anywhere", "Springfield", "Riverside", "Fairview"]
+
+CUSTOMER_COLUMNS = ("id", "name", "email", "phone", "address")
+ORDER_COLUMNS = ("customer_id", "order_date", "total_amount", "status")
+
+# Status mix by order age in days: orders move from pending to delivered
+STATUS_BY_AGE: List[Tuple[int, Sequence[Tuple[str, float]]]] = [
+    (1, [("pending", 0.7), ("processing", 0.3)]),
+    (3, [("pending", 0.1), ("processing", 0.6), ("shipped", 0.3)]),
+    (10, [("processing", 0.05), ("shipped", 0.6), ("delivered", 0.35)]),
+    (30, [("shipped", 0.1), ("delivered", 0.9)]),
+    (None, [("pending", 0.005), ("shipped", 0.005), ("delivered", 0.99)]),
+]
+
+# Spread of the customers' popularity (lognormal sigma): a few customers
+# place many orders, most place a handful
+ORDER_SKEW = 1.2
+# Greater than 1 makes recent dates more common, like a growing business
+ORDER_GROWTH = 1.5
+# Median and lognormal sigma of order totals
+AMOUNT_MEDIAN = 60.0
+AMOUNT_SIGMA = 0.8
+
+
+def generate_customers(count: int, seed: int = 0, batch_size: int = 100_000) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Customers with ids 1..count, in batches of CUSTOMER_COLUMNS tuples
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        first = rng.integers(len(FIRST_NAMES), size=size).tolist()
+        last = rng.integers(len(LAST_NAMES), size=size).tolist()
+        numbers = rng.integers(1, 9999, size=size).tolist()
+        streets = rng.integers(len(STREETS), size=size).tolist()
+        cities = rng.integers(len(CITIES), size=size).tolist()
+        rows = []
+        for offset in range(size):
+            customer_id = start + offset + 1
+            first_name, last_name = FIRST_NAMES[first[offset]], LAST_NAMES[last[offset]]
+            rows.append((
+                customer_id,
+                f"{first_name} {last_name}",
+                # The id keeps emails unique
+                f"{first_name.lower()}.{last_name.lower()}{customer_id}@example.com",
+                f"555-{customer_id % 10000:04d}",
+                f"{numbers[offset]} {STREETS[streets[offset]]} St, {CITIES[cities[offset]]} USA",
+            ))
+        yield rows
+
+
+def _statuses(ages: np.ndarray, draws: np.ndarray) -> np.ndarray:
+    statuses = np.empty(len(ages), dtype=object)
+    lower = -1
+    for upper, mix in STATUS_BY_AGE:
+        mask = ages > lower if upper is None else (ages > lower) & (ages <= upper)
+        names = np.array([name for name, _ in mix], dtype=object)
+        cumulative = np.cumsum([share for _, share in mix])
+        picks = np.searchsorted(cumulative, draws[mask] * cumulative[-1], side="right")
+        statuses[mask] = names[np.minimum(picks, len(names) - 1)]
+        lower = upper if upper is not None else lower
+    return statuses
+
+
+def generate_orders(
+    count: int,
+    customers: int,
+    seed: int = 0,
+    days: int = 730,
+    today: Optional[datetime.date] = None,
+    batch_size: int = 100_000
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Orders in batches of ORDER_COLUMNS tuples, dates as ISO strings
+
+    Order dates ascend with the generated rows (as ids do in a real orders
+    table) and cover the last `days` days, recent ones more densely. Order
+    counts per customer are skewed and the status depends on the order's age.
+    """
+    today = today or datetime.date.today()
+    rng = np.random.default_rng(seed + 1)
+    popularity = np.cumsum(rng.lognormal(0.0, ORDER_SKEW, customers))
+    last_day = np.datetime64(today.isoformat(), "D")
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        customer_ids = np.searchsorted(popularity, rng.random(size) * popularity[-1], side="right") + 1
+        # Evenly spaced quantiles with jitter, so the dates come out sorted
+        quantiles = (np.arange(start, start + size) + rng.random(size)) / count
+        ages = np.floor(days * (1.0 - quantiles) ** ORDER_GROWTH).astype(np.int64)
+        dates = np.datetime_as_string(last_day - ages, unit="D")
+        amounts = np.round(np.clip(rng.lognormal(np.log(AMOUNT_MEDIAN), AMOUNT_SIGMA, size), 1.0, 10_000.0), 2)
+        statuses = _statuses(ages, rng.random(size))
+        yield list(zip(
+            np.minimum(customer_ids, customers).tolist(), dates.tolist(), amounts.tolist(), statuses.tolist()
+        ))
+
+
+def _insert_rows(connection: Connection, table: Table, columns: Sequence[str], rows: List[Tuple[Any, ...]]) -> None:
+    if connection.dialect.name == "sqlite":
+        # Straight to sqlite3's executemany: SQLAlchemy would store the same
+        # ISO strings, but process every value in Python on the way
+        placeholders = ", ".join("?" for _ in columns)
+        connection.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        return
+    dates = [index for index, column in enumerate(columns) if isinstance(table.c[column].type, Date)]
+    connection.execute(table.insert(), [
+        {
+            column: datetime.date.fromisoformat(value) if index in dates else value
+            for index, (column, value) in enumerate(zip(columns, row))
+        }
+        for row in rows
+    ])
+
+
+def bulk_load(
+    engine: Engine,
+    customers: int,
+    orders: int,
+    seed: int = 0,
+    days: int = 730,
+    today: Optional[datetime.date] = None,
+    batch_size: int = 100_000,
+    replace: bool = False
+) -> Dict[str, Any]:
+    """
+    Generate synthetic customers and orders and bulk-load them
+
+    Rows go in through executemany in one transaction, with the tables'
+    indexes and the rollup triggers dropped during the load and built
+    afterwards, then statistics are refreshed with ANALYZE.
+
+    Args:
+        engine: Engine of the database
+        customers: Number of customers
+        orders: Number of orders
+        seed: Seed of the generated data
+        days: Days of order history before `today`
+        today: Date of the newest orders (default: today)
+        batch_size: Rows per executemany call
+        replace: Delete existing customers and orders first; otherwise
+            tables that already hold data are left alone
+
+    Returns:
+        Dict with the loaded row counts and timings in seconds
+    """
+    customer_table: Table = Customer.__table__
+    order_table: Table = Order.__table__
+    Base.metadata.create_all(bind=engine)
+
+    with engine.connect() as connection:
+        existing = connection.execute(text("SELECT COUNT(*) FROM customers")).scalar()
+    if existing and not replace:
+        logger.info("Database already contains data, skipping the bulk load")
+        return {"customers": 0, "orders": 0, "load_seconds": 0.0, "index_seconds": 0.0}
+
+    started = time.perf_counter()
+    indexes = [index for table in (customer_table, order_table) for index in table.indexes]
+    with engine.connect() as connection:
+        synchronous = None
+        if connection.dialect.name == "sqlite":
+            # Durability is moot for a load that either completes or gets redone
+            synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+            connection.commit()
+        try:
+            with connection.begin():
+                # Row-by-row trigger work would dominate the load; installed
+                # rollups are rebuilt in one pass at the end instead
+                rollups = drop_rollup_triggers(connection)
+                if replace:
+                    connection.execute(order_table.delete())
+                    connection.execute(customer_table.delete())
+                for index in indexes:
+                    index.drop(connection, checkfirst=True)
+
+                for rows in generate_customers(customers, seed, batch_size):
+                    _insert_rows(connection, customer_table, CUSTOMER_COLUMNS, rows)
+                for rows in generate_orders(orders, customers, seed, days, today, batch_size):
+                    _insert_rows(connection, order_table, ORDER_COLUMNS, rows)
+                loaded = time.perf_counter()
+
+                for index in indexes:
+                    index.create(connection)
+                if rollups:
+                    install_rollups(connection)
+                connection.exec_driver_sql("ANALYZE")
+        finally:
+            if synchronous is not None:
+                # The connection goes back to the pool
+                connection.exec_driver_sql(f"PRAGMA synchronous = {synchronous}")
+                connection.commit()
+    finished = time.perf_counter()
+
+    logger.info(
+        f"Loaded {customers} customers and {orders} orders in {loaded - started:.1f}s, "
+        f"indexes and statistics in {finished - loaded:.1f}s"
+    )
+    return {
+        "customers": customers,
+        "orders": orders,
+        "load_seconds": loaded - started,
+        "index_seconds": finished - loaded,
+    }
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
 import requests
 import json
 from typing import Dict, Any, List
@@ -15,16 +16,21 @@ st.set_page_config(
 
 def process_query(query: str) -> Dict[str, Any]:
     """
-    Send the query to the backend API and get the response
+    Send the query to the backend API and get the response.
+    Results are requested as an Arrow IPC stream, which loads straight into
+    a DataFrame instead of going through a list of row dicts.
     """
     try:
         response = requests.post(
             API_URL,
+            params={"format": "arrow"},
             json={"query": query},
             headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 200:
+            if response.headers.get("Content-Type", "").startswith("application/vnd.apache.arrow.stream"):
+                return read_arrow_response(response.content)
             return response.json()
         else:
             return {
@@ -34,6 +40,23 @@ def process_query(query: str) -> Dict[str, Any]:
     except Exception as e:
         return {"error": f"Connection error: {str(e)}"}
 
+def read_arrow_response(content: bytes) -> Dict[str, Any]:
+    """
+    Decode an Arrow IPC response into the shape of the JSON response,
+    with the results as a DataFrame
+    """
+    table = pa.ipc.open_stream(content).read_all()
+    metadata = {key.decode(): json.loads(value) for key, value in (table.schema.metadata or {}).items()}
+    return {
+        "sql_query": metadata.get("sql_query", ""),
+        "parameters": metadata.get("parameters", []),
+        "explanation": metadata.get("explanation", ""),
+        "results": {
+            "dataframe": table.to_pandas(),
+            "row_count": table.num_rows
+        }
+    }
+
 def display_results(response: Dict[str, Any]) -> None:
     """
     Display the results of the query
@@ -62,7 +85,10 @@ def display_results(response: Dict[str, Any]) -> None:
     st.markdown("### Results")
     results = response["results"]
     
-    if "rows" in results and results["rows"]:
+    if "dataframe" in results and results["row_count"]:
+        st.dataframe(results["dataframe"], use_container_width=True)
+        st.write(f"Total rows: {results['row_count']}")
+    elif "rows" in results and results["rows"]:
         df = pd.DataFrame(results["rows"])
         st.dataframe(df, use_container_width=True)
         st.write(f"Total rows: {results['row_count']}")
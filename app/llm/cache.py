@@ -0,0 +1,263 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.llm.schema import get_schema_digest, schema_digest
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a natural language query so trivially different spellings share a cache entry
+
+    Args:
+        query: Natural language query
+
+    Returns:
+        Lowercased query with collapsed whitespace and no trailing punctuation
+    """
+    normalized = _WHITESPACE_RE.sub(" ", query.strip().lower())
+    return normalized.rstrip(" ?!.;")
+
+
+def schema_hash(schema: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute a stable hash of the database schema description, by default
+    the current schema snapshot
+    """
+    if schema is None:
+        return get_schema_digest()
+    return schema_digest(schema)
+
+
+def make_cache_key(query: str, model: str, schema_digest: Optional[str] = None) -> str:
+    """
+    Build the cache key for a generated SQL response
+
+    Args:
+        query: Natural language query
+        model: Name of the LLM model that generates the SQL
+        schema_digest: Hash of the schema sent to the model
+
+    Returns:
+        Hex digest identifying the (query, model, schema) combination
+    """
+    if schema_digest is None:
+        schema_digest = schema_hash()
+    raw = "\x1f".join([normalize_query(query), model, schema_digest])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class for caches of LLM generated SQL responses.
+
+    Subclasses implement `_get`, `_set`, `_clear` and `__len__`; hit/miss
+    accounting lives here so every backend reports the same counters.
+    """
+    backend = "base"
+
+    def __init__(self, ttl: int, max_entries: int, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._set(key, value)
+
+    def clear(self) -> None:
+        self._clear()
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "llm_calls_saved": self.hits,
+        }
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryCache(ResponseCache):
+    """
+    In-process LRU cache with a per-entry TTL
+    """
+    backend = "memory"
+
+    def __init__(self, ttl: int, max_entries: int, clock: Callable[[], float] = time.time):
+        super().__init__(ttl, max_entries, clock)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """
+    Cache persisted to a SQLite file, shared across worker processes and restarts
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, ttl: int, max_entries: int, clock: Callable[[], float] = time.time):
+        super().__init__(ttl, max_entries, clock)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_sql_cache_accessed_at ON sql_cache (accessed_at)")
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM sql_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE sql_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def _set(self, key: str, value: Dict[str, Any]) -> None:
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now)
+            )
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM sql_cache WHERE key IN "
+                    "(SELECT key FROM sql_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+
+
+def create_cache(backend: Optional[str] = None) -> Optional[ResponseCache]:
+    """
+    Create a response cache for the configured backend
+
+    Args:
+        backend: "memory", "sqlite" or "none"; defaults to settings.SQL_CACHE_BACKEND
+
+    Returns:
+        Cache instance, or None when caching is disabled
+    """
+    backend = (backend or settings.SQL_CACHE_BACKEND).lower()
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        logger.info(f"Using SQLite SQL cache at {settings.SQL_CACHE_PATH}")
+        return SQLiteCache(settings.SQL_CACHE_PATH, settings.SQL_CACHE_TTL, settings.SQL_CACHE_MAX_ENTRIES)
+    if backend != "memory":
+        logger.warning(f"Unknown SQL cache backend '{backend}', falling back to in-memory cache")
+    return InMemoryCache(settings.SQL_CACHE_TTL, settings.SQL_CACHE_MAX_ENTRIES)
+
+
+_sql_cache: Optional[ResponseCache] = None
+_sql_cache_initialized = False
+_sql_cache_lock = threading.Lock()
+
+
+def get_sql_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide SQL generation cache
+    """
+    global _sql_cache, _sql_cache_initialized
+    if not _sql_cache_initialized:
+        with _sql_cache_lock:
+            if not _sql_cache_initialized:
+                _sql_cache = create_cache()
+                _sql_cache_initialized = True
+    return _sql_cache
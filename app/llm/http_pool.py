@@ -0,0 +1,175 @@
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Request counters and connection-acquisition wait times of an HTTP pool
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.new_connections = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_wait(self, wait: float, connected: bool) -> None:
+        with self._lock:
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if connected:
+                self.new_connections += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "new_connections": self.new_connections,
+                "connection_reuse_rate": 1 - self.new_connections / self.requests if self.requests else 0.0,
+                "avg_wait_ms": self.total_wait / self.requests * 1000 if self.requests else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    Async transport that records how long each request waited for a pooled
+    connection, using httpcore's trace events.
+
+    The wait is the time from handing the request to the pool until its
+    headers start going out, minus the time spent opening a new connection
+    (TCP connect and TLS handshake), so it measures queueing on the pool.
+
+    Open connections are the network streams the trace events report being
+    opened; a stream drops out once the pool discards its connection. A
+    connection is active while one of its responses is open.
+    """
+
+    def __init__(self, metrics: PoolMetrics, http2: bool = False, **kwargs):
+        super().__init__(http2=http2, **kwargs)
+        self.metrics = metrics
+        self.http2 = http2
+        self._connections: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        connect_started: Optional[float] = None
+        connect_time = 0.0
+        recorded = False
+        stream = None
+
+        async def trace(name: str, info: Dict[str, Any]) -> None:
+            nonlocal connect_started, connect_time, recorded, stream
+            now = time.perf_counter()
+            if name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                connect_started = now
+            elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete") and connect_started:
+                connect_time += now - connect_started
+                connect_started = None
+                # TLS wraps the TCP stream in the one the connection keeps
+                if stream is not None:
+                    self._connections.pop(stream, None)
+                stream = info.get("return_value")
+                if stream is not None:
+                    self._connections[stream] = 0
+            elif name.endswith("send_request_headers.started") and not recorded:
+                recorded = True
+                self.metrics.record_wait(max(now - started - connect_time, 0.0), connect_time > 0)
+            elif name.endswith("response_closed.complete") and stream in self._connections:
+                self._connections[stream] -= 1
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.metrics.request_started()
+        try:
+            response = await super().handle_async_request(request)
+        finally:
+            self.metrics.request_finished()
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            self._connections[stream] = self._connections.get(stream, 0) + 1
+        return response
+
+    async def aclose(self) -> None:
+        await super().aclose()
+        self._connections.clear()
+
+    def connection_stats(self) -> Dict[str, int]:
+        active = sum(1 for responses in self._connections.values() if responses > 0)
+        return {
+            "open_connections": len(self._connections),
+            "idle_connections": len(self._connections) - active,
+            "active_connections": active,
+        }
+
+
+# Transport of each client created by create_http_client
+_transports: "weakref.WeakKeyDictionary[httpx.AsyncClient, InstrumentedTransport]" = weakref.WeakKeyDictionary()
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the keep-alive HTTP client shared by every LLM request
+
+    Returns:
+        AsyncClient whose connection pool is sized from settings
+    """
+    http2 = settings.LLM_HTTP2 and http2_available()
+    if settings.LLM_HTTP2 and not http2:
+        logger.warning("HTTP/2 requested for the LLM client but the h2 package is not installed, using HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+    transport = InstrumentedTransport(PoolMetrics(), limits=limits, http2=http2)
+    logger.info(
+        f"LLM HTTP pool: max {limits.max_connections} connections, "
+        f"{limits.max_keepalive_connections} keep-alive, HTTP/2 {'on' if http2 else 'off'}"
+    )
+    client = httpx.AsyncClient(transport=transport, timeout=settings.LLM_HTTP_TIMEOUT)
+    _transports[client] = transport
+    return client
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, Any]:
+    """
+    Connection and wait-time metrics of a client created by create_http_client
+    """
+    transport = _transports.get(client)
+    if transport is None:
+        return {}
+    return {
+        "max_connections": settings.LLM_HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.LLM_HTTP_MAX_KEEPALIVE,
+        "keepalive_expiry": settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        "http2": transport.http2,
+        **transport.connection_stats(),
+        **transport.metrics.as_dict(),
+    }
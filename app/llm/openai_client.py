@@ -1,20 +1,37 @@
+import asyncio
 import json
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI
 from app.core.config import settings
-from app.llm.schema import SQL_FUNCTION_SCHEMA, DATABASE_SCHEMA
+from app.core.singleflight import SingleFlight, ThreadSingleFlight
+from app.llm.schema import SQL_FUNCTION_SCHEMA, BATCH_SQL_FUNCTION_SCHEMA
+from app.llm.cache import ResponseCache, get_sql_cache, make_cache_key, schema_hash
+from app.llm.semantic_cache import SemanticCache, get_semantic_cache
+from app.llm.template_cache import TemplateCache, get_template_cache
+from app.llm import prompt, validator
 
 logger = logging.getLogger(__name__)
 
-class LLMClient:
-    def __init__(self):
+class BaseLLMClient:
+    """
+    Client configuration, prompt building, response parsing and caching
+    shared by the sync and async LLM clients. Subclasses only differ in how
+    they create the OpenAI client and await its calls.
+    """
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        template_cache: Optional[TemplateCache] = None
+    ):
         if settings.USE_LOCAL_AI:
             logger.info(f"Using LocalAI at {settings.LOCAL_AI_BASE_URL}")
             # For LocalAI, we don't need an API key but need the base URL
-            self.client = OpenAI(
+            self.client = self._create_client(
                 base_url=settings.LOCAL_AI_BASE_URL,
                 api_key="not-needed"  # LocalAI doesn't need a key, but OpenAI SDK requires one
             )
@@ -28,176 +45,500 @@ class LLMClient:
                 self.client = None
             else:
                 logger.info("Using OpenAI API")
-                self.client = OpenAI(api_key=api_key)
-            
+                self.client = self._create_client(api_key=api_key)
+
             self.model = "gpt-3.5-turbo-1106"
-    
+
+        self.cache = cache if cache is not None else get_sql_cache()
+        self.semantic_cache = semantic_cache if semantic_cache is not None else get_semantic_cache()
+        self.template_cache = template_cache if template_cache is not None else get_template_cache()
+        # Identical questions arriving together share one LLM call
+        self.inflight = self._create_single_flight()
+
+    def _create_client(self, **kwargs):
+        raise NotImplementedError
+
+    def _create_single_flight(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def _mock_sql_response() -> Dict[str, Any]:
+        logger.warning("Returning mock SQL response because LLM client is not configured")
+        return {
+            "sql_query": "SELECT * FROM customers LIMIT 5",
+            "parameters": [],
+            "explanation": "This is a mock response due to missing LLM configuration."
+        }
+
+    @staticmethod
+    def _mock_review_response() -> Dict[str, Any]:
+        logger.warning("Returning mock validation response because LLM client is not configured")
+        return {
+            "is_safe": True,
+            "analysis": "This is a mock response. No validation was performed."
+        }
+
+    def _lookup_cached(self, query: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Look the query up in the exact, semantic and template caches
+
+        Returns:
+            Tuple of (exact cache key, cached response or None)
+        """
+        cache_key = make_cache_key(query, self.model)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"SQL cache hit for query: {query}")
+                return cache_key, cached
+
+        if self.semantic_cache is not None:
+            similar = self.semantic_cache.get(query, self._cache_namespace())
+            if similar is not None:
+                if self.cache is not None:
+                    self.cache.set(cache_key, similar)
+                return cache_key, similar
+
+        if self.template_cache is not None:
+            filled = self.template_cache.get(query, self._cache_namespace())
+            if filled is not None:
+                if self.cache is not None:
+                    self.cache.set(cache_key, filled)
+                return cache_key, filled
+        return cache_key, None
+
+    def _remember(self, query: str, cache_key: str, result: Dict[str, Any]) -> None:
+        if "error" in result:
+            return
+        if self.cache is not None:
+            self.cache.set(cache_key, result)
+        if self.semantic_cache is not None:
+            self.semantic_cache.set(query, result, self._cache_namespace())
+        if self.template_cache is not None:
+            self.template_cache.learn(query, result, self._cache_namespace())
+
+    def _cache_namespace(self) -> str:
+        return f"{self.model}:{schema_hash()}"
+
+    def _sql_request(self, query: str) -> Dict[str, Any]:
+        """
+        Build the chat completion arguments for converting a query to SQL
+        """
+        # If using LocalAI, we need to handle differently since function calling might
+        # not be fully supported or might work differently
+        if settings.USE_LOCAL_AI:
+            return {
+                "model": self.model,
+                "messages": prompt.local_sql_messages(query),
+            }
+
+        # For OpenAI, use function calling
+        return {
+            "model": self.model,
+            "messages": prompt.sql_messages(query),
+            "tools": [{"type": "function", "function": SQL_FUNCTION_SCHEMA}],
+            "tool_choice": {"type": "function", "function": {"name": "generate_sql_query"}},
+        }
+
+    def _parse_sql_response(self, response) -> Dict[str, Any]:
+        """
+        Extract sql_query, parameters and explanation from a chat completion
+        """
+        if settings.USE_LOCAL_AI:
+            content = response.choices[0].message.content
+            logger.info(f"Raw LLM Response: {content}")
+
+            # Extract JSON from the response
+            try:
+                # Find JSON content between triple backticks if it exists
+                if "```json" in content:
+                    json_content = content.split("```json")[1].split("```")[0].strip()
+                elif "```" in content:
+                    json_content = content.split("```")[1].split("```")[0].strip()
+                else:
+                    # Try to find JSON within the response
+                    start_idx = content.find("{")
+                    end_idx = content.rfind("}") + 1
+                    if start_idx >= 0 and end_idx > start_idx:
+                        json_content = content[start_idx:end_idx]
+                    else:
+                        json_content = content
+
+                result = json.loads(json_content)
+
+                # Ensure result has the expected keys
+                if "sql_query" not in result:
+                    raise ValueError("Missing sql_query in result")
+                if "parameters" not in result:
+                    result["parameters"] = []
+                if "explanation" not in result:
+                    result["explanation"] = "SQL query generated from natural language."
+
+                logger.info(f"Generated SQL: {result['sql_query']}")
+                return result
+            except Exception as json_err:
+                logger.error(f"Error parsing JSON response: {str(json_err)}")
+                return {
+                    "error": f"Failed to parse LLM response: {str(json_err)}",
+                    "raw_response": content
+                }
+
+        if response.choices[0].message.tool_calls:
+            function_call = response.choices[0].message.tool_calls[0]
+            result = json.loads(function_call.function.arguments)
+            logger.info(f"Generated SQL: {result['sql_query']}")
+            return result
+
+        logger.warning("No function call in response")
+        return {"error": "Failed to generate SQL query"}
+
+    def _lookup_batch(self, queries: List[str]) -> Tuple[List[Optional[Dict[str, Any]]], List[Tuple[int, str, str]]]:
+        """
+        Look every query of a batch up in the caches
+
+        Returns:
+            Tuple of (results with cached responses filled in, list of
+            (position, query, cache key) still to be generated)
+        """
+        results: List[Optional[Dict[str, Any]]] = []
+        pending = []
+        for position, query in enumerate(queries):
+            cache_key, cached = self._lookup_cached(query)
+            results.append(cached)
+            if cached is None:
+                pending.append((position, query, cache_key))
+        return results, pending
+
+    def _pack(self, pending: List[Tuple[int, str, str]]) -> List[List[Tuple[int, str, str]]]:
+        """
+        Split uncached queries into groups that each take one LLM call
+        """
+        # Only function calling returns several answers reliably; LocalAI
+        # models get one prompt per query
+        size = 1 if settings.USE_LOCAL_AI else max(settings.BATCH_LLM_PACK_SIZE, 1)
+        return [pending[start:start + size] for start in range(0, len(pending), size)]
+
+    def _batch_sql_request(self, queries: List[str]) -> Dict[str, Any]:
+        """
+        Build the chat completion arguments for converting several queries to SQL in one call
+        """
+        return {
+            "model": self.model,
+            "messages": prompt.batch_sql_messages(queries),
+            "tools": [{"type": "function", "function": BATCH_SQL_FUNCTION_SCHEMA}],
+            "tool_choice": {"type": "function", "function": {"name": "generate_sql_queries"}},
+        }
+
+    @staticmethod
+    def _parse_batch_sql_response(response, count: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Extract one result per query from a batch chat completion
+
+        Returns:
+            Results in query order; None for queries the LLM didn't answer
+            (or answered unusably), which are then generated one by one
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * count
+        tool_calls = response.choices[0].message.tool_calls
+        if not tool_calls:
+            logger.warning("No function call in batch response")
+            return results
+        try:
+            entries = json.loads(tool_calls[0].function.arguments).get("queries", [])
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Error parsing batch response: {str(e)}")
+            return results
+
+        for entry in entries:
+            if not isinstance(entry, dict) or "sql_query" not in entry:
+                continue
+            index = entry.get("index")
+            if not isinstance(index, int) or not 0 <= index < count or results[index] is not None:
+                continue
+            results[index] = {
+                "sql_query": entry["sql_query"],
+                "parameters": entry.get("parameters", []),
+                "explanation": entry.get("explanation", "SQL query generated from natural language.")
+            }
+        logger.info(f"Batch response answered {sum(result is not None for result in results)} of {count} queries")
+        return results
+
+    def _review_request(self, sql: str) -> Dict[str, Any]:
+        """
+        Build the chat completion arguments for an LLM review of a SQL query
+        """
+        messages = [
+            {"role": "system", "content": (
+                "You are a SQL security expert. Analyze the SQL query for: "
+                "1. SQL injection vulnerabilities "
+                "2. Syntax errors "
+                "3. Potential performance issues "
+                "4. Data security concerns"
+            )},
+            {"role": "user", "content": f"Validate this SQL query for security and correctness: {sql}"}
+        ]
+        return {"model": self.model, "messages": messages}
+
+    @staticmethod
+    def _parse_review_response(response) -> Dict[str, Any]:
+        analysis = response.choices[0].message.content
+
+        # Simple heuristic to determine if there are serious issues
+        is_safe = "injection" not in analysis.lower() and "vulnerability" not in analysis.lower()
+
+        return {
+            "is_safe": is_safe,
+            "analysis": analysis
+        }
+
+    @staticmethod
+    def _combine_validation(result: Dict[str, Any], review: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "is_safe": review["is_safe"],
+            "analysis": f"{result['analysis']}\n\n{review['analysis']}"
+        }
+
+    def _needs_review(self, result: Dict[str, Any]) -> bool:
+        return result["is_safe"] and settings.SQL_VALIDATION_LLM_REVIEW and bool(self.client)
+
+
+class LLMClient(BaseLLMClient):
+    def _create_client(self, **kwargs):
+        return OpenAI(**kwargs)
+
+    def _create_single_flight(self):
+        return ThreadSingleFlight()
+
     def generate_sql(self, query: str) -> Dict[str, Any]:
         """
-        Generate SQL from a natural language query using function calling
-        
+        Generate SQL from a natural language query using function calling.
+        Successful responses are cached so repeated (or, with the semantic
+        cache enabled, paraphrased) questions skip the LLM call, questions
+        that only differ by literals reuse a validated SQL template, and
+        concurrent calls for the same uncached question share one LLM call.
+
         Args:
             query: Natural language query
-            
+
         Returns:
             Dict containing sql_query, parameters, and explanation
         """
         # If no client is available, return a mock response
         if not self.client:
-            logger.warning("Returning mock SQL response because LLM client is not configured")
-            return {
-                "sql_query": "SELECT * FROM customers LIMIT 5",
-                "parameters": [],
-                "explanation": "This is a mock response due to missing LLM configuration."
-            }
-            
+            return self._mock_sql_response()
+
+        cache_key, cached = self._lookup_cached(query)
+        if cached is not None:
+            return cached
+
+        return dict(self.inflight.do(cache_key, lambda: self._generate_uncached(query, cache_key)))
+
+    def _generate_uncached(self, query: str, cache_key: str) -> Dict[str, Any]:
+        result = self._request_sql(query)
+        self._remember(query, cache_key, result)
+        return result
+
+    def _request_sql(self, query: str) -> Dict[str, Any]:
+        """
+        Ask the LLM to convert a natural language query to SQL
+        """
         try:
             logger.info(f"Generating SQL for query: {query}")
-            
-            messages = [
-                {"role": "system", "content": (
-                    "You are a SQL expert that converts natural language queries into SQL. "
-                    "Use the database schema provided to generate accurate SQL queries. "
-                    "Always use parameterized queries to prevent SQL injection."
-                )},
-                {"role": "user", "content": f"Database schema: {json.dumps(DATABASE_SCHEMA)}\n\nConvert this query to SQL: {query}"}
-            ]
-            
-            # If using LocalAI, we need to handle differently since function calling might 
-            # not be fully supported or might work differently
-            if settings.USE_LOCAL_AI:
-                # We'll use a simpler approach compatible with most LLMs
-                prompt = f"""
-As a SQL expert, convert the following natural language query to a SQL query.
-Use parameterized queries with named parameters to prevent SQL injection.
-
-Database Schema:
-{json.dumps(DATABASE_SCHEMA, indent=2)}
-
-Natural Language Query: {query}
-
-Return your answer in this JSON format:
-{{
-  "sql_query": "SELECT * FROM ... WHERE ... = :param",
-  "parameters": [
-    {{
-      "name": "param",
-      "value": "extracted_value",
-      "type": "string|number|date"
-    }}
-  ],
-  "explanation": "This query retrieves..."
-}}
-"""
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                
-                content = response.choices[0].message.content
-                logger.info(f"Raw LLM Response: {content}")
-                
-                # Extract JSON from the response
-                try:
-                    # Find JSON content between triple backticks if it exists
-                    if "```json" in content:
-                        json_content = content.split("```json")[1].split("```")[0].strip()
-                    elif "```" in content:
-                        json_content = content.split("```")[1].split("```")[0].strip()
-                    else:
-                        # Try to find JSON within the response
-                        start_idx = content.find("{")
-                        end_idx = content.rfind("}") + 1
-                        if start_idx >= 0 and end_idx > start_idx:
-                            json_content = content[start_idx:end_idx]
-                        else:
-                            json_content = content
-                    
-                    result = json.loads(json_content)
-                    
-                    # Ensure result has the expected keys
-                    if "sql_query" not in result:
-                        raise ValueError("Missing sql_query in result")
-                    if "parameters" not in result:
-                        result["parameters"] = []
-                    if "explanation" not in result:
-                        result["explanation"] = "SQL query generated from natural language."
-                    
-                    logger.info(f"Generated SQL: {result['sql_query']}")
-                    return result
-                except Exception as json_err:
-                    logger.error(f"Error parsing JSON response: {str(json_err)}")
-                    return {
-                        "error": f"Failed to parse LLM response: {str(json_err)}",
-                        "raw_response": content
-                    }
-            else:
-                # For OpenAI, use function calling as before
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    tools=[{"type": "function", "function": SQL_FUNCTION_SCHEMA}],
-                    tool_choice={"type": "function", "function": {"name": "generate_sql_query"}}
-                )
-                
-                result = None
-                if response.choices[0].message.tool_calls:
-                    function_call = response.choices[0].message.tool_calls[0]
-                    result = json.loads(function_call.function.arguments)
-                    logger.info(f"Generated SQL: {result['sql_query']}")
-                else:
-                    logger.warning("No function call in response")
-                    return {"error": "Failed to generate SQL query"}
-                    
-                return result
+            response = self.client.chat.completions.create(**self._sql_request(query))
+            return self._parse_sql_response(response)
         except Exception as e:
             logger.error(f"Error generating SQL: {str(e)}")
             return {"error": str(e)}
-    
-    def validate_sql(self, sql: str) -> Dict[str, Any]:
+
+    def generate_sql_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Generate SQL for several natural language queries. Cached queries are
+        answered from the cache and the rest are packed into groups of
+        BATCH_LLM_PACK_SIZE per LLM call where the provider supports
+        function calling.
+
+        Args:
+            queries: Natural language queries
+
+        Returns:
+            One dict per query, in input order, like generate_sql
+        """
+        if not self.client:
+            return [self._mock_sql_response() for _ in queries]
+
+        results, pending = self._lookup_batch(queries)
+        for group in self._pack(pending):
+            answers = self._request_sql_batch([query for _, query, _ in group]) if len(group) > 1 else [None]
+            for (position, query, cache_key), answer in zip(group, answers):
+                if answer is None:
+                    answer = self._request_sql(query)
+                results[position] = answer
+                self._remember(query, cache_key, answer)
+        return results
+
+    def _request_sql_batch(self, queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Ask the LLM to convert several queries to SQL in one call
+        """
+        try:
+            logger.info(f"Generating SQL for {len(queries)} queries in one call")
+            response = self.client.chat.completions.create(**self._batch_sql_request(queries))
+            return self._parse_batch_sql_response(response, len(queries))
+        except Exception as e:
+            logger.error(f"Error generating SQL: {str(e)}")
+            return [{"error": str(e)} for _ in queries]
+
+    def validate_sql(self, sql: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
-        Validate the SQL query for security and correctness
-        
+        Validate the SQL query for security and correctness.
+        The local validator decides; the LLM review only runs as an optional
+        second opinion on queries the local validator accepted.
+
         Args:
             sql: SQL query to validate
-            
+            parameters: Optional list of parameters the query will be bound with
+
         Returns:
             Dict with validation result and issues if any
         """
+        result = validator.validate_sql(sql, parameters)
+        if not self._needs_review(result):
+            return result
+        return self._combine_validation(result, self.review_sql(sql))
+
+    def review_sql(self, sql: str) -> Dict[str, Any]:
+        """
+        Ask the LLM to review the SQL query for security and correctness
+
+        Args:
+            sql: SQL query to review
+
+        Returns:
+            Dict with validation result and the LLM's analysis
+        """
         # If no client is available, return a mock response
         if not self.client:
-            logger.warning("Returning mock validation response because LLM client is not configured")
-            return {
-                "is_safe": True,
-                "analysis": "This is a mock response. No validation was performed."
-            }
-            
+            return self._mock_review_response()
+
         try:
-            messages = [
-                {"role": "system", "content": (
-                    "You are a SQL security expert. Analyze the SQL query for: "
-                    "1. SQL injection vulnerabilities "
-                    "2. Syntax errors "
-                    "3. Potential performance issues "
-                    "4. Data security concerns"
-                )},
-                {"role": "user", "content": f"Validate this SQL query for security and correctness: {sql}"}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-            )
-            
-            analysis = response.choices[0].message.content
-            
-            # Simple heuristic to determine if there are serious issues
-            is_safe = "injection" not in analysis.lower() and "vulnerability" not in analysis.lower()
-            
-            return {
-                "is_safe": is_safe,
-                "analysis": analysis
-            }
+            response = self.client.chat.completions.create(**self._review_request(sql))
+            return self._parse_review_response(response)
+        except Exception as e:
+            logger.error(f"Error validating SQL: {str(e)}")
+            return {"is_safe": False, "analysis": f"Error during validation: {str(e)}"}
+
+
+class AsyncLLMClient(BaseLLMClient):
+    """
+    LLM client built on AsyncOpenAI, so waiting for the provider costs a
+    coroutine instead of a threadpool worker.
+
+    Pass an http_client from app.llm.http_pool.create_http_client to share
+    one keep-alive connection pool; the application keeps a single instance
+    for the whole process (see app.api.deps).
+    """
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        template_cache: Optional[TemplateCache] = None
+    ):
+        self.http_client = http_client
+        super().__init__(cache, semantic_cache, template_cache)
+
+    def _create_client(self, **kwargs):
+        if self.http_client is not None:
+            kwargs["http_client"] = self.http_client
+        return AsyncOpenAI(**kwargs)
+
+    def _create_single_flight(self):
+        return SingleFlight()
+
+    async def generate_sql(self, query: str) -> Dict[str, Any]:
+        """
+        Generate SQL from a natural language query, see LLMClient.generate_sql
+        """
+        if not self.client:
+            return self._mock_sql_response()
+
+        cache_key, cached = self._lookup_cached(query)
+        if cached is not None:
+            return cached
+
+        return dict(await self.inflight.do(cache_key, lambda: self._generate_uncached(query, cache_key)))
+
+    async def _generate_uncached(self, query: str, cache_key: str) -> Dict[str, Any]:
+        result = await self._request_sql(query)
+        self._remember(query, cache_key, result)
+        return result
+
+    async def _request_sql(self, query: str) -> Dict[str, Any]:
+        try:
+            logger.info(f"Generating SQL for query: {query}")
+            response = await self.client.chat.completions.create(**self._sql_request(query))
+            return self._parse_sql_response(response)
+        except Exception as e:
+            logger.error(f"Error generating SQL: {str(e)}")
+            return {"error": str(e)}
+
+    async def generate_sql_batch(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """
+        Generate SQL for several queries, see LLMClient.generate_sql_batch.
+        At most BATCH_CONCURRENCY LLM calls are in flight at once.
+        """
+        if not self.client:
+            return [self._mock_sql_response() for _ in queries]
+
+        results, pending = self._lookup_batch(queries)
+        semaphore = asyncio.Semaphore(max(settings.BATCH_CONCURRENCY, 1))
+
+        async def generate(group: List[Tuple[int, str, str]]) -> None:
+            async with semaphore:
+                answers = await self._request_sql_batch([query for _, query, _ in group]) if len(group) > 1 else [None]
+                for (position, query, cache_key), answer in zip(group, answers):
+                    if answer is None:
+                        answer = await self._request_sql(query)
+                    results[position] = answer
+                    self._remember(query, cache_key, answer)
+
+        await asyncio.gather(*(generate(group) for group in self._pack(pending)))
+        return results
+
+    async def _request_sql_batch(self, queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        try:
+            logger.info(f"Generating SQL for {len(queries)} queries in one call")
+            response = await self.client.chat.completions.create(**self._batch_sql_request(queries))
+            return self._parse_batch_sql_response(response, len(queries))
+        except Exception as e:
+            logger.error(f"Error generating SQL: {str(e)}")
+            return [{"error": str(e)} for _ in queries]
+
+    async def validate_sql(self, sql: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Validate the SQL query, see LLMClient.validate_sql
+        """
+        result = validator.validate_sql(sql, parameters)
+        if not self._needs_review(result):
+            return result
+        return self._combine_validation(result, await self.review_sql(sql))
+
+    async def review_sql(self, sql: str) -> Dict[str, Any]:
+        """
+        Ask the LLM to review the SQL query, see LLMClient.review_sql
+        """
+        if not self.client:
+            return self._mock_review_response()
+
+        try:
+            response = await self.client.chat.completions.create(**self._review_request(sql))
+            return self._parse_review_response(response)
         except Exception as e:
             logger.error(f"Error validating SQL: {str(e)}")
             return {"is_safe": False, "analysis": f"Error during validation: {str(e)}"}
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.close()
+        elif self.http_client is not None:
+            await self.http_client.aclose()
@@ -0,0 +1,349 @@
+import json
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.llm.schema import get_database_schema
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a SQL expert that converts natural language queries into SQL. "
+    "Use the database schema provided to generate accurate SQL queries. "
+    "Always use parameterized queries to prevent SQL injection."
+)
+
+# Answer format for models prompted without function calling
+LOCAL_ANSWER_FORMAT = (
+    'Reply with JSON only: {"sql_query": "SELECT ... WHERE col = :param", '
+    '"parameters": [{"name": "param", "value": "...", "type": "string|number|date"}], '
+    '"explanation": "..."}. For IN (:param) give a list of values.'
+)
+
+# Question words that name a table or column without sharing a word with it
+SYNONYMS = {
+    "client": ["customer"],
+    "buyer": ["customer"],
+    "user": ["customer"],
+    "person": ["customer"],
+    "people": ["customer"],
+    "purchase": ["order"],
+    "sale": ["order"],
+    "transaction": ["order"],
+    "spent": ["amount"],
+    "spend": ["amount"],
+    "revenue": ["amount"],
+    "price": ["amount"],
+    "cost": ["amount"],
+    "value": ["amount"],
+    "when": ["date"],
+    "recent": ["date"],
+    "latest": ["date"],
+    "day": ["date"],
+    "week": ["date"],
+    "month": ["date"],
+    "year": ["date"],
+    "mail": ["email"],
+    "contact": ["email", "phone"],
+    "telephone": ["phone"],
+    "city": ["address"],
+    "location": ["address"],
+    "live": ["address"],
+    "comment": ["note"],
+    "state": ["status"],
+}
+
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "by", "contain", "for", "from", "in", "is", "it", "of",
+    "on", "or", "the", "to", "was", "what", "which", "with", "table", "key",
+    "information", "unique", "identifier", "foreign",
+})
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# "Current status of the order (pending, processing, shipped, delivered)"
+_VALUE_LIST_RE = re.compile(r"\(([^()]*,[^()]*)\)")
+
+
+def stem(word: str) -> str:
+    """
+    Crude suffix stripping so plurals and possessives match their singular
+    """
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """
+    Stemmed words of a text, without stopwords
+    """
+    words = _WORD_RE.findall(text.lower().replace("'s", ""))
+    return [stem(word) for word in words if word not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Number of tokens a text costs; exact with tiktoken installed, otherwise
+    estimated from words and punctuation (about 4 characters per token)
+    """
+    if tiktoken is not None:
+        return len(_encoding().encode(text))
+    pieces = re.findall(r"\w+|[^\w\s]", text)
+    return sum(math.ceil(len(piece) / 4) for piece in pieces)
+
+
+_tiktoken_encoding = None
+
+
+def _encoding():
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
+    return _tiktoken_encoding
+
+
+class SchemaIndex:
+    """
+    Keyword index over a schema description, used to send the LLM only the
+    tables and columns a question is about.
+
+    Table names, column names (split on "_") and description words are
+    indexed after stemming, plus SYNONYMS. Words naming a table only select
+    that table, so "customer" in orders.customer_id doesn't pull orders into
+    every question about customers.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.tables: "OrderedDict[str, Dict[str, Any]]" = OrderedDict(
+            (table["name"], table) for table in schema["tables"]
+        )
+        self.foreign_keys: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for relationship in schema.get("relationships", []):
+            (parent, child), (parent_key, child_key) = relationship["tables"], relationship["keys"]
+            self.foreign_keys[(child, child_key)] = (parent, parent_key)
+
+        self._table_terms: Dict[str, Set[str]] = {}
+        self._column_terms: Dict[str, Set[Tuple[str, str]]] = {}
+        table_words = {stem(name.lower()) for name in self.tables}
+        for name, table in self.tables.items():
+            self._table_terms.setdefault(stem(name.lower()), set()).add(name)
+            for column in table["columns"]:
+                words = set(terms(column["name"].replace("_", " ")) + terms(column.get("description", "")))
+                for word in words - table_words - {"id"}:
+                    self._column_terms.setdefault(word, set()).add((name, column["name"]))
+
+    def select(self, questions: Iterable[str]) -> "OrderedDict[str, List[str]]":
+        """
+        Tables and columns relevant to the questions
+
+        Returns:
+            Table name -> column names, in schema order. A table whose name
+            matched but none of its columns keeps all columns; every table is
+            returned with all columns when nothing matched at all.
+        """
+        tables: Set[str] = set()
+        columns: Dict[str, Set[str]] = {}
+        for question in questions:
+            for word in terms(question):
+                for term in [word] + SYNONYMS.get(word, []):
+                    tables.update(self._table_terms.get(term, ()))
+                    for table, column in self._column_terms.get(term, ()):
+                        tables.add(table)
+                        columns.setdefault(table, set()).add(column)
+
+        if not tables:
+            return OrderedDict(
+                (name, [column["name"] for column in table["columns"]]) for name, table in self.tables.items()
+            )
+
+        selection: "OrderedDict[str, List[str]]" = OrderedDict()
+        for name, table in self.tables.items():
+            if name not in tables:
+                continue
+            if name not in columns:
+                selection[name] = [column["name"] for column in table["columns"]]
+                continue
+            selection[name] = [
+                column["name"] for column in table["columns"]
+                if column["name"] in columns[name] or self._is_key(name, column["name"], tables)
+            ]
+        return selection
+
+    def _is_key(self, table: str, column: str, tables: Set[str]) -> bool:
+        # Primary keys always, foreign keys when the referenced table is selected too
+        if column == "id":
+            return True
+        reference = self.foreign_keys.get((table, column))
+        return reference is not None and reference[0] in tables
+
+
+def column_values(column: Dict[str, Any]) -> List[str]:
+    """
+    Values a column's description lists, e.g. ["pending", "processing", ...]
+    for "Current status of the order (pending, processing, ...)"
+    """
+    values = _VALUE_LIST_RE.search(column.get("description", ""))
+    if not values:
+        return []
+    return [value.strip() for value in values.group(1).split(",") if value.strip()]
+
+
+def compact_schema(schema: Dict[str, Any], selection: Optional[Dict[str, List[str]]] = None) -> str:
+    """
+    Serialize a schema description as compact DDL-like lines, e.g.
+
+        customers(id INTEGER, name STRING) -- Contains customer information
+        orders(id INTEGER, customer_id INTEGER REFERENCES customers(id)) -- ...
+        -- orders.status: pending, processing, shipped, delivered
+
+    Args:
+        schema: Schema description (see app.llm.schema.DATABASE_SCHEMA)
+        selection: Tables and columns to include, all of them when None
+
+    Returns:
+        Schema text for the prompt
+    """
+    index = SchemaIndex(schema)
+    lines = []
+    notes = []
+    for name, table in index.tables.items():
+        if selection is not None and name not in selection:
+            continue
+        definitions = []
+        for column in table["columns"]:
+            if selection is not None and column["name"] not in selection[name]:
+                continue
+            definition = f"{column['name']} {column['type']}"
+            reference = index.foreign_keys.get((name, column["name"]))
+            if reference is not None:
+                definition += f" REFERENCES {reference[0]}({reference[1]})"
+            definitions.append(definition)
+            values = column_values(column)
+            if values:
+                notes.append(f"-- {name}.{column['name']}: {', '.join(values)}")
+        line = f"{name}({', '.join(definitions)})"
+        if table.get("description"):
+            line += f" -- {table['description']}"
+        lines.append(line)
+    return "\n".join(lines + notes)
+
+
+class PromptStats:
+    """
+    Running totals of schema tokens sent and saved against sending the full
+    JSON schema description
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.schema_tokens = 0
+        self.tokens_saved = 0
+
+    def record(self, sent: int, baseline: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.schema_tokens += sent
+            self.tokens_saved += baseline - sent
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "schema_tokens": self.schema_tokens,
+            "tokens_saved": self.tokens_saved,
+            "avg_tokens_saved": self.tokens_saved / self.requests if self.requests else 0.0,
+            "exact_token_counts": tiktoken is not None,
+        }
+
+
+prompt_stats = PromptStats()
+
+_index: Optional[SchemaIndex] = None
+_baseline_tokens: Dict[bool, int] = {}
+
+
+def get_schema_index() -> SchemaIndex:
+    """
+    Index of the current schema, rebuilt when a new snapshot is published
+    """
+    global _index
+    schema = get_database_schema()
+    if _index is None or _index.schema is not schema:
+        _index = SchemaIndex(schema)
+        _baseline_tokens.clear()
+    return _index
+
+
+def schema_context(questions: Iterable[str], local: bool = False) -> str:
+    """
+    Schema text for a prompt about the given questions, pruned to the
+    relevant tables and columns when PROMPT_SCHEMA_PRUNING is enabled.
+    Logs and records the tokens saved against the full JSON schema.
+
+    Args:
+        questions: Natural language questions the prompt is about
+        local: Whether the prompt is for LocalAI, which used to get the
+            schema as indented JSON
+
+    Returns:
+        Compact schema text
+    """
+    index = get_schema_index()
+    selection = index.select(questions) if settings.PROMPT_SCHEMA_PRUNING else None
+    text = compact_schema(index.schema, selection)
+
+    if local not in _baseline_tokens:
+        _baseline_tokens[local] = estimate_tokens(json.dumps(index.schema, indent=2 if local else None))
+    sent = estimate_tokens(text)
+    prompt_stats.record(sent, _baseline_tokens[local])
+    logger.info(f"Schema prompt: {sent} tokens, {_baseline_tokens[local] - sent} saved")
+    return text
+
+
+def sql_messages(query: str) -> List[Dict[str, str]]:
+    """
+    Chat messages asking a function-calling model to convert one query to SQL
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Schema:\n{schema_context([query])}\n\nConvert this query to SQL: {query}"}
+    ]
+
+
+def local_sql_messages(query: str) -> List[Dict[str, str]]:
+    """
+    Chat messages asking a model without function calling for SQL as JSON
+    """
+    prompt = (
+        f"{SYSTEM_PROMPT}\n\nSchema:\n{schema_context([query], local=True)}\n\n"
+        f"Query: {query}\n\n{LOCAL_ANSWER_FORMAT}"
+    )
+    return [{"role": "user", "content": prompt}]
+
+
+def batch_sql_messages(queries: List[str]) -> List[Dict[str, str]]:
+    """
+    Chat messages asking a function-calling model to convert several numbered queries to SQL
+    """
+    numbered = "\n".join(f"{index}. {query}" for index, query in enumerate(queries))
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"Schema:\n{schema_context(queries)}\n\n"
+            f"Convert each of these numbered queries to SQL, answering every number once:\n{numbered}"
+        )}
+    ]
@@ -1,4 +1,7 @@
 # Schema for OpenAI function calling
+import hashlib
+import json
+from typing import Any, Dict, Optional
 
 SQL_FUNCTION_SCHEMA = {
     "name": "generate_sql_query",
@@ -21,8 +24,11 @@ SQL_FUNCTION_SCHEMA = {
                             "description": "Parameter name"
                         },
                         "value": {
-                            "type": "string",
-                            "description": "Parameter value extracted from the query"
+                            "anyOf": [
+                                {"type": "string"},
+                                {"type": "array", "items": {"type": "string"}}
+                            ],
+                            "description": "Parameter value extracted from the query; a list of values for a parameter used as IN (:name)"
                         },
                         "type": {
                             "type": "string",
@@ -42,6 +48,36 @@ SQL_FUNCTION_SCHEMA = {
     }
 }
 
+# Several questions answered in one call; "index" ties each answer to its question
+BATCH_SQL_FUNCTION_SCHEMA = {
+    "name": "generate_sql_queries",
+    "description": "Generates one SQL query for each of several numbered natural language requests",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "queries": {
+                "type": "array",
+                "description": "One entry per request, in any order",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {
+                            "type": "integer",
+                            "description": "Number of the request this query answers"
+                        },
+                        **SQL_FUNCTION_SCHEMA["parameters"]["properties"]
+                    },
+                    "required": ["index"] + SQL_FUNCTION_SCHEMA["parameters"]["required"]
+                }
+            }
+        },
+        "required": ["queries"]
+    }
+}
+
+# Hand-written description of the database. At startup the live database is
+# reflected (see app.db.introspection) and these descriptions are merged into
+# the reflected tables and columns by name.
 DATABASE_SCHEMA = {
     "tables": [
         {
@@ -77,3 +113,100 @@ DATABASE_SCHEMA = {
         }
     ]
 }
+
+
+# Descriptions of the rollup tables (see app.db.rollups). They only exist
+# where rollups are installed, so they are merged into reflected schemas
+# rather than listed in DATABASE_SCHEMA.
+ROLLUP_SCHEMA = {
+    "tables": [
+        {
+            "name": "customer_order_totals",
+            "description": (
+                "Order count and total amount per customer, kept up to date from orders. "
+                "Use it instead of aggregating orders for totals, sales or order counts per customer"
+            ),
+            "columns": [
+                {"name": "customer_id", "type": "INTEGER", "description": "Customer the totals belong to"},
+                {"name": "order_count", "type": "INTEGER", "description": "Number of orders the customer placed"},
+                {"name": "total_amount", "type": "FLOAT", "description": "Sum of the total amounts of the customer's orders"}
+            ]
+        },
+        {
+            "name": "daily_order_status",
+            "description": (
+                "Order count and total amount per day and status, kept up to date from orders. "
+                "Use it instead of aggregating orders for counts or totals per day, month, year or status"
+            ),
+            "columns": [
+                {"name": "order_date", "type": "DATE", "description": "Day the orders were placed"},
+                {"name": "status", "type": "STRING", "description": "Status of the orders"},
+                {"name": "order_count", "type": "INTEGER", "description": "Number of orders placed that day with that status"},
+                {"name": "total_amount", "type": "FLOAT", "description": "Sum of the total amounts of those orders"}
+            ]
+        }
+    ],
+    "relationships": [
+        {
+            "type": "1:1",
+            "description": "Each customer has at most one row of order totals",
+            "tables": ["customers", "customer_order_totals"],
+            "keys": ["id", "customer_id"]
+        }
+    ]
+}
+
+# Descriptions merged into the schema reflected from the live database
+SCHEMA_ANNOTATIONS = {
+    "tables": DATABASE_SCHEMA["tables"] + ROLLUP_SCHEMA["tables"],
+    "relationships": DATABASE_SCHEMA["relationships"] + ROLLUP_SCHEMA["relationships"]
+}
+
+
+# Table entries that don't change the prompt, see schema_digest
+DIGEST_EXCLUDED_KEYS = frozenset({"row_count", "indexes"})
+
+
+def schema_digest(schema: Dict[str, Any]) -> str:
+    """
+    Stable hash of the parts of a schema description the LLM is shown. Row
+    counts and indexes are left out: they never reach the prompt, and a new
+    index (e.g. one created by the index advisor) mustn't flush the caches
+    keyed by the digest.
+    """
+    structure = dict(schema, tables=[
+        {key: value for key, value in table.items() if key not in DIGEST_EXCLUDED_KEYS} for table in schema["tables"]
+    ])
+    payload = json.dumps(structure, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+_current_schema: Dict[str, Any] = DATABASE_SCHEMA
+_current_digest: Optional[str] = None
+
+
+def get_database_schema() -> Dict[str, Any]:
+    """
+    Schema description the LLM prompts and SQL validation use: the latest
+    snapshot of the live database, or DATABASE_SCHEMA before one is taken
+    """
+    return _current_schema
+
+
+def get_schema_digest() -> str:
+    """
+    Digest of the current schema description, part of every SQL cache key
+    """
+    global _current_digest
+    if _current_digest is None:
+        _current_digest = schema_digest(_current_schema)
+    return _current_digest
+
+
+def set_database_schema(schema: Dict[str, Any], digest: Optional[str] = None) -> None:
+    """
+    Publish a new schema description, e.g. after the database's DDL changed
+    """
+    global _current_schema, _current_digest
+    _current_schema = schema
+    _current_digest = digest
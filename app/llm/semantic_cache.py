@@ -0,0 +1,293 @@
+import copy
+import logging
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.llm.cache import normalize_query
+from app.llm.schema import get_database_schema
+from app.llm.template_cache import extract_literals, known_values
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# Words that carry no meaning for SQL generation ("show me all customers"
+# and "list every customer" should embed identically)
+STOPWORDS = frozenset({
+    "a", "an", "the", "me", "us", "my", "our", "please", "can", "could", "you",
+    "would", "i", "we", "want", "to", "see", "show", "list", "display", "get",
+    "give", "find", "fetch", "retrieve", "return", "tell", "what", "which",
+    "are", "is", "there", "all", "every", "each", "of", "in", "for", "and",
+    "than", "with", "that", "who",
+})
+
+SYNONYMS = {
+    "client": "customer",
+    "buyer": "customer",
+    "user": "customer",
+    "purchase": "order",
+    "sale": "order",
+    "cost": "amount",
+    "price": "amount",
+    "value": "amount",
+    "spent": "amount",
+    "above": "greater",
+    "over": "greater",
+    "more": "greater",
+    "exceeding": "greater",
+    "below": "less",
+    "under": "less",
+    "fewer": "less",
+}
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a question into normalized content words
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize_query(text)):
+        if token in STOPWORDS:
+            continue
+        token = _stem(token)
+        tokens.append(SYNONYMS.get(token, token))
+    return tokens
+
+
+def literal_fingerprint(question: str, values: Optional[Dict[str, Tuple[str, str]]] = None) -> int:
+    """
+    Fingerprint of the literals of a question: numbers, dates, quoted
+    strings and the column values the schema lists (see extract_literals).
+
+    Literals are compared exactly instead of being embedded: a hit returns
+    the cached parameters as they are, so "orders over 100" must never reuse
+    the SQL for "orders over 250", nor "pending orders" the SQL for
+    "delivered orders".
+    """
+    literals = sorted(f"{slot.kind}:{slot.value.lower()}" for slot in extract_literals(question, values))
+    return zlib.crc32("\n".join(literals).encode("utf-8"))
+
+
+def embed_text(text: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Embed the words of a question with a signed hashed bag-of-words vectorizer
+
+    Args:
+        text: Natural language question
+        dim: Dimension of the embedding space
+
+    Returns:
+        Tuple of (indices, values) of the non-zero entries of the L2-normalized vector
+    """
+    return _embed_tokens(tokenize(text), dim)
+
+
+def _embed_tokens(tokens: List[str], dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    weights: Dict[int, float] = {}
+    for token in tokens:
+        if token[0].isdigit():
+            continue
+        digest = zlib.crc32(token.encode("utf-8"))
+        index = digest % dim
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        weights[index] = weights.get(index, 0.0) + sign
+
+    indices = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+    values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+    norm = float(np.linalg.norm(values))
+    if norm > 0:
+        values /= norm
+    return indices, values
+
+
+class SemanticCache:
+    """
+    Cache of generated SQL looked up by cosine similarity of question embeddings.
+
+    Vectors are stored column-major (dim x capacity) so a lookup only touches
+    the rows for the handful of non-zero dimensions of the query embedding,
+    which keeps lookups over tens of thousands of entries sub-millisecond.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        dim: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.clock = clock
+        self._vectors = np.zeros((dim, max_entries), dtype=np.float32)
+        self._namespaces = np.full(max_entries, -1, dtype=np.int64)
+        self._literals = np.zeros(max_entries, dtype=np.int64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._values: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._namespace_ids: Dict[str, int] = {}
+        self._next_namespace_id = 0
+        self._schema = None
+        self._known_values: Dict[str, Tuple[str, str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespace_ids:
+            # Namespaces change with the model and schema; forget the ones no
+            # entry is stored under anymore. Ids aren't reused, so an evicted
+            # namespace can't match a later one.
+            live = set(self._namespaces[:self._size].tolist())
+            self._namespace_ids = {
+                name: namespace_id for name, namespace_id in self._namespace_ids.items() if namespace_id in live
+            }
+            self._namespace_ids[namespace] = self._next_namespace_id
+            self._next_namespace_id += 1
+        return self._namespace_ids[namespace]
+
+    def _encode(self, query: str) -> Tuple[np.ndarray, np.ndarray, int]:
+        schema = get_database_schema()
+        if schema is not self._schema:
+            self._known_values = known_values(schema)
+            self._schema = schema
+        indices, values = _embed_tokens(tokenize(query), self.dim)
+        return indices, values, literal_fingerprint(query, self._known_values)
+
+    def _scores(self, indices: np.ndarray, values: np.ndarray, namespace_id: int, literals: int) -> np.ndarray:
+        scores = values @ self._vectors[indices, :self._size]
+        mismatched = (self._namespaces[:self._size] != namespace_id) | (self._literals[:self._size] != literals)
+        scores[mismatched] = -1.0
+        return scores
+
+    def get(self, query: str, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find the cached response for the most similar question
+
+        Args:
+            query: Natural language question
+            namespace: Partition key (model name and schema hash); only entries
+                stored under the same namespace can match
+
+        Returns:
+            Copy of the cached response, or None
+        """
+        indices, values, literals = self._encode(query)
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None or self._size == 0 or indices.size == 0:
+                self.misses += 1
+                return None
+
+            scores = self._scores(indices, values, namespace_id, literals)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._last_used[best] = self.clock()
+            value = copy.deepcopy(self._values[best])
+
+        logger.info(f"Semantic cache hit (similarity {similarity:.3f}) for query: {query}")
+        return value
+
+    def set(self, query: str, value: Dict[str, Any], namespace: str = "") -> None:
+        """
+        Store a response, evicting the least recently used entry when full
+        """
+        indices, values, literals = self._encode(query)
+        if indices.size == 0:
+            return
+        with self._lock:
+            namespace_id = self._namespace_id(namespace)
+
+            # Replace a near-identical question rather than storing it twice
+            slot = None
+            if self._size:
+                scores = self._scores(indices, values, namespace_id, literals)
+                best = int(np.argmax(scores))
+                if scores[best] >= 0.999:
+                    slot = best
+
+            if slot is None:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+
+            self._vectors[:, slot] = 0.0
+            self._vectors[indices, slot] = values
+            self._namespaces[slot] = namespace_id
+            self._literals[slot] = literals
+            self._last_used[slot] = self.clock()
+            self._values[slot] = copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors[:, :self._size] = 0.0
+            self._namespaces[:] = -1
+            self._namespace_ids = {}
+            self._last_used[:] = 0.0
+            self._values = [None] * self.max_entries
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "semantic",
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "llm_calls_saved": self.hits,
+        }
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Get the process-wide semantic cache, or None when it is disabled
+    """
+    global _semantic_cache
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    settings.SEMANTIC_CACHE_THRESHOLD,
+                    settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                    settings.SEMANTIC_CACHE_DIM,
+                )
+    return _semantic_cache
@@ -0,0 +1,388 @@
+import copy
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.binding import BindingError, coerce_date, coerce_number
+from app.llm import validator
+from app.llm.cache import normalize_query
+from app.llm.prompt import column_values
+from app.llm.schema import get_database_schema
+
+logger = logging.getLogger(__name__)
+
+_QUOTED_RE = re.compile(r"""(?<!\w)'([^']+)'(?!\w)|(?<!\w)"([^"]+)"(?!\w)""")
+_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?\b")
+_NUMBER_RE = re.compile(r"(?<![\w.])\$?\d[\d,]*(?:\.\d+)?%?(?![\w])")
+
+# Confidence factors of things that make a template a less certain fit
+AMBIGUOUS_FACTOR = 0.5  # a parameter value matched several literals
+FIXED_FACTOR = 0.9  # a literal isn't a parameter, so the template only fits that exact value
+CONSTANT_FACTOR = 0.95  # a parameter isn't any literal of the question
+
+
+class Slot:
+    """
+    A literal found in a question: its kind ("number", "date", "string", or
+    "value:table.column" for a value listed in the schema), its text and
+    the value a parameter would get for it
+    """
+
+    __slots__ = ("kind", "text", "value", "start", "end")
+
+    def __init__(self, kind: str, text: str, value: str, start: int, end: int):
+        self.kind = kind
+        self.text = text
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+def known_values(schema: Dict[str, Any]) -> Dict[str, Tuple[str, str]]:
+    """
+    Values listed in column descriptions (e.g. order statuses)
+
+    Returns:
+        Lowercased value -> (value as listed, "table.column")
+    """
+    values: Dict[str, Tuple[str, str]] = {}
+    for table in schema["tables"]:
+        for column in table["columns"]:
+            for value in column_values(column):
+                values.setdefault(value.lower(), (value, f"{table['name']}.{column['name']}"))
+    return values
+
+
+def extract_literals(question: str, values: Optional[Dict[str, Tuple[str, str]]] = None) -> List[Slot]:
+    """
+    Find the literals of a question: quoted strings, ISO dates, numbers and
+    values the schema lists for a column
+
+    Args:
+        question: Natural language question
+        values: Known column values, see known_values
+
+    Returns:
+        Slots in the order they appear in the question
+    """
+    slots: List[Slot] = []
+    taken = [False] * len(question)
+
+    def add(kind: str, match: "re.Match", value: str, group: int = 0) -> None:
+        start, end = match.span()
+        if any(taken[start:end]):
+            return
+        taken[start:end] = [True] * (end - start)
+        slots.append(Slot(kind, match.group(group), value, start, end))
+
+    for match in _QUOTED_RE.finditer(question):
+        group = 1 if match.group(1) is not None else 2
+        add("string", match, match.group(group), group)
+    for match in _DATE_RE.finditer(question):
+        try:
+            coerce_date(match.group(0))
+        except BindingError:
+            continue
+        add("date", match, match.group(0))
+    for match in _NUMBER_RE.finditer(question):
+        add("number", match, match.group(0).lstrip("$").rstrip("%").replace(",", ""))
+    if values:
+        pattern = r"\b(" + "|".join(re.escape(value) for value in sorted(values, key=len, reverse=True)) + r")\b"
+        for match in re.finditer(pattern, question, re.IGNORECASE):
+            listed, column = values[match.group(0).lower()]
+            add(f"value:{column}", match, listed)
+
+    slots.sort(key=lambda slot: slot.start)
+    return slots
+
+
+def question_shape(question: str, slots: List[Slot]) -> str:
+    """
+    The question with each literal replaced by its kind, e.g.
+    "orders over <number> placed after <date>"
+    """
+    pieces = []
+    position = 0
+    for slot in slots:
+        pieces.append(question[position:slot.start])
+        pieces.append(f"<{slot.kind}>")
+        position = slot.end
+    pieces.append(question[position:])
+    return normalize_query("".join(pieces))
+
+
+def _same_value(slot: Slot, value: Any, param_type: str) -> bool:
+    if param_type == "number" or (slot.kind == "number" and param_type != "date"):
+        if slot.kind != "number":
+            return False
+        try:
+            return coerce_number(value) == coerce_number(slot.value)
+        except BindingError:
+            return False
+    if param_type == "date" or slot.kind == "date":
+        if slot.kind != "date":
+            return False
+        try:
+            return coerce_date(value) == coerce_date(slot.value)
+        except BindingError:
+            return False
+    return str(value).lower() == slot.value.lower()
+
+
+def _bind_string(slots: List[Slot], value: Any, used: set) -> Optional[Dict[str, Any]]:
+    # A LIKE pattern around a literal, e.g. "%smith%" for 'Smith'
+    text_value = str(value)
+    for index, slot in enumerate(slots):
+        if slot.kind == "number" or slot.kind == "date" or index in used:
+            continue
+        position = text_value.lower().find(slot.value.lower())
+        if position < 0:
+            continue
+        prefix, suffix = text_value[:position], text_value[position + len(slot.value):]
+        if set(prefix + suffix) <= {"%"}:
+            return {"slot": index, "prefix": prefix, "suffix": suffix}
+    return None
+
+
+class Template:
+    """
+    Validated SQL generated for one question, with each parameter tied to
+    the question literal it came from
+    """
+
+    def __init__(
+        self,
+        result: Dict[str, Any],
+        slots: List[Slot],
+        bindings: List[Optional[Dict[str, Any]]],
+        bound: set,
+        confidence: float
+    ):
+        self.result = result
+        self.values = [slot.value for slot in slots]
+        self.bindings = bindings
+        # Literals baked into the SQL: the template only fits questions with the same values
+        self.fixed = {index: slot.value.lower() for index, slot in enumerate(slots) if index not in bound}
+        self.confidence = confidence
+
+    def fill(self, slots: List[Slot]) -> Dict[str, Any]:
+        """
+        The template's response with parameter values taken from another
+        question of the same shape
+        """
+        result = copy.deepcopy(self.result)
+        for parameter, binding in zip(result["parameters"], self.bindings):
+            if binding is None:
+                continue
+            if "slots" in binding:
+                parameter["value"] = [slots[index].value for index in binding["slots"]]
+            else:
+                parameter["value"] = f"{binding['prefix']}{slots[binding['slot']].value}{binding['suffix']}"
+
+        explanation = result.get("explanation", "")
+        for old, slot in zip(self.values, slots):
+            if old != slot.value:
+                explanation = re.sub(rf"(?<!\w){re.escape(old)}(?!\w)", lambda _: slot.value, explanation, flags=re.IGNORECASE)
+        result["explanation"] = explanation
+        return result
+
+
+def build_template(slots: List[Slot], result: Dict[str, Any]) -> Optional[Template]:
+    """
+    Tie each parameter of a generated response to a literal of the question
+
+    Returns:
+        The template, or None when no parameter came from a literal (the
+        exact cache already covers that question)
+    """
+    bindings: List[Optional[Dict[str, Any]]] = []
+    used: set = set()
+    confidence = 1.0
+    for parameter in result.get("parameters", []):
+        value, param_type = parameter.get("value"), parameter.get("type", "string")
+        if isinstance(value, (list, tuple)):
+            indices = []
+            for item in value:
+                matches = [i for i, slot in enumerate(slots) if i not in used and _same_value(slot, item, param_type)]
+                if not matches:
+                    break
+                indices.append(matches[0])
+                used.add(matches[0])
+            if len(indices) == len(value) and indices:
+                bindings.append({"slots": indices})
+            else:
+                used.difference_update(indices)
+                bindings.append(None)
+                confidence *= CONSTANT_FACTOR
+            continue
+
+        matches = [i for i, slot in enumerate(slots) if _same_value(slot, value, param_type)]
+        if matches:
+            candidates = [i for i in matches if i not in used] or matches
+            if len(candidates) > 1:
+                confidence *= AMBIGUOUS_FACTOR
+            bindings.append({"slot": candidates[0], "prefix": "", "suffix": ""})
+            used.add(candidates[0])
+            continue
+
+        binding = _bind_string(slots, value, used) if param_type == "string" else None
+        if binding is not None:
+            used.add(binding["slot"])
+        else:
+            confidence *= CONSTANT_FACTOR
+        bindings.append(binding)
+
+    if not used:
+        return None
+    confidence *= FIXED_FACTOR ** (len(slots) - len(used))
+    return Template(copy.deepcopy(result), slots, bindings, used, confidence)
+
+
+class TemplateCache:
+    """
+    Validated SQL templates looked up by question shape, so questions that
+    only differ by literals ("orders over $100" and "orders over $250")
+    reuse the generated SQL with the new values bound instead of calling
+    the LLM.
+
+    A template's confidence drops for every parameter that matched several
+    literals, literal kept in the SQL and parameter not found in the
+    question; below `min_confidence` the LLM is asked instead.
+    """
+
+    def __init__(self, min_confidence: float, max_entries: int):
+        self.min_confidence = min_confidence
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Template]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema = None
+        self._values: Dict[str, Tuple[str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.low_confidence = 0
+        self.learned = 0
+        self.evictions = 0
+
+    def _parse(self, query: str) -> Tuple[str, List[Slot]]:
+        schema = get_database_schema()
+        if schema is not self._schema:
+            self._values = known_values(schema)
+            self._schema = schema
+        slots = extract_literals(query, self._values)
+        return question_shape(query, slots), slots
+
+    def get(self, query: str, namespace: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Fill the template of a question with the same shape
+
+        Args:
+            query: Natural language question
+            namespace: Partition key (model name and schema hash)
+
+        Returns:
+            Response with the question's values bound, or None when there is
+            no template or it isn't a confident fit
+        """
+        shape, slots = self._parse(query)
+        with self._lock:
+            template = self._entries.get((namespace, shape))
+            if template is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, shape))
+
+        confidence = template.confidence
+        if any(slots[index].value.lower() != value for index, value in template.fixed.items()):
+            confidence = 0.0
+        if confidence < self.min_confidence:
+            with self._lock:
+                self.low_confidence += 1
+                self.misses += 1
+            logger.info(f"Template for '{shape}' not used, confidence {confidence:.2f}")
+            return None
+
+        result = template.fill(slots)
+        with self._lock:
+            self.hits += 1
+        logger.info(f"Template cache hit (confidence {confidence:.2f}) for query: {query}")
+        return result
+
+    def learn(self, query: str, result: Dict[str, Any], namespace: str = "") -> bool:
+        """
+        Store the SQL generated for a question as a template, if it validates
+        and at least one parameter came from a literal of the question
+
+        Returns:
+            Whether a template was stored
+        """
+        if "error" in result or not result.get("parameters"):
+            return False
+        shape, slots = self._parse(query)
+        if not slots:
+            return False
+        template = build_template(slots, result)
+        if template is None:
+            return False
+        if not validator.validate_sql(result["sql_query"], result["parameters"])["is_safe"]:
+            return False
+
+        with self._lock:
+            self._entries[(namespace, shape)] = template
+            self._entries.move_to_end((namespace, shape))
+            self.learned += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.low_confidence = 0
+            self.learned = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "template",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "min_confidence": self.min_confidence,
+            "hits": self.hits,
+            "misses": self.misses,
+            "low_confidence": self.low_confidence,
+            "learned": self.learned,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "llm_calls_saved": self.hits,
+        }
+
+
+_template_cache: Optional[TemplateCache] = None
+_template_cache_lock = threading.Lock()
+
+
+def get_template_cache() -> Optional[TemplateCache]:
+    """
+    Get the process-wide template cache, or None when it is disabled
+    """
+    global _template_cache
+    if not settings.TEMPLATE_CACHE_ENABLED:
+        return None
+    if _template_cache is None:
+        with _template_cache_lock:
+            if _template_cache is None:
+                _template_cache = TemplateCache(
+                    settings.TEMPLATE_CACHE_MIN_CONFIDENCE,
+                    settings.TEMPLATE_CACHE_MAX_ENTRIES,
+                )
+    return _template_cache
@@ -0,0 +1,348 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from app.llm.schema import get_database_schema
+
+logger = logging.getLogger(__name__)
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)
+  | (?P<param>:[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<positional>\?\d*|[@$][A-Za-z0-9_]+)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op>\|\||<>|!=|<=|>=|==|::|[-+*/%<>=(),.;|&~])
+""", re.VERBOSE | re.DOTALL)
+
+KEYWORDS = frozenset({
+    "select", "distinct", "all", "from", "where", "and", "or", "not", "in", "is",
+    "null", "like", "glob", "between", "exists", "as", "on", "join", "inner",
+    "left", "right", "full", "outer", "cross", "natural", "using", "group", "by",
+    "having", "order", "asc", "desc", "nulls", "first", "last", "limit", "offset",
+    "union", "intersect", "except", "case", "when", "then", "else", "end", "with",
+    "recursive", "cast", "collate", "escape", "true", "false", "current_date",
+    "current_time", "current_timestamp", "filter", "over", "partition", "rows",
+    "range", "preceding", "following", "unbounded", "current", "row", "window",
+    "integer", "int", "real", "text", "float", "numeric", "date", "varchar",
+    "interval", "day", "days", "month", "months", "year", "years",
+})
+
+FORBIDDEN_KEYWORDS = frozenset({
+    "insert", "update", "delete", "replace", "merge", "upsert", "drop", "create",
+    "alter", "truncate", "rename", "attach", "detach", "pragma", "vacuum",
+    "reindex", "analyze", "grant", "revoke", "begin", "commit", "rollback",
+    "savepoint", "release", "copy", "load_extension", "into", "exec", "execute",
+    "call", "lock",
+})
+
+
+# Functions whose string arguments are formats or modifiers rather than data
+FORMAT_FUNCTIONS = frozenset({
+    "strftime", "date", "datetime", "time", "julianday", "unixepoch",
+    "to_char", "to_date", "to_timestamp", "date_trunc", "date_part",
+})
+
+# Functions that take FROM inside their argument list
+FROM_FUNCTIONS = frozenset({"extract", "substring", "trim", "overlay", "position"})
+
+
+class SQLValidationError(ValueError):
+    pass
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    Split SQL into tokens, dropping whitespace and comments
+
+    Raises:
+        SQLValidationError: If the SQL contains characters that aren't valid SQL
+    """
+    tokens = []
+    position = 0
+    while position < len(sql):
+        match = _TOKEN_RE.match(sql, position)
+        if match is None:
+            raise SQLValidationError(f"Unexpected character {sql[position]!r} at position {position}")
+        kind = match.lastgroup
+        if kind == "comment":
+            raise SQLValidationError("SQL comments are not allowed")
+        if kind != "ws":
+            tokens.append(Token(kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+def _enclosing_calls(tokens: List[Token]) -> List[Optional[str]]:
+    """
+    For each token, the lowercased name of the innermost function call it is an argument of
+    """
+    stack: List[Optional[str]] = []
+    callers = []
+    for index, token in enumerate(tokens):
+        if token.value == ")" and stack:
+            stack.pop()
+        callers.append(stack[-1] if stack else None)
+        if token.value == "(":
+            previous = tokens[index - 1] if index else None
+            stack.append(previous.value.lower() if previous is not None and previous.kind == "ident" else None)
+    return callers
+
+
+def _opens_subquery(tokens: List[Token], close_index: int) -> bool:
+    """
+    Whether the parenthesis closed at close_index wraps a SELECT
+    """
+    depth = 0
+    for index in range(close_index, -1, -1):
+        if tokens[index].value == ")":
+            depth += 1
+        elif tokens[index].value == "(":
+            depth -= 1
+            if depth == 0:
+                return index + 1 < len(tokens) and tokens[index + 1].value.lower() in ("select", "with")
+    return False
+
+
+def _identifier(token: Token) -> Optional[str]:
+    if token.kind == "ident":
+        return token.value.lower()
+    if token.kind == "quoted":
+        return token.value[1:-1].lower()
+    return None
+
+
+def schema_columns(schema: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """
+    Map each table in the schema description to its set of column names
+    """
+    return {
+        table["name"].lower(): {column["name"].lower() for column in table["columns"]}
+        for table in schema["tables"]
+    }
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    """
+    Names of the tables that follow FROM or JOIN in a SQL statement
+    """
+    try:
+        tokens = tokenize(sql)
+    except SQLValidationError:
+        return set()
+    tables = set()
+    for index, token in enumerate(tokens):
+        if token.kind != "ident" or token.value.lower() not in ("from", "join"):
+            continue
+        position = index + 1
+        while position < len(tokens):
+            name = _identifier(tokens[position])
+            if name is None:
+                break
+            tables.add(name)
+            # Skip an optional alias and continue through comma separated tables
+            position += 1
+            while position < len(tokens) and tokens[position].value not in (",", "(", ")") and \
+                    (tokens[position].value.lower() == "as" or _identifier(tokens[position]) is not None) and \
+                    tokens[position].value.lower() not in KEYWORDS - {"as"}:
+                position += 1
+            if token.value.lower() != "from" or position >= len(tokens) or tokens[position].value != ",":
+                break
+            position += 1
+    return tables
+
+
+class SQLValidator:
+    """
+    Deterministic validator for LLM generated SQL.
+
+    Enforces that the query is a single read-only SELECT that only touches
+    tables and columns from the schema description and takes every value
+    through bound parameters.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        self.schema = schema or get_database_schema()
+        self.columns = schema_columns(self.schema)
+        self.all_columns = set().union(*self.columns.values()) if self.columns else set()
+
+    def validate(self, sql: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Validate the SQL query
+
+        Args:
+            sql: SQL query to validate
+            parameters: Optional list of parameters the query will be bound with
+
+        Returns:
+            Dict with is_safe and analysis
+        """
+        try:
+            issues = self._check(sql, parameters)
+        except SQLValidationError as e:
+            issues = [str(e)]
+
+        if issues:
+            return {"is_safe": False, "analysis": "Local validation failed: " + "; ".join(issues)}
+        return {"is_safe": True, "analysis": "Local validation passed: single read-only SELECT over known tables and columns."}
+
+    def _check(self, sql: str, parameters: Optional[List[Dict[str, Any]]]) -> List[str]:
+        tokens = tokenize(sql)
+        while tokens and tokens[-1].value == ";":
+            tokens.pop()
+        if not tokens:
+            return ["Empty query"]
+
+        issues = []
+        if any(token.value == ";" for token in tokens):
+            issues.append("Only a single statement is allowed")
+
+        first = tokens[0].value.lower()
+        if first not in ("select", "with"):
+            issues.append(f"Only SELECT statements are allowed, got {tokens[0].value.upper()}")
+
+        callers = _enclosing_calls(tokens)
+        for index, token in enumerate(tokens):
+            is_call = index + 1 < len(tokens) and tokens[index + 1].value == "("
+            if token.kind == "ident" and token.value.lower() in FORBIDDEN_KEYWORDS and \
+                    not (token.value.lower() == "replace" and is_call):
+                issues.append(f"Forbidden keyword {token.value.upper()}")
+            elif token.kind == "string" and not self._allowed_literal(token, callers[index]):
+                issues.append(f"String literal {token.value} must be passed as a bound parameter")
+            elif token.kind == "positional":
+                issues.append(f"Only named parameters (:name) are allowed, got {token.value}")
+
+        issues.extend(self._check_identifiers(tokens, callers))
+        issues.extend(self._check_parameters(tokens, parameters))
+        return _unique(issues)
+
+    @staticmethod
+    def _allowed_literal(token: Token, caller: Optional[str]) -> bool:
+        # Format strings and modifiers of date functions ('%Y-%m', 'now', '-7 days')
+        # and bare LIKE wildcards can't carry user data
+        if caller in FORMAT_FUNCTIONS:
+            return True
+        return set(token.value[1:-1]) <= {"%", "_"}
+
+    def _check_identifiers(self, tokens: List[Token], callers: List[Optional[str]]) -> List[str]:
+        issues = []
+        aliases: Dict[str, str] = {}
+        derived: Set[str] = set()
+        ctes: Set[str] = set()
+        output_aliases: Set[str] = set()
+        declared: Set[int] = set()
+
+        def is_name(index: int) -> bool:
+            return index < len(tokens) and _identifier(tokens[index]) is not None and \
+                not (tokens[index].kind == "ident" and tokens[index].value.lower() in KEYWORDS)
+
+        # First pass: collect tables, table aliases, CTE and subquery names and
+        # column aliases, remembering the positions where they are declared.
+        # Only schema tables and CTEs can be read by name; a subquery alias
+        # only qualifies columns, so "(SELECT 1) AS secrets JOIN secrets"
+        # can't reach a table outside the schema
+        for index, token in enumerate(tokens):
+            value = token.value.lower()
+            if token.kind == "ident" and value in ("from", "join") and callers[index] not in FROM_FUNCTIONS:
+                position = index + 1
+                while is_name(position):
+                    name = _identifier(tokens[position])
+                    declared.add(position)
+                    if name not in self.columns and name not in ctes:
+                        issues.append(f"Unknown table {name}")
+                    aliases[name] = name
+                    position += 1
+                    if position < len(tokens) and tokens[position].value.lower() == "as":
+                        position += 1
+                    if is_name(position):
+                        aliases[_identifier(tokens[position])] = name
+                        declared.add(position)
+                        position += 1
+                    if value == "from" and position < len(tokens) and tokens[position].value == ",":
+                        position += 1
+                        continue
+                    break
+            elif token.value == ")" and _opens_subquery(tokens, index):
+                position = index + 1
+                if position < len(tokens) and tokens[position].value.lower() == "as":
+                    position += 1
+                if is_name(position):
+                    derived.add(_identifier(tokens[position]))
+                    declared.add(position)
+            elif is_name(index) and index + 2 < len(tokens) and \
+                    tokens[index + 1].value.lower() == "as" and tokens[index + 2].value == "(":
+                derived.add(_identifier(token))
+                ctes.add(_identifier(token))
+                declared.add(index)
+            elif value == "as" and token.kind == "ident" and is_name(index + 1) and index + 1 not in declared:
+                output_aliases.add(_identifier(tokens[index + 1]))
+                declared.add(index + 1)
+
+        for alias, table in aliases.items():
+            if table in derived:
+                derived.add(alias)
+
+        # Second pass: every other identifier must be a column of a known table
+        for index, token in enumerate(tokens):
+            if index in declared or not is_name(index):
+                continue
+            name = _identifier(token)
+            if name in FORBIDDEN_KEYWORDS:
+                continue
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            previous = tokens[index - 1] if index else None
+
+            if following is not None and following.value == "(":
+                continue  # function call
+            if following is not None and following.value == ".":
+                if name not in aliases and name not in derived:
+                    issues.append(f"Unknown table or alias {name}")
+                continue
+            if previous is not None and previous.value == "." and index >= 2:
+                qualifier = _identifier(tokens[index - 2])
+                table = aliases.get(qualifier or "")
+                if qualifier in derived or table is None or table in derived:
+                    continue
+                if name not in self.columns.get(table, set()):
+                    issues.append(f"Unknown column {qualifier}.{name}")
+                continue
+            if name in self.all_columns or name in output_aliases or name in derived:
+                continue
+            issues.append(f"Unknown column {name}")
+        return issues
+
+    @staticmethod
+    def _check_parameters(tokens: List[Token], parameters: Optional[List[Dict[str, Any]]]) -> List[str]:
+        if parameters is None:
+            return []
+        placeholders = {token.value[1:] for token in tokens if token.kind == "param"}
+        provided = {param["name"] for param in parameters}
+        issues = [f"Missing value for parameter :{name}" for name in sorted(placeholders - provided)]
+        issues.extend(f"Parameter {name} is not used in the query" for name in sorted(provided - placeholders))
+        return issues
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+
+_validator: Optional[SQLValidator] = None
+
+
+def validate_sql(sql: str, parameters: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Validate SQL with the validator for the current schema
+    """
+    global _validator
+    if _validator is None or _validator.schema is not get_database_schema():
+        _validator = SQLValidator()
+    return _validator.validate(sql, parameters)
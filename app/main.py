@@ -1,18 +1,53 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.deps import open_async_llm_client, close_async_llm_client
 from app.api.routes import api_router
 from app.core.config import settings
+from app.db.base import engine
+from app.db.index_advisor import get_index_advisor
+from app.db.introspection import SchemaWatcher
+from app.db.rollups import install_rollups_on
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared LLM connection pool once and close it cleanly on shutdown
+    open_async_llm_client()
+    # Summary tables go in before the schema is reflected, so it lists them
+    if settings.ROLLUPS_ENABLED:
+        try:
+            await asyncio.to_thread(install_rollups_on, engine)
+        except Exception as e:
+            logger.error(f"Installing the rollup tables failed: {str(e)}")
+    # Describe the schema from the live database and follow its DDL changes
+    schema_watcher = None
+    if settings.SCHEMA_INTROSPECTION:
+        schema_watcher = SchemaWatcher(engine, settings.SCHEMA_REFRESH_INTERVAL)
+        await schema_watcher.start()
+    # Analyze slow queries in the background, creating the recommended
+    # indexes when opted in
+    index_advisor = get_index_advisor()
+    if index_advisor is not None:
+        await index_advisor.start(engine, settings.INDEX_ADVISOR_INTERVAL, settings.INDEX_ADVISOR_AUTO_CREATE)
+    yield
+    if index_advisor is not None:
+        await index_advisor.stop()
+    if schema_watcher is not None:
+        await schema_watcher.stop()
+    await close_async_llm_client()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.PROJECT_VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmark sustained requests/second of POST /api/v1/query/process on the
+previous sync pipeline (def route, OpenAI, sync Session) against the async
+pipeline (async def route, AsyncOpenAI, AsyncSession).
+
+The LLM provider is replaced by an in-process stand-in that waits
+--llm-latency seconds per chat completion, so the numbers show how many
+concurrent LLM waits each pipeline can hold rather than provider speed.
+The SQL, semantic, template and result caches are turned off and every
+request asks a distinct question, so each request reaches the stand-in; the
+number of LLM calls is reported per pipeline and a run that made fewer calls
+than it served requests fails the benchmark.
+
+Usage:
+    python -m benchmarks.bench_async_pipeline --concurrency 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.deps import get_async_llm_client
+from app.api.routes.query import QueryRequest, QueryResponse
+from app.core.config import settings
+from app.db.base import get_async_db, get_async_database_url
+from app.db.init_db import init_db
+from app.db.query import QueryExecutor
+from app.llm.openai_client import AsyncLLMClient, LLMClient
+from app.main import app as async_app
+
+SQL_RESPONSE = json.dumps({
+    "sql_query": "SELECT * FROM customers WHERE id = :customer_id",
+    "parameters": [{"name": "customer_id", "value": "1", "type": "number"}],
+    "explanation": "Retrieves the customer with ID 1."
+})
+
+
+_llm_calls = 0
+_llm_calls_lock = threading.Lock()
+
+
+def _completion() -> SimpleNamespace:
+    global _llm_calls
+    with _llm_calls_lock:
+        _llm_calls += 1
+    tool_call = SimpleNamespace(function=SimpleNamespace(arguments=SQL_RESPONSE))
+    message = SimpleNamespace(tool_calls=[tool_call], content="The query is safe.")
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeOpenAI:
+    """Blocking stand-in for openai.OpenAI"""
+    def __init__(self, latency: float):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.latency = latency
+
+    def _create(self, **kwargs):
+        time.sleep(self.latency)
+        return _completion()
+
+
+class FakeAsyncOpenAI:
+    """Non-blocking stand-in for openai.AsyncOpenAI"""
+    def __init__(self, latency: float):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.latency = latency
+
+    async def _create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _completion()
+
+    async def close(self):
+        pass
+
+
+class BenchmarkLLMClient(LLMClient):
+    latency = 0.0
+
+    def _create_client(self, **kwargs):
+        return FakeOpenAI(self.latency)
+
+
+class BenchmarkAsyncLLMClient(AsyncLLMClient):
+    latency = 0.0
+
+    def _create_client(self, **kwargs):
+        return FakeAsyncOpenAI(self.latency)
+
+
+def build_sync_app(database_url: str) -> FastAPI:
+    """The /query/process pipeline as it was before the async rewrite"""
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    app = FastAPI()
+
+    @app.post("/api/v1/query/process", response_model=QueryResponse)
+    def process_query(request: QueryRequest) -> Dict[str, Any]:
+        llm_client = BenchmarkLLMClient()
+        db = SessionLocal()
+        try:
+            llm_response = llm_client.generate_sql(request.query)
+            if "error" in llm_response:
+                raise HTTPException(status_code=400, detail=llm_response["error"])
+            validation = llm_client.validate_sql(llm_response["sql_query"], llm_response["parameters"])
+            if not validation["is_safe"]:
+                raise HTTPException(status_code=400, detail=validation["analysis"])
+            results = QueryExecutor(db).execute_query(llm_response["sql_query"], llm_response["parameters"])
+            if not results["success"]:
+                raise HTTPException(status_code=400, detail=results["error"])
+            return {**llm_response, "results": results}
+        finally:
+            db.close()
+
+    return app
+
+
+def build_async_app(database_url: str) -> FastAPI:
+    """The application's async pipeline with the provider and database swapped out"""
+    engine = create_async_engine(get_async_database_url(database_url))
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_benchmark_db():
+        async with SessionLocal() as session:
+            yield session
+
+    def get_benchmark_llm_client():
+        return BenchmarkAsyncLLMClient()
+
+    async_app.dependency_overrides[get_async_db] = get_benchmark_db
+    async_app.dependency_overrides[get_async_llm_client] = get_benchmark_llm_client
+    return async_app
+
+
+async def drive(app: FastAPI, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    global _llm_calls
+    _llm_calls = 0
+    latencies: List[float] = []
+    errors = 0
+    counter = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors, counter
+            while time.perf_counter() < deadline:
+                counter += 1
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/query/process",
+                    json={"query": f"Show me customer number {counter}"}
+                )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "llm_calls": _llm_calls,
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per pipeline")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per simulated LLM call")
+    parser.add_argument("--llm-review", action="store_true", help="also make the LLM validation call")
+    args = parser.parse_args()
+
+    # Per-request INFO logs would dominate the measurement
+    logging.disable(logging.INFO)
+
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-benchmark"
+    settings.USE_LOCAL_AI = False
+    settings.SQL_VALIDATION_LLM_REVIEW = args.llm_review
+    # Cache hits would skip the LLM wait, and the async run would reuse what
+    # the sync run cached
+    settings.SQL_CACHE_BACKEND = "none"
+    settings.SEMANTIC_CACHE_ENABLED = False
+    settings.TEMPLATE_CACHE_ENABLED = False
+    settings.RESULT_CACHE_ENABLED = False
+    BenchmarkLLMClient.latency = BenchmarkAsyncLLMClient.latency = args.llm_latency
+
+    status = 0
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine(database_url)
+        session = sessionmaker(bind=engine)()
+        init_db(session, engine)
+        session.close()
+
+        for name, app in (
+            ("sync", build_sync_app(database_url)),
+            ("async", build_async_app(database_url)),
+        ):
+            result = asyncio.run(drive(app, args.concurrency, args.duration))
+            print(
+                f"{name:>5}: {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                f"p99 {result['p99_ms']:7.1f} ms  ({result['requests']} requests, {result['errors']} errors, "
+                f"{result['llm_calls']} LLM calls)"
+            )
+            if result["llm_calls"] < result["requests"] - result["errors"]:
+                print(f"{name:>5}: fewer LLM calls than answered requests, a cache was hit", file=sys.stderr)
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmark QueryExecutor.execute_query and the serialization of its results
+on customers/orders databases of 10k, 1M and 10M orders.
+
+For every database size and representative generated query (filtered
+scans, a join, aggregates and top-N queries) the query is executed and its
+results serialized the way /query/process returns them: as JSON in the
+"rows" and "columns" formats (pydantic validation, jsonable_encoder and the
+JSONResponse body) and as an Arrow IPC stream when pyarrow is installed.
+
+Databases are generated once into --data-dir with the init_db bulk loader
+(app.db.synthetic) and reused by later runs.
+Results are written as JSON named after the current commit, so runs can be
+compared across commits:
+
+    python -m benchmarks.bench_query_executor --sizes 10k,1m
+    python -m benchmarks.bench_query_executor --sizes 10k,1m --compare benchmarks/results/query_executor-abc1234.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.query import QueryResponse
+from app.core.config import settings
+from app.db.base import create_database_engine
+from app.db.limits import QueryBudget
+from app.db.query import QueryExecutor, arrow_available, encode_arrow_ipc
+from app.db.synthetic import bulk_load
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Fixed reference day, so every generated database has the same contents
+TODAY = datetime.date(2024, 6, 30)
+
+# (name, SQL, parameters) of queries like the ones the LLM generates
+QUERIES: List[Tuple[str, str, List[Dict[str, Any]]]] = [
+    ("scan_filter", "SELECT * FROM orders WHERE customer_id = :customer_id",
+     [{"name": "customer_id", "value": "42", "type": "number"}]),
+    ("scan_range", "SELECT id, customer_id, order_date, total_amount FROM orders WHERE total_amount > :amount",
+     [{"name": "amount", "value": "495", "type": "number"}]),
+    ("join_recent",
+     "SELECT c.name, c.email, o.id, o.order_date, o.total_amount FROM orders o "
+     "JOIN customers c ON c.id = o.customer_id WHERE o.status = :status AND o.order_date >= :since",
+     [{"name": "status", "value": "shipped", "type": "string"},
+      {"name": "since", "value": (TODAY - datetime.timedelta(days=3)).isoformat(), "type": "date"}]),
+    ("aggregate_status", "SELECT status, COUNT(*) AS orders, SUM(total_amount) AS total FROM orders GROUP BY status", []),
+    ("aggregate_top_customers",
+     "SELECT c.id, c.name, SUM(o.total_amount) AS total_spent FROM customers c "
+     "JOIN orders o ON o.customer_id = c.id GROUP BY c.id, c.name ORDER BY total_spent DESC LIMIT 10", []),
+    ("top_n", "SELECT * FROM orders ORDER BY total_amount DESC LIMIT 100", []),
+]
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().lower()
+    if size in SIZES:
+        return SIZES[size]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(size[-1:], 1)
+    return int(float(size.rstrip("km")) * multiplier)
+
+
+def build_database(path: str, orders: int, seed: int = 0) -> str:
+    """
+    Generate a database with `orders` orders and a tenth as many customers
+    with the init_db bulk loader, or reuse the one already at `path`
+
+    Returns:
+        The database URL
+    """
+    database_url = f"sqlite:///{path}"
+    engine = create_database_engine(database_url)
+    try:
+        if os.path.exists(path):
+            with engine.connect() as connection:
+                try:
+                    if connection.execute(text("SELECT max(rowid) FROM orders")).scalar() == orders:
+                        return database_url
+                except sqlalchemy.exc.OperationalError:
+                    pass
+
+        started = time.perf_counter()
+        bulk_load(engine, max(orders // 10, 100), orders, seed=seed, today=TODAY, replace=True)
+        print(f"Generated {orders} orders in {time.perf_counter() - started:.1f}s at {path}")
+    finally:
+        engine.dispose()
+    return database_url
+
+
+def _timings(samples: List[float]) -> Dict[str, float]:
+    return {
+        "min": min(samples) * 1000,
+        "median": statistics.median(samples) * 1000,
+        "max": max(samples) * 1000,
+    }
+
+
+def _measure(function: Callable[[], Any], repeat: int) -> Tuple[List[float], Any]:
+    samples = []
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        samples.append(time.perf_counter() - started)
+    return samples, value
+
+
+def serialize_json(sql: str, parameters: List[Dict[str, Any]], results: Dict[str, Any]) -> bytes:
+    """
+    Serialize results like FastAPI does for the QueryResponse response model
+    """
+    payload = QueryResponse.model_validate({
+        "sql_query": sql, "parameters": parameters, "explanation": "", "results": results
+    })
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def bench_query(
+    executor: QueryExecutor,
+    sql: str,
+    parameters: List[Dict[str, Any]],
+    repeat: int,
+    budget: Callable[[], QueryBudget]
+) -> Dict[str, Any]:
+    """
+    Time execution and serialization of one query
+
+    Returns:
+        Execution and per-format serialization timings (ms), row count and
+        serialized sizes
+    """
+    results = {}
+    execute_samples = []
+    for result_format in ("rows", "columns"):
+        samples, results[result_format] = _measure(
+            lambda: executor.execute_query(sql, parameters, result_format, budget()), repeat
+        )
+        if not results[result_format]["success"]:
+            return {"error": results[result_format]["error"]}
+        execute_samples.extend(samples)
+
+    entry: Dict[str, Any] = {
+        "rows": results["rows"]["row_count"],
+        "execute_ms": _timings(execute_samples),
+        "serialize_ms": {},
+        "bytes": {},
+    }
+    for result_format in ("rows", "columns"):
+        samples, body = _measure(lambda: serialize_json(sql, parameters, results[result_format]), repeat)
+        entry["serialize_ms"][result_format] = _timings(samples)
+        entry["bytes"][result_format] = len(body)
+    if arrow_available():
+        columns = results["columns"]
+        samples, body = _measure(lambda: encode_arrow_ipc(columns["columns"], columns["data"]), repeat)
+        entry["serialize_ms"]["arrow"] = _timings(samples)
+        entry["bytes"]["arrow"] = len(body)
+    return entry
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """
+    Print the change of median execution and JSON serialization time against a previous run
+    """
+    previous = {(entry["size"], entry["query"]): entry for entry in baseline["results"] if "error" not in entry}
+    print(f"\nAgainst {baseline['meta']['commit']}:")
+    for entry in current["results"]:
+        old = previous.get((entry["size"], entry["query"]))
+        if old is None or "error" in entry:
+            continue
+        changes = []
+        for label, new_ms, old_ms in (
+            ("execute", entry["execute_ms"]["median"], old["execute_ms"]["median"]),
+            ("json", entry["serialize_ms"]["rows"]["median"], old["serialize_ms"]["rows"]["median"]),
+        ):
+            change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+            changes.append(f"{label} {old_ms:9.2f} -> {new_ms:9.2f} ms ({change:+6.1f}%)")
+        print(f"{entry['size']:>5} {entry['query']:<24} " + "  ".join(changes))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k", help="comma separated order counts, e.g. 10k,1m,10m")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query and format")
+    parser.add_argument("--data-dir", default=os.path.join("data", "benchmarks"), help="where databases are kept")
+    parser.add_argument("--queries", help="comma separated query names (default: all)")
+    parser.add_argument("--app-limits", action="store_true",
+                        help="apply the configured QUERY_* limits instead of running unbounded")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/query_executor-<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # Every execution should reach the database
+    settings.RESULT_CACHE_ENABLED = False
+
+    selected = set(args.queries.split(",")) if args.queries else None
+    queries = [query for query in QUERIES if selected is None or query[0] in selected]
+    budget = QueryBudget.from_settings if args.app_limits else lambda: QueryBudget()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    commit = git_commit()
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "app_limits": args.app_limits,
+        },
+        "results": [],
+    }
+
+    for size in args.sizes.split(","):
+        orders = parse_size(size)
+        database_url = build_database(os.path.join(args.data_dir, f"orders_{orders}.db"), orders, args.seed)
+        engine = create_database_engine(database_url)
+        session = sessionmaker(bind=engine)()
+        try:
+            executor = QueryExecutor(session)
+            for name, sql, parameters in queries:
+                entry = {"size": size, "orders": orders, "query": name,
+                         **bench_query(executor, sql, parameters, args.repeat, budget)}
+                report["results"].append(entry)
+                if "error" in entry:
+                    print(f"{size:>5} {name:<24} error: {entry['error']}")
+                    continue
+                serialize = "  ".join(
+                    f"{result_format} {timings['median']:8.2f} ms" for result_format, timings in entry["serialize_ms"].items()
+                )
+                print(f"{size:>5} {name:<24} {entry['rows']:>8} rows  execute {entry['execute_ms']['median']:9.2f} ms  "
+                      f"serialize {serialize}")
+        finally:
+            session.close()
+            engine.dispose()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"query_executor-{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump(report, results_file, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(report, json.load(baseline_file))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
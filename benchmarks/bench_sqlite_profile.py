@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent read throughput of the SQLite database under the
+"default" engine profile (rollback journal, SQLite's default cache) and the
+"performance" profile (WAL, synchronous=NORMAL, mmap, larger page cache).
+
+Reader threads run dashboard-style aggregate queries while one writer
+thread keeps inserting orders, which is where the rollback journal makes
+readers wait behind the writer.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profile --readers 16 --duration 10
+"""
+import argparse
+import datetime
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.base import Base, create_database_engine
+# Imported only to register the tables on Base.metadata for create_all
+from app.db import models  # noqa: F401
+
+READ_QUERIES = [
+    ("SELECT status, COUNT(*) AS orders, SUM(total_amount) AS total FROM orders "
+     "WHERE customer_id = :customer_id GROUP BY status"),
+    "SELECT * FROM orders WHERE customer_id = :customer_id ORDER BY order_date DESC LIMIT 20",
+    ("SELECT c.name, COUNT(o.id) AS orders FROM customers c JOIN orders o ON o.customer_id = c.id "
+     "WHERE c.id = :customer_id GROUP BY c.name"),
+]
+
+STATUSES = ["pending", "processing", "shipped", "delivered"]
+
+
+def populate(database_url: str, customers: int, orders: int) -> None:
+    engine = create_database_engine(database_url, profile="default")
+    Base.metadata.create_all(bind=engine)
+    today = datetime.date.today()
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO customers (id, name, email) VALUES (:id, :name, :email)"),
+            [{"id": i, "name": f"Customer {i}", "email": f"customer{i}@example.com"} for i in range(1, customers + 1)]
+        )
+        connection.execute(
+            text("INSERT INTO orders (customer_id, order_date, total_amount, status) "
+                 "VALUES (:customer_id, :order_date, :total_amount, :status)"),
+            [{
+                "customer_id": random.randint(1, customers),
+                "order_date": today - datetime.timedelta(days=random.randint(0, 365)),
+                "total_amount": round(random.uniform(5, 500), 2),
+                "status": random.choice(STATUSES),
+            } for _ in range(orders)]
+        )
+    engine.dispose()
+
+
+def run(database_url: str, profile: str, readers: int, duration: float, customers: int) -> Dict[str, Any]:
+    engine = create_database_engine(database_url, profile=profile)
+    deadline = time.perf_counter() + duration
+    latencies: List[List[float]] = [[] for _ in range(readers)]
+    writes = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def reader(index: int) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(
+                        text(random.choice(READ_QUERIES)),
+                        {"customer_id": random.randint(1, customers)}
+                    ).fetchall()
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            latencies[index].append(time.perf_counter() - started)
+
+    def writer() -> None:
+        nonlocal writes, errors
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(
+                        text("INSERT INTO orders (customer_id, order_date, total_amount, status) "
+                             "VALUES (:customer_id, :order_date, :total_amount, 'pending')"),
+                        {"customer_id": random.randint(1, customers),
+                         "order_date": datetime.date.today(), "total_amount": 42.0}
+                    )
+                writes += 1
+            except Exception:
+                with lock:
+                    errors += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    merged = sorted(latency for per_reader in latencies for latency in per_reader)
+    return {
+        "reads": len(merged),
+        "reads_per_second": len(merged) / elapsed,
+        "writes_per_second": writes / elapsed,
+        "p50_ms": statistics.median(merged) * 1000 if merged else 0.0,
+        "p99_ms": merged[int(len(merged) * 0.99) - 1] * 1000 if merged else 0.0,
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=16, help="concurrent reader threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per profile")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=200000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in ("default", "performance"):
+            # A fresh file per profile, since WAL mode persists in the database file
+            database_url = f"sqlite:///{os.path.join(directory, f'{profile}.db')}"
+            populate(database_url, args.customers, args.orders)
+            result = run(database_url, profile, args.readers, args.duration, args.customers)
+            print(
+                f"{profile:>11}: {result['reads_per_second']:8.1f} reads/s  "
+                f"p50 {result['p50_ms']:6.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                f"{result['writes_per_second']:6.1f} writes/s  ({result['errors']} errors)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
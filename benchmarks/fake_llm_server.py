@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stand-in for the LLM provider, so the whole pipeline can
+be load-tested offline without spending provider tokens.
+
+POST /v1/chat/completions answers with deterministic SQL for the questions
+in CORPUS (and a fixed fallback query for anything else), after a latency
+drawn from a configurable distribution, and fails a configurable share of
+requests with 500 or 429. It understands the prompts of all three paths of
+the LLM client: JSON answers for LocalAI, function calls for single and
+batched questions, and the optional LLM review.
+
+Point the application at it through the LocalAI settings:
+
+    python -m benchmarks.fake_llm_server --port 8080 --latency lognormal:0.3,0.5
+    USE_LOCAL_AI=true LOCAL_AI_BASE_URL=http://localhost:8080/v1 uvicorn app.main:app
+
+Latency specs: "0.2" or "fixed:0.2", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+"lognormal:MEDIAN,SIGMA" and "exponential:MEAN", all in seconds. GET /stats
+returns the number of requests answered, failed and by kind.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Questions the server knows. "question" is the template the load generator
+# fills with VALUES; "pattern" extracts the same values back from the prompt.
+CORPUS: List[Dict[str, Any]] = [
+    {
+        "question": "Find orders with a total amount greater than {amount}",
+        "pattern": r"orders? .*(?:greater than|more than|over|above) \$?(?P<amount>\d+(?:\.\d+)?)",
+        "sql_query": "SELECT * FROM orders WHERE total_amount > :amount ORDER BY total_amount DESC",
+        "parameters": [{"name": "amount", "type": "number", "group": "amount"}],
+        "explanation": "Retrieves orders with a total amount greater than {amount}.",
+    },
+    {
+        "question": "Show {status} orders",
+        "pattern": r"\b(?P<status>pending|processing|shipped|delivered) orders\b",
+        "sql_query": "SELECT * FROM orders WHERE status = :status ORDER BY order_date DESC",
+        "parameters": [{"name": "status", "type": "string", "group": "status"}],
+        "explanation": "Retrieves orders with status {status}.",
+    },
+    {
+        "question": "Show orders placed since {date}",
+        "pattern": r"orders? .*since (?P<date>\d{4}-\d{2}-\d{2})",
+        "sql_query": "SELECT * FROM orders WHERE order_date >= :since ORDER BY order_date",
+        "parameters": [{"name": "since", "type": "date", "group": "date"}],
+        "explanation": "Retrieves orders placed on or after {date}.",
+    },
+    {
+        "question": "Show the orders of customer {customer_id}",
+        "pattern": r"orders? of customer (?:number |#)?(?P<customer_id>\d+)",
+        "sql_query": "SELECT * FROM orders WHERE customer_id = :customer_id ORDER BY order_date DESC",
+        "parameters": [{"name": "customer_id", "type": "number", "group": "customer_id"}],
+        "explanation": "Retrieves the orders of the customer with ID {customer_id}.",
+    },
+    {
+        "question": "Total amount spent by each customer",
+        "pattern": r"(?:total|sum).* (?:each|per|every) customer",
+        "sql_query": (
+            "SELECT c.name, SUM(o.total_amount) AS total_spent FROM customers c "
+            "JOIN orders o ON o.customer_id = c.id GROUP BY c.id, c.name ORDER BY total_spent DESC"
+        ),
+        "parameters": [],
+        "explanation": "Sums the order totals of every customer.",
+    },
+    {
+        "question": "Count orders by status",
+        "pattern": r"count .*orders? (?:by|per) status",
+        "sql_query": "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status",
+        "parameters": [],
+        "explanation": "Counts the orders in each status.",
+    },
+    {
+        "question": "Show all customers",
+        "pattern": r"\b(?:all|every) customers?\b",
+        "sql_query": "SELECT * FROM customers",
+        "parameters": [],
+        "explanation": "Retrieves all customers.",
+    },
+]
+
+FALLBACK = {
+    "sql_query": "SELECT * FROM customers LIMIT 10",
+    "parameters": [],
+    "explanation": "Retrieves the first ten customers.",
+}
+
+# Values the load generator puts into the corpus questions
+VALUES: Dict[str, Callable[[random.Random], str]] = {
+    "amount": lambda rng: str(rng.choice([25, 50, 75, 100, 150, 200, 250, 500])),
+    "status": lambda rng: rng.choice(["pending", "processing", "shipped", "delivered"]),
+    "date": lambda rng: f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    "customer_id": lambda rng: str(rng.randint(1, 1000)),
+}
+
+_FIELD_RE = re.compile(r"\{(\w+)\}")
+
+
+def sample_question(rng: random.Random) -> str:
+    """
+    A corpus question with random values filled in
+    """
+    template = rng.choice(CORPUS)["question"]
+    return _FIELD_RE.sub(lambda match: VALUES[match.group(1)](rng), template)
+
+
+def answer(question: str) -> Dict[str, Any]:
+    """
+    The deterministic SQL response for a question
+
+    Returns:
+        Dict with sql_query, parameters and explanation
+    """
+    for entry in CORPUS:
+        match = re.search(entry["pattern"], question, re.IGNORECASE)
+        if match is None:
+            continue
+        values = {name: value.lower() for name, value in match.groupdict().items() if value is not None}
+        return {
+            "sql_query": entry["sql_query"],
+            "parameters": [
+                {"name": parameter["name"], "value": values[parameter["group"]], "type": parameter["type"]}
+                for parameter in entry["parameters"]
+            ],
+            "explanation": entry["explanation"].format(**values),
+        }
+    return dict(FALLBACK)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution spec (see the module docstring)
+
+    Returns:
+        Function drawing a latency in seconds from a random generator
+    """
+    kind, _, arguments = spec.partition(":")
+    if not arguments:
+        kind, arguments = "fixed", kind
+    try:
+        values = [float(value) for value in arguments.split(",")]
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == "normal" and len(values) == 2:
+            return lambda rng: max(rng.gauss(values[0], values[1]), 0.0)
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+        if kind == "exponential" and len(values) == 1:
+            return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def _question(messages: List[Dict[str, Any]]) -> str:
+    content = messages[-1].get("content") or ""
+    match = re.search(r"^Query: (.*)$", content, re.MULTILINE)
+    if match is None:
+        match = re.search(r"Convert this query to SQL: (.*)$", content, re.DOTALL)
+    return match.group(1).strip() if match else content
+
+
+def _numbered_questions(messages: List[Dict[str, Any]]) -> List[str]:
+    content = messages[-1].get("content") or ""
+    numbered = content.rsplit("answering every number once:", 1)[-1]
+    return [match.group(2).strip() for match in re.finditer(r"^(\d+)\. (.*)$", numbered, re.MULTILINE)]
+
+
+def _completion(model: str, content: Optional[str] = None, function: Optional[Dict[str, Any]] = None,
+                prompt_chars: int = 0) -> Dict[str, Any]:
+    message: Dict[str, Any] = {"role": "assistant", "content": content}
+    if function is not None:
+        message["tool_calls"] = [{"id": f"call_{time.monotonic_ns()}", "type": "function", "function": function}]
+    completion_chars = len(content or "") + len((function or {}).get("arguments", ""))
+    return {
+        "id": f"chatcmpl-fake-{time.monotonic_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if function is not None else "stop",
+        }],
+        # About four characters per token
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": completion_chars // 4,
+            "total_tokens": (prompt_chars + completion_chars) // 4,
+        },
+    }
+
+
+def respond(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the chat completion for a request body
+    """
+    messages = body.get("messages", [])
+    model = body.get("model", "fake")
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    system = messages[0].get("content", "") if messages and messages[0].get("role") == "system" else ""
+
+    if "security expert" in system:
+        return _completion(model, content="The query is well-formed and only reads data.", prompt_chars=prompt_chars)
+
+    tools = body.get("tools") or []
+    name = tools[0]["function"]["name"] if tools else None
+    if name == "generate_sql_queries":
+        queries = [{"index": index, **answer(question)} for index, question in enumerate(_numbered_questions(messages))]
+        arguments = json.dumps({"queries": queries})
+        return _completion(model, function={"name": name, "arguments": arguments}, prompt_chars=prompt_chars)
+    if name is not None:
+        arguments = json.dumps(answer(_question(messages)))
+        return _completion(model, function={"name": name, "arguments": arguments}, prompt_chars=prompt_chars)
+    return _completion(model, content=json.dumps(answer(_question(messages))), prompt_chars=prompt_chars)
+
+
+def create_app(
+    latency: str = "fixed:0",
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    seed: int = 0
+) -> FastAPI:
+    """
+    Create the fake provider
+
+    Args:
+        latency: Latency distribution spec of each completion
+        error_rate: Share of requests failed with 500
+        rate_limit_rate: Share of requests failed with 429
+        seed: Seed of the latency and error draws
+    """
+    app = FastAPI(title="Fake LLM provider")
+    draw_latency = parse_latency(latency)
+    rng = random.Random(seed)
+    stats = {"requests": 0, "answered": 0, "errors": 0, "rate_limited": 0}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        stats["requests"] += 1
+        body = await request.json()
+        # Draw everything up front so a seed gives the same sequence however requests interleave
+        delay, roll = draw_latency(rng), rng.random()
+        await asyncio.sleep(delay)
+        if roll < error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Simulated server error", "type": "server_error"}}
+            )
+        if roll < error_rate + rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": "1"},
+                content={"error": {"message": "Simulated rate limit", "type": "rate_limit_exceeded"}}
+            )
+        stats["answered"] += 1
+        return respond(body)
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mistral", "object": "model", "owned_by": "fake"}]}
+
+    @app.get("/stats")
+    async def server_stats():
+        return stats
+
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="fixed:0.2", help="latency distribution of each completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests failed with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(args.latency, args.error_rate, args.rate_limit_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
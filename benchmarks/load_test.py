@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Drive POST /api/v1/query/process at a target request rate and report
+throughput and p50/p95/p99 latency.
+
+Requests are sent open-loop: each one starts at its scheduled time whether
+or not earlier ones finished, so a slow server shows up as growing latency
+rather than as a lower request rate. Questions come from the corpus of
+benchmarks.fake_llm_server with seeded random values.
+
+Against a running application (see benchmarks.fake_llm_server for the LLM):
+
+    python -m benchmarks.load_test --url http://localhost:8000 --rps 50 --duration 30
+
+Or fully in-process, with the fake provider and a temporary SQLite database
+(the load generator then shares the event loop with the application, so
+absolute numbers are lower than against a separate server):
+
+    python -m benchmarks.load_test --in-process --rps 100 --llm-latency lognormal:0.2,0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm_server import create_app as create_fake_llm_app, sample_question
+
+PROCESS_PATH = "/api/v1/query/process"
+
+
+def percentile(ordered: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile of sorted values
+    """
+    if not ordered:
+        return 0.0
+    # Rounded first so 0.99 * 100 doesn't become rank 100
+    rank = math.ceil(round(share * len(ordered), 9))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float, target_rps: float, dropped: int) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    completed = statuses.get(200, 0)
+    return {
+        "target_rps": target_rps,
+        "sent": len(latencies),
+        "completed": completed,
+        "dropped": dropped,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "throughput_rps": completed / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration: float,
+    warmup: float = 0.0,
+    poisson: bool = False,
+    question_pool: int = 0,
+    max_in_flight: int = 1000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Send requests at `rps` for `warmup` + `duration` seconds
+
+    Args:
+        client: Client for the application
+        rps: Target requests per second
+        duration: Seconds measured
+        warmup: Seconds sent before measuring, to fill caches and pools
+        poisson: Exponential gaps between requests instead of even spacing
+        question_pool: Number of distinct questions to draw from (0 for a
+            fresh question per request)
+        max_in_flight: Requests outstanding at most; further requests are
+            dropped and counted
+        seed: Seed of the questions and arrival times
+
+    Returns:
+        Summary of the measured requests
+    """
+    rng = random.Random(seed)
+    pool = [sample_question(rng) for _ in range(question_pool)]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    dropped = 0
+    in_flight = 0
+    tasks = set()
+
+    async def send(question: str, measured: bool) -> None:
+        nonlocal in_flight
+        started = time.perf_counter()
+        try:
+            response = await client.post(PROCESS_PATH, json={"query": question})
+            status: Any = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            in_flight -= 1
+        if measured:
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    scheduled = start
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measured = scheduled >= measure_from
+        if in_flight >= max_in_flight:
+            dropped += measured
+        else:
+            in_flight += 1
+            question = rng.choice(pool) if pool else sample_question(rng)
+            task = asyncio.create_task(send(question, measured))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        scheduled += rng.expovariate(rps) if poisson else 1.0 / rps
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - measure_from
+    return summarize(latencies, statuses, elapsed, rps, dropped)
+
+
+def in_process_client(llm_latency: str, error_rate: float, directory: str) -> httpx.AsyncClient:
+    """
+    Client for the application running in this process on a temporary
+    SQLite database, with the LLM provider replaced by the fake server
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.deps import get_async_llm_client
+    from app.core.config import settings
+    from app.db.base import get_async_db, get_async_database_url
+    from app.db.init_db import init_db
+    from app.llm.openai_client import AsyncLLMClient
+    from app.main import app
+
+    database_url = f"sqlite:///{os.path.join(directory, 'load.db')}"
+    engine = create_engine(database_url)
+    session = sessionmaker(bind=engine)()
+    init_db(session, engine)
+    session.close()
+
+    async_engine = create_async_engine(get_async_database_url(database_url))
+    SessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_load_test_db():
+        async with SessionLocal() as db:
+            yield db
+
+    settings.USE_LOCAL_AI = True
+    fake_llm = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_fake_llm_app(llm_latency, error_rate)))
+    llm_client = AsyncLLMClient(http_client=fake_llm)
+    app.dependency_overrides[get_async_db] = get_load_test_db
+    app.dependency_overrides[get_async_llm_client] = lambda: llm_client
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=None)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the application")
+    parser.add_argument("--rps", type=float, default=20.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds sent before measuring")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of even spacing")
+    parser.add_argument("--question-pool", type=int, default=0,
+                        help="distinct questions to draw from, 0 for a new question per request")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="outstanding requests before dropping")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true", help="run the application and fake LLM in this process")
+    parser.add_argument("--llm-latency", default="fixed:0.2", help="fake LLM latency spec (--in-process)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fake LLM error rate (--in-process)")
+    parser.add_argument("--json", dest="json_path", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    # Per-request INFO logs would dominate the measurement
+    logging.disable(logging.INFO)
+
+    async def run(directory: Optional[str]) -> Dict[str, Any]:
+        if directory is not None:
+            client = in_process_client(args.llm_latency, args.llm_error_rate, directory)
+        else:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                       limits=httpx.Limits(max_connections=args.max_in_flight))
+        async with client:
+            return await run_load(client, args.rps, args.duration, args.warmup, args.poisson,
+                                  args.question_pool, args.max_in_flight, args.seed)
+
+    if args.in_process:
+        with tempfile.TemporaryDirectory() as directory:
+            summary = asyncio.run(run(directory))
+    else:
+        summary = asyncio.run(run(None))
+
+    print(
+        f"{summary['throughput_rps']:.1f} req/s of {summary['target_rps']:.1f} target  "
+        f"p50 {summary['p50_ms']:.1f} ms  p95 {summary['p95_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms  "
+        f"max {summary['max_ms']:.1f} ms"
+    )
+    print(f"{summary['sent']} sent, {summary['completed']} completed, {summary['dropped']} dropped, "
+          f"statuses {summary['statuses']}")
+    if args.json_path:
+        with open(args.json_path, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,44 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from typing import Dict, Generator, Any
+from sqlalchemy.pool import NullPool
 import datetime
 from unittest.mock import MagicMock, patch
 
 from app.db.base import Base
 from app.db.models import Customer, Order
-from app.llm.openai_client import LLMClient
-from app.db.init_db import init_db
+from app.llm.openai_client import AsyncLLMClient
+from app.llm.cache import get_sql_cache
+from app.llm.semantic_cache import get_semantic_cache
+from app.llm.template_cache import get_template_cache
+from app.db.index_advisor import get_index_advisor
+from app.db.pagination import get_cursor_store
+from app.db.result_cache import get_result_cache
+from app.core.config import settings
+from app.llm.schema import DATABASE_SCHEMA, set_database_schema
 
 # Use in-memory SQLite for testing
 TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Empties process-wide caches so tests don't see each other's entries
+    """
+    for cache in (get_sql_cache(), get_semantic_cache(), get_template_cache(), get_result_cache(), get_index_advisor()):
+        if cache is not None:
+            cache.clear()
+    get_cursor_store().clear()
+    # Apps started by tests run their lifespan against DATABASE_URL, not the
+    # test database: keep it from reflecting, altering or tuning that database
+    with patch.object(settings, "SCHEMA_INTROSPECTION", False), \
+            patch.object(settings, "SCHEMA_SNAPSHOT_PATH", ""), \
+            patch.object(settings, "ROLLUPS_ENABLED", False), \
+            patch.object(settings, "INDEX_ADVISOR_INTERVAL", 0):
+        yield
+    set_database_schema(DATABASE_SCHEMA)
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -100,7 +127,7 @@ def mock_llm_client():
     """
     Creates a mock LLM client for testing
     """
-    mock_client = MagicMock(spec=LLMClient)
+    mock_client = MagicMock(spec=AsyncLLMClient)
     
     # Mock the generate_sql method
     mock_client.generate_sql.return_value = {
@@ -125,20 +152,40 @@ def mock_llm_client():
 
 
 @pytest.fixture
-def app_client():
+def override_dependencies(db_with_data):
+    """
+    Points the API's async DB session at the test database and returns a
+    function that installs an LLM client for the request pipeline
+    """
+    from app.main import app
+    from app.db.base import get_async_db, get_async_sessionmaker
+    from app.api.deps import get_async_llm_client
+
+    engine = create_async_engine(TEST_ASYNC_DATABASE_URL, poolclass=NullPool)
+    TestingAsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
+    def use_llm_client(llm_client):
+        app.dependency_overrides[get_async_llm_client] = lambda: llm_client
+
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: TestingAsyncSessionLocal
+    try:
+        yield use_llm_client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def app_client(override_dependencies, mock_llm_client):
     """
     Creates a test client for the FastAPI app
     """
     from fastapi.testclient import TestClient
     from app.main import app
-    
-    # Patch the dependencies to use our test fixtures
-    with patch("app.api.routes.query.get_db") as mock_get_db, \
-         patch("app.api.routes.query.get_llm_client") as mock_get_llm_client:
-        
-        # Configure the mocks to return our fixtures
-        mock_get_db.return_value = next(db_with_data(db_session()))
-        mock_get_llm_client.return_value = mock_llm_client()
-        
-        client = TestClient(app)
-        yield client
+
+    override_dependencies(mock_llm_client)
+    yield TestClient(app)
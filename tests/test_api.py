@@ -1,19 +1,19 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 
 from app.main import app
+from app.core.config import settings
+from app.llm.openai_client import AsyncLLMClient
 
 
 class TestQueryAPI:
     
-    @patch("app.api.routes.query.get_db")
-    @patch("app.api.routes.query.get_llm_client")
-    def test_process_query_success(self, mock_get_llm, mock_get_db, db_with_data, mock_llm_client):
+    def test_process_query_success(self, override_dependencies, mock_llm_client):
         """Test successful query processing"""
         # Configure mocks
-        mock_get_db.return_value = db_with_data
-        mock_get_llm.return_value = mock_llm_client
+        override_dependencies(mock_llm_client)
         
         # Create client
         client = TestClient(app)
@@ -33,16 +33,12 @@ class TestQueryAPI:
         assert "results" in data
         assert data["results"]["success"] == True
     
-    @patch("app.api.routes.query.get_db")
-    @patch("app.api.routes.query.get_llm_client")
-    def test_process_query_llm_error(self, mock_get_llm, mock_get_db, db_with_data):
+    def test_process_query_llm_error(self, override_dependencies):
         """Test handling of LLM errors"""
         # Configure mocks
-        mock_get_db.return_value = db_with_data
-        
-        mock_llm = MagicMock()
+        mock_llm = MagicMock(spec=AsyncLLMClient)
         mock_llm.generate_sql.return_value = {"error": "LLM API Error"}
-        mock_get_llm.return_value = mock_llm
+        override_dependencies(mock_llm)
         
         # Create client
         client = TestClient(app)
@@ -59,14 +55,10 @@ class TestQueryAPI:
         assert "detail" in data
         assert data["detail"] == "LLM API Error"
     
-    @patch("app.api.routes.query.get_db")
-    @patch("app.api.routes.query.get_llm_client")
-    def test_process_query_unsafe_sql(self, mock_get_llm, mock_get_db, db_with_data):
+    def test_process_query_unsafe_sql(self, override_dependencies):
         """Test handling of unsafe SQL"""
         # Configure mocks
-        mock_get_db.return_value = db_with_data
-        
-        mock_llm = MagicMock()
+        mock_llm = MagicMock(spec=AsyncLLMClient)
         mock_llm.generate_sql.return_value = {
             "sql_query": "SELECT * FROM customers WHERE id = '1'",
             "parameters": [],
@@ -76,7 +68,7 @@ class TestQueryAPI:
             "is_safe": False,
             "analysis": "Potential SQL injection vulnerability"
         }
-        mock_get_llm.return_value = mock_llm
+        override_dependencies(mock_llm)
         
         # Create client
         client = TestClient(app)
@@ -93,14 +85,10 @@ class TestQueryAPI:
         assert "detail" in data
         assert "security validation" in data["detail"]
     
-    @patch("app.api.routes.query.get_db")
-    @patch("app.api.routes.query.get_llm_client")
-    def test_process_query_execution_error(self, mock_get_llm, mock_get_db, db_with_data):
+    def test_process_query_execution_error(self, override_dependencies):
         """Test handling of query execution errors"""
         # Configure mocks
-        mock_get_db.return_value = db_with_data
-        
-        mock_llm = MagicMock()
+        mock_llm = MagicMock(spec=AsyncLLMClient)
         mock_llm.generate_sql.return_value = {
             "sql_query": "SELECT * FROM nonexistent_table",
             "parameters": [],
@@ -110,7 +98,7 @@ class TestQueryAPI:
             "is_safe": True,
             "analysis": "The query is safe"
         }
-        mock_get_llm.return_value = mock_llm
+        override_dependencies(mock_llm)
         
         # Create client
         client = TestClient(app)
@@ -125,3 +113,236 @@ class TestQueryAPI:
         assert response.status_code == 400
         data = response.json()
         assert "detail" in data
+    
+    @patch.object(settings, "SPECULATIVE_EXECUTION", True)
+    def test_process_query_speculative(self, override_dependencies, mock_llm_client):
+        """Test that speculative execution returns the same results"""
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/query/process",
+            json={"query": "Show me customer with ID 1"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"]["row_count"] == 1
+        assert "truncated" not in data["results"]
+    
+    @patch.object(settings, "SPECULATIVE_EXECUTION", True)
+    def test_process_query_speculative_unsafe(self, override_dependencies, mock_llm_client):
+        """Test that speculative results are withheld when validation fails"""
+        mock_llm_client.validate_sql.return_value = {
+            "is_safe": False,
+            "analysis": "Rejected by review"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/query/process",
+            json={"query": "Show me customer with ID 1"}
+        )
+        
+        assert response.status_code == 400
+        assert "security validation" in response.json()["detail"]
+    
+    @patch.object(settings, "STREAM_BATCH_SIZE", 2)
+    def test_stream_query_ndjson(self, override_dependencies, mock_llm_client):
+        """Test that results are streamed as NDJSON lines"""
+        mock_llm_client.generate_sql.return_value = {
+            "sql_query": "SELECT id, order_date FROM orders ORDER BY id",
+            "parameters": [],
+            "explanation": "All orders"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/stream", json={"query": "Show me all orders"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [event["type"] for event in events] == ["meta", "rows", "rows", "end"]
+        assert events[0]["columns"] == ["id", "order_date"]
+        assert events[1]["rows"][0][0] == 1
+        assert events[-1]["row_count"] == 3
+    
+    def test_stream_query_sse(self, override_dependencies, mock_llm_client):
+        """Test that results are streamed as Server-Sent Events"""
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/query/stream?format=sse",
+            json={"query": "Show me customer with ID 1"}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = response.text.strip().split("\n\n")
+        assert [event.split("\n")[0] for event in events] == ["event: meta", "event: rows", "event: end"]
+        assert json.loads(events[-1].split("data: ")[1]) == {"row_count": 1}
+    
+    @patch.object(settings, "QUERY_TIMEOUT", 0.2)
+    def test_stream_query_timeout(self, override_dependencies, mock_llm_client):
+        """Test that a runaway streamed query ends with a timeout error event"""
+        mock_llm_client.generate_sql.return_value = {
+            "sql_query": "WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter) SELECT COUNT(*) FROM counter",
+            "parameters": [],
+            "explanation": "Counts forever"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/stream", json={"query": "Count forever"})
+        
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1]["type"] == "error"
+        assert events[-1]["error_type"] == "timeout"
+    
+    def test_stream_query_unsafe_sql(self, override_dependencies, mock_llm_client):
+        """Test that unsafe SQL is rejected before the stream starts"""
+        mock_llm_client.validate_sql.return_value = {"is_safe": False, "analysis": "Unsafe"}
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/stream", json={"query": "Drop everything"})
+        
+        assert response.status_code == 400
+    
+    def test_process_query_columnar(self, override_dependencies, mock_llm_client):
+        """Test that format=columns returns per-column arrays"""
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/query/process?format=columns",
+            json={"query": "Show me customer with ID 1"}
+        )
+        
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results["data"]["name"] == ["Test Customer"]
+        assert results["row_count"] == 1
+        assert "rows" not in results
+    
+    def test_process_query_arrow(self, override_dependencies, mock_llm_client):
+        """Test that format=arrow returns an Arrow IPC stream"""
+        pa = pytest.importorskip("pyarrow")
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post(
+            "/api/v1/query/process?format=arrow",
+            json={"query": "Show me customer with ID 1"}
+        )
+        
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column("name").to_pylist() == ["Test Customer"]
+        assert json.loads(table.schema.metadata[b"sql_query"]) == mock_llm_client.generate_sql.return_value["sql_query"]
+    
+    def test_process_query_arrow_mixed_types(self, override_dependencies, mock_llm_client):
+        """Test that a column mixing numbers and text is sent as strings"""
+        pa = pytest.importorskip("pyarrow")
+        mock_llm_client.generate_sql.return_value = {
+            "sql_query": "SELECT id, CASE WHEN id = 1 THEN total_amount ELSE status END AS detail FROM orders ORDER BY id",
+            "parameters": [],
+            "explanation": "Amount of the first order, status of the others"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/process?format=arrow", json={"query": "Order details"})
+        
+        assert response.status_code == 200
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column("id").to_pylist() == [1, 2, 3]
+        assert table.column("detail").to_pylist() == ["100.0", "shipped", "pending"]
+    
+    def test_process_query_paginated(self, override_dependencies, mock_llm_client):
+        """Test that later pages come from the cursor without LLM calls"""
+        mock_llm_client.generate_sql.return_value = {
+            "sql_query": "SELECT * FROM orders",
+            "parameters": [],
+            "explanation": "All orders"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/process?page_size=2", json={"query": "Show me all orders"})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["id"] for row in data["results"]["rows"]] == [1, 2]
+        assert data["next_cursor"]
+        
+        response = client.get(f"/api/v1/query/{data['next_cursor']}/next")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["id"] for row in data["results"]["rows"]] == [3]
+        assert data["next_cursor"] is None
+        assert data["sql_query"] == "SELECT * FROM orders"
+        assert mock_llm_client.generate_sql.call_count == 1
+        assert mock_llm_client.validate_sql.call_count == 1
+    
+    def test_next_page_unknown_cursor(self, override_dependencies, mock_llm_client):
+        """Test that an unknown cursor is a 404"""
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.get("/api/v1/query/does-not-exist/next")
+        
+        assert response.status_code == 404
+    
+    @patch.object(settings, "QUERY_MAX_ROWS", 1)
+    def test_process_query_row_limit(self, override_dependencies, mock_llm_client):
+        """Test that exceeding the row limit returns a structured error"""
+        mock_llm_client.generate_sql.return_value = {
+            "sql_query": "SELECT * FROM orders",
+            "parameters": [],
+            "explanation": "All orders"
+        }
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/process", json={"query": "Show me all orders"})
+        
+        assert response.status_code == 400
+        assert response.json()["detail"]["error_type"] == "max_rows"
+        assert response.json()["detail"]["limit"] == 1
+    
+    def test_process_batch(self, override_dependencies, mock_llm_client):
+        """Test that a batch is deduplicated and answered in input order with per-item errors"""
+        answers = {
+            "Show all customers": {"sql_query": "SELECT * FROM customers", "parameters": [], "explanation": "Customers"},
+            "Break it": {"sql_query": "SELECT * FROM missing_table", "parameters": [], "explanation": "Broken"},
+        }
+        mock_llm_client.generate_sql_batch.side_effect = lambda queries: [answers[query] for query in queries]
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/batch", json={
+            "queries": ["Show all customers", "Break it", "show all customers?"]
+        })
+        
+        assert response.status_code == 200
+        items = response.json()["results"]
+        assert [item["query"] for item in items] == ["Show all customers", "Break it", "show all customers?"]
+        assert [item["success"] for item in items] == [True, False, True]
+        assert items[0]["results"]["row_count"] == items[2]["results"]["row_count"] > 0
+        assert items[1]["error"]
+        mock_llm_client.generate_sql_batch.assert_called_once_with(["Show all customers", "Break it"])
+    
+    @patch.object(settings, "BATCH_MAX_QUERIES", 2)
+    def test_process_batch_too_large(self, override_dependencies, mock_llm_client):
+        """Test that oversized batches are rejected"""
+        override_dependencies(mock_llm_client)
+        
+        client = TestClient(app)
+        response = client.post("/api/v1/query/batch", json={"queries": ["a", "b", "c"]})
+        
+        assert response.status_code == 400
@@ -0,0 +1,140 @@
+import datetime
+import pytest
+
+from app.db.binding import BindingError, coerce_date, coerce_number, placeholders, plan_binding
+from app.db.query import QueryExecutor
+from app.db.statement_cache import StatementCache
+
+
+class TestCoercion:
+
+    def test_numbers(self):
+        """Test that integral text stays int and other numbers become float"""
+        assert coerce_number("42") == 42 and isinstance(coerce_number("42"), int)
+        assert coerce_number("-3") == -3
+        assert coerce_number("75.5") == 75.5
+        assert coerce_number(7) == 7
+        with pytest.raises(BindingError):
+            coerce_number("abc")
+        with pytest.raises(BindingError):
+            coerce_number("nan")
+        with pytest.raises(BindingError):
+            coerce_number(True)
+
+    def test_dates(self):
+        """Test that ISO text becomes a date, or a datetime when it has a time"""
+        assert coerce_date("2023-01-01") == datetime.date(2023, 1, 1)
+        assert coerce_date("'2023-01-01'") == datetime.date(2023, 1, 1)
+        assert coerce_date("2023-01-01 10:30:00") == datetime.datetime(2023, 1, 1, 10, 30)
+        with pytest.raises(BindingError):
+            coerce_date("last week")
+
+
+class TestPlanBinding:
+
+    def test_placeholders(self):
+        """Test that casts and string contents aren't taken for placeholders"""
+        assert placeholders("SELECT :a, x::text FROM t WHERE b = :b AND c = :a") == ["a", "b"]
+
+    def test_missing_placeholder_value(self):
+        """Test that a placeholder without a parameter fails before execution"""
+        with pytest.raises(BindingError, match="Missing value for parameter :status"):
+            plan_binding("SELECT * FROM orders WHERE status = :status", [])
+
+    def test_unused_parameter(self):
+        """Test that a parameter without a placeholder is rejected"""
+        with pytest.raises(BindingError, match="not used"):
+            plan_binding("SELECT * FROM orders", [{"name": "status", "value": "shipped", "type": "string"}])
+
+    def test_list_outside_in_clause(self):
+        """Test that list values are only accepted in IN clauses"""
+        with pytest.raises(BindingError, match="IN clause"):
+            plan_binding("SELECT * FROM orders WHERE status = :status",
+                         [{"name": "status", "value": ["a", "b"], "type": "string"}])
+
+    def test_in_list_is_expanded(self, db_with_data):
+        """Test that a list parameter in IN (:name) binds every value"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+
+        result = executor.execute_query(
+            "SELECT id FROM orders WHERE status IN (:statuses) ORDER BY id",
+            [{"name": "statuses", "value": ["shipped", "pending"], "type": "string"}]
+        )
+
+        assert result["success"]
+        assert [row["id"] for row in result["rows"]] == [2, 3]
+
+    def test_lists_of_any_length_share_a_plan(self):
+        """Test that the list length isn't part of the statement cache key"""
+        cache = StatementCache(max_entries=10)
+        sql = "SELECT * FROM orders WHERE id IN (:ids)"
+
+        first = cache.get(sql, [{"name": "ids", "value": ["1", "2"], "type": "number"}])
+        second = cache.get(sql, [{"name": "ids", "value": ["1", "2", "3"], "type": "number"}])
+
+        assert first is second
+        assert second.bind([{"name": "ids", "value": ["1", "2", "3"], "type": "number"}]) == {"ids": [1, 2, 3]}
+
+    def test_date_parameter_matches_column(self, db_with_data):
+        """Test that date parameters compare equal to stored dates"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+
+        result = executor.execute_query(
+            "SELECT id FROM orders WHERE order_date = :day",
+            [{"name": "day", "value": datetime.date.today().isoformat(), "type": "date"}]
+        )
+
+        assert [row["id"] for row in result["rows"]] == [3]
+
+    def test_bad_value_fails_before_execution(self, db_with_data):
+        """Test that an unconvertible value is reported as an error result"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+
+        result = executor.execute_query(
+            "SELECT * FROM orders WHERE total_amount > :amount",
+            [{"name": "amount", "value": "a lot", "type": "number"}]
+        )
+
+        assert not result["success"]
+        assert "Expected a number" in result["error"]
+
+
+class TestExecuteMany:
+
+    def test_updates_are_batched(self, db_with_data):
+        """Test that a statement runs for every parameter set and rows affected are summed"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+        parameter_sets = [
+            [{"name": "status", "value": "cancelled", "type": "string"}, {"name": "id", "value": str(i), "type": "number"}]
+            for i in (1, 2, 99)
+        ]
+
+        result = executor.execute_many("UPDATE orders SET status = :status WHERE id = :id", parameter_sets)
+
+        assert result["success"]
+        assert result["affected_rows"] == 2
+        rows = executor.execute_query("SELECT status FROM orders ORDER BY id")["rows"]
+        assert [row["status"] for row in rows] == ["cancelled", "cancelled", "pending"]
+
+    def test_queries_return_one_result_per_set(self, db_with_data):
+        """Test that a query template returns results for each parameter set in order"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+        parameter_sets = [[{"name": "customer_id", "value": str(i), "type": "number"}] for i in (2, 1)]
+
+        result = executor.execute_many("SELECT id FROM orders WHERE customer_id = :customer_id ORDER BY id", parameter_sets)
+
+        assert [[row["id"] for row in item["rows"]] for item in result["results"]] == [[3], [1, 2]]
+
+    def test_bad_set_fails_before_database(self, db_with_data):
+        """Test that no statement runs when any parameter set is invalid"""
+        executor = QueryExecutor(db_with_data, statement_cache=StatementCache(max_entries=10))
+        parameter_sets = [
+            [{"name": "id", "value": "1", "type": "number"}],
+            [{"name": "id", "value": "one", "type": "number"}],
+        ]
+
+        result = executor.execute_many("DELETE FROM orders WHERE id = :id", parameter_sets)
+
+        assert not result["success"]
+        assert "Parameter set 1" in result["error"]
+        assert executor.execute_query("SELECT COUNT(*) AS n FROM orders")["rows"][0]["n"] == 3
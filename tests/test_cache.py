@@ -0,0 +1,136 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.core.config import settings
+from app.llm.cache import InMemoryCache, SQLiteCache, make_cache_key, normalize_query
+from app.llm.openai_client import LLMClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+SAMPLE_RESPONSE = {
+    "sql_query": "SELECT * FROM customers",
+    "parameters": [],
+    "explanation": "Retrieves all customers"
+}
+
+
+class TestCacheKey:
+
+    def test_normalized_queries_share_key(self):
+        """Test that case, whitespace and trailing punctuation don't change the key"""
+        assert normalize_query("  Show ALL   customers? ") == "show all customers"
+        assert make_cache_key("Show all customers", "gpt") == make_cache_key("show all customers?", "gpt")
+
+    def test_model_and_schema_change_key(self):
+        """Test that the model name and schema hash are part of the key"""
+        key = make_cache_key("show all customers", "gpt", "schema-a")
+        assert key != make_cache_key("show all customers", "mistral", "schema-a")
+        assert key != make_cache_key("show all customers", "gpt", "schema-b")
+
+
+class TestInMemoryCache:
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted"""
+        cache = InMemoryCache(ttl=60, max_entries=10)
+        assert cache.get("key") is None
+        cache.set("key", SAMPLE_RESPONSE)
+        assert cache.get("key") == SAMPLE_RESPONSE
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["llm_calls_saved"] == 1
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are treated as misses"""
+        clock = FakeClock()
+        cache = InMemoryCache(ttl=60, max_entries=10, clock=clock)
+        cache.set("key", SAMPLE_RESPONSE)
+        clock.now += 61
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = InMemoryCache(ttl=60, max_entries=2)
+        cache.set("a", SAMPLE_RESPONSE)
+        cache.set("b", SAMPLE_RESPONSE)
+        cache.get("a")
+        cache.set("c", SAMPLE_RESPONSE)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_returns_copies(self):
+        """Test that callers can't mutate cached entries"""
+        cache = InMemoryCache(ttl=60, max_entries=10)
+        cache.set("key", SAMPLE_RESPONSE)
+        cache.get("key")["sql_query"] = "DELETE FROM customers"
+        assert cache.get("key")["sql_query"] == "SELECT * FROM customers"
+
+
+class TestSQLiteCache:
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that entries survive reopening the cache file"""
+        path = str(tmp_path / "cache" / "sql_cache.db")
+        SQLiteCache(path, ttl=60, max_entries=10).set("key", SAMPLE_RESPONSE)
+
+        cache = SQLiteCache(path, ttl=60, max_entries=10)
+        assert cache.get("key") == SAMPLE_RESPONSE
+        assert cache.stats()["hits"] == 1
+
+    def test_eviction_and_expiry(self, tmp_path):
+        """Test size cap and TTL in the SQLite backend"""
+        clock = FakeClock()
+        cache = SQLiteCache(str(tmp_path / "sql_cache.db"), ttl=60, max_entries=2, clock=clock)
+        cache.set("a", SAMPLE_RESPONSE)
+        clock.now += 1
+        cache.set("b", SAMPLE_RESPONSE)
+        clock.now += 1
+        cache.set("c", SAMPLE_RESPONSE)
+        assert len(cache) == 2
+        assert cache.get("a") is None
+
+        clock.now += 61
+        assert cache.get("c") is None
+
+
+class TestLLMClientCaching:
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch("app.llm.openai_client.OpenAI")
+    def test_repeated_query_skips_llm(self, mock_openai_class):
+        """Test that a repeated question is served from the cache"""
+        client = LLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        client._request_sql = MagicMock(return_value=dict(SAMPLE_RESPONSE))
+
+        first = client.generate_sql("Show all customers")
+        second = client.generate_sql("show all customers ")
+
+        assert first == second == SAMPLE_RESPONSE
+        assert client._request_sql.call_count == 1
+        assert client.cache.stats()["hits"] == 1
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch("app.llm.openai_client.OpenAI")
+    def test_errors_are_not_cached(self, mock_openai_class):
+        """Test that failed generations are retried"""
+        client = LLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        client._request_sql = MagicMock(return_value={"error": "LLM API Error"})
+
+        client.generate_sql("Show all customers")
+        client.generate_sql("Show all customers")
+
+        assert client._request_sql.call_count == 2
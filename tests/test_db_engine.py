@@ -0,0 +1,34 @@
+import os
+
+from sqlalchemy import text
+
+from app.db.base import create_database_engine, sqlite_pragmas
+
+
+class TestEngineProfile:
+
+    def test_performance_profile_pragmas(self, tmp_path):
+        engine = create_database_engine(f"sqlite:///{os.path.join(tmp_path, 'profile.db')}", profile="performance")
+        try:
+            with engine.connect() as connection:
+                assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+                assert connection.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+                assert connection.execute(text("PRAGMA busy_timeout")).scalar() == sqlite_pragmas("performance")["busy_timeout"]
+                assert connection.execute(text("PRAGMA cache_size")).scalar() == sqlite_pragmas("performance")["cache_size"]
+            assert engine.pool.size() == 10
+        finally:
+            engine.dispose()
+
+    def test_default_profile_keeps_sqlite_defaults(self, tmp_path):
+        engine = create_database_engine(f"sqlite:///{os.path.join(tmp_path, 'default.db')}", profile="default")
+        try:
+            with engine.connect() as connection:
+                assert connection.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        finally:
+            engine.dispose()
+
+    def test_in_memory_database(self):
+        engine = create_database_engine("sqlite://", profile="performance")
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT 1")).scalar() == 1
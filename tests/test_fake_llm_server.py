@@ -0,0 +1,83 @@
+import asyncio
+import random
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.llm.cache import InMemoryCache
+from app.llm.openai_client import AsyncLLMClient
+from app.llm.template_cache import TemplateCache
+from benchmarks.fake_llm_server import answer, create_app, parse_latency, sample_question
+from benchmarks.load_test import percentile
+
+
+def fake_llm_client(**options) -> AsyncLLMClient:
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(**options)))
+    return AsyncLLMClient(
+        cache=InMemoryCache(ttl=60, max_entries=10),
+        template_cache=TemplateCache(min_confidence=2.0, max_entries=10),
+        http_client=http_client
+    )
+
+
+class TestFakeLLMServer:
+
+    def test_corpus_answers_are_deterministic(self):
+        """Test that sampled questions get SQL with their values as parameters"""
+        rng = random.Random(1)
+        for _ in range(20):
+            question = sample_question(rng)
+            assert answer(question) == answer(question)
+            assert answer(question)["sql_query"] != "SELECT * FROM customers LIMIT 10"
+
+        assert answer("Show shipped orders")["parameters"] == [{"name": "status", "value": "shipped", "type": "string"}]
+
+    def test_latency_specs(self):
+        """Test the latency distribution specs"""
+        rng = random.Random(0)
+        assert parse_latency("0.2")(rng) == 0.2
+        assert 0.1 <= parse_latency("uniform:0.1,0.3")(rng) <= 0.3
+        assert parse_latency("lognormal:0.2,0.5")(rng) > 0
+        with pytest.raises(ValueError):
+            parse_latency("gamma:1")
+
+    @patch.object(settings, "USE_LOCAL_AI", True)
+    def test_local_ai_path(self):
+        """Test that the LLM client gets parseable JSON answers through the LocalAI settings"""
+        async def run():
+            client = fake_llm_client()
+            try:
+                return await client.generate_sql("Find orders with a total amount greater than 150")
+            finally:
+                await client.close()
+
+        result = asyncio.run(run())
+
+        assert result["sql_query"] == "SELECT * FROM orders WHERE total_amount > :amount ORDER BY total_amount DESC"
+        assert result["parameters"] == [{"name": "amount", "value": "150", "type": "number"}]
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch.object(settings, "BATCH_LLM_PACK_SIZE", 10)
+    def test_function_calling_batch(self):
+        """Test that batched questions are answered through function calls"""
+        async def run():
+            client = fake_llm_client()
+            try:
+                return await client.generate_sql_batch(["Count orders by status", "Show pending orders"])
+            finally:
+                await client.close()
+
+        results = asyncio.run(run())
+
+        assert results[0]["sql_query"] == "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status"
+        assert results[1]["parameters"][0]["value"] == "pending"
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles of the load generator"""
+        values = [float(value) for value in range(1, 101)]
+        assert percentile(values, 0.5) == 50.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.95) == 0.0
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from app.api import deps
+from app.core.config import settings
+from app.llm.http_pool import create_http_client, pool_stats
+from app.llm.openai_client import AsyncLLMClient
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        content = json.dumps({"sql_query": "SELECT * FROM customers", "parameters": [], "explanation": "All customers"})
+        body = json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "mistral",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def completion_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+
+
+class TestHTTPPool:
+
+    @patch.object(settings, "LLM_HTTP_MAX_CONNECTIONS", 7)
+    @patch.object(settings, "LLM_HTTP_MAX_KEEPALIVE", 3)
+    def test_pool_limits_from_settings(self):
+        """Test that the connection pool is sized from settings"""
+        client = create_http_client()
+        stats = pool_stats(client)
+
+        assert stats["max_connections"] == 7
+        assert stats["max_keepalive_connections"] == 3
+        assert stats["open_connections"] == 0
+        asyncio.run(client.aclose())
+
+    @patch.object(settings, "USE_LOCAL_AI", True)
+    def test_connections_are_reused(self, completion_server):
+        """Test that sequential LLM calls share one keep-alive connection"""
+        async def run():
+            with patch.object(settings, "LOCAL_AI_BASE_URL", completion_server):
+                llm_client = AsyncLLMClient(http_client=create_http_client())
+            try:
+                for number in range(3):
+                    result = await llm_client._request_sql(f"Show customer {number}")
+                    assert result["sql_query"] == "SELECT * FROM customers"
+                return pool_stats(llm_client.http_client)
+            finally:
+                await llm_client.close()
+
+        stats = asyncio.run(run())
+        assert stats["requests"] == 3
+        assert stats["new_connections"] == 1
+        assert stats["open_connections"] == 1
+        assert stats["idle_connections"] == 1
+
+    def test_shared_client_lifecycle(self):
+        """Test that the dependency returns one client until it is closed"""
+        first = deps.get_async_llm_client()
+        assert deps.get_async_llm_client() is first
+
+        asyncio.run(deps.close_async_llm_client())
+        assert deps.get_async_llm_client() is not first
+        asyncio.run(deps.close_async_llm_client())
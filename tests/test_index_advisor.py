@@ -0,0 +1,105 @@
+import datetime
+import os
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import create_database_engine
+from app.db.index_advisor import IndexAdvisor, column_usage, recommend_columns
+from app.db.limits import QueryBudget
+from app.db.query import QueryExecutor
+from app.db.result_cache import ResultCache
+from app.db.synthetic import bulk_load
+
+COLUMNS = {
+    "customers": {"id", "name", "email", "phone", "address"},
+    "orders": {"id", "customer_id", "order_date", "total_amount", "status", "notes"},
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{os.path.join(tmp_path, 'advisor.db')}")
+    bulk_load(engine, 100, 2000, today=datetime.date(2024, 6, 30))
+    yield engine
+    engine.dispose()
+
+
+class TestColumnUsage:
+
+    def test_filters_joins_and_grouping(self):
+        """Test that columns are told apart by how the query uses them"""
+        usage = column_usage(
+            "SELECT c.name, SUM(o.total_amount) FROM customers c JOIN orders o ON o.customer_id = c.id "
+            "WHERE o.status = :status AND o.order_date >= :since GROUP BY c.name",
+            COLUMNS
+        )
+
+        assert usage["orders"].equality == ["status"]
+        assert usage["orders"].range == ["order_date"]
+        assert usage["orders"].join == ["customer_id"]
+        assert usage["customers"].join == ["id"]
+        assert usage["customers"].group == ["name"]
+
+    def test_recommended_columns(self):
+        """Test equality before range columns, covering columns and grouping without filters"""
+        usage = column_usage("SELECT id, total_amount FROM orders WHERE order_date > :since AND status = :status", COLUMNS)
+        assert recommend_columns(usage["orders"], 6, 4, ["id"]) == (["status", "order_date", "total_amount"], "filter")
+
+        usage = column_usage("SELECT * FROM orders WHERE customer_id = :customer_id", COLUMNS)
+        assert recommend_columns(usage["orders"], 6, 4, ["id"]) == (["customer_id"], "filter")
+
+        usage = column_usage("SELECT status, COUNT(*) FROM orders GROUP BY status", COLUMNS)
+        assert recommend_columns(usage["orders"], 6, 4, ["id"]) == (["status"], "group")
+
+
+class TestIndexAdvisor:
+
+    def test_recommends_and_creates_index(self, engine):
+        """Test that a full scan on a filtered column gets an index that is then created and measured"""
+        advisor = IndexAdvisor(slow_ms=0, max_statements=10)
+        session = sessionmaker(bind=engine)()
+        try:
+            executor = QueryExecutor(session, result_cache=ResultCache(ttl=0, max_bytes=0), index_advisor=advisor)
+            results = executor.execute_query(
+                "SELECT * FROM orders WHERE customer_id = :customer_id",
+                [{"name": "customer_id", "value": "7", "type": "number"}],
+                budget=QueryBudget()
+            )
+        finally:
+            session.close()
+        assert results["success"]
+
+        report = advisor.analyze(engine)
+        assert report["slow_statements"][0]["full_scans"] == ["orders"]
+        recommendation = report["recommendations"][0]
+        assert recommendation["ddl"] == "CREATE INDEX ix_advisor_orders_customer_id ON orders (customer_id)"
+        assert recommendation["expected_speedup"] >= 1.0
+
+        report = advisor.analyze(engine, create=True)
+        assert report["created"][0]["name"] == "ix_advisor_orders_customer_id"
+        assert report["created"][0]["measured_speedup"] > 0
+        assert "ix_advisor_orders_customer_id" in {index["name"] for index in inspect(engine).get_indexes("orders")}
+        assert advisor.analyze(engine)["recommendations"] == []
+
+    def test_only_slow_statements_are_explained(self, engine):
+        advisor = IndexAdvisor(slow_ms=1000, max_statements=10)
+        advisor.record("SELECT * FROM orders WHERE status = :status",
+                       [{"name": "status", "value": "shipped", "type": "string"}], 0.01, 5)
+
+        assert advisor.analyze(engine)["slow_statements"] == []
+
+    def test_last_report_does_not_analyze(self, engine):
+        """Test that reading the report reuses the latest analysis instead of explaining again"""
+        advisor = IndexAdvisor(slow_ms=0, max_statements=10)
+        advisor.record("SELECT * FROM orders WHERE status = :status",
+                       [{"name": "status", "value": "shipped", "type": "string"}], 0.01, 5)
+        assert advisor.last_report()["analyzed_at"] is None
+
+        report = advisor.analyze(engine)
+        last = advisor.last_report()
+
+        assert advisor.analyses == 1
+        assert last["analyzed_at"] == report["analyzed_at"]
+        assert last["recommendations"] == report["recommendations"] != []
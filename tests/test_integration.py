@@ -1,11 +1,10 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 import json
 
 from fastapi.testclient import TestClient
 from app.main import app
-from app.db.base import get_db
-from app.api.deps import get_llm_client
+from app.core.config import settings
 
 
 @pytest.fixture
@@ -47,20 +46,21 @@ def mock_openai_completion():
 
 
 @pytest.mark.integration
+@patch.object(settings, "USE_LOCAL_AI", False)
+@patch.object(settings, "OPENAI_API_KEY", "sk-test")
 class TestEndToEndIntegration:
     
-    @patch("openai.OpenAI")
-    def test_full_query_flow(self, mock_openai, db_with_data, mock_openai_completion):
+    @patch("app.llm.openai_client.AsyncOpenAI")
+    def test_full_query_flow(self, mock_openai, override_dependencies, mock_openai_completion):
         """Test the full query flow from user input to results"""
         # Configure mock
         mock_openai_instance = mock_openai.return_value
+        mock_openai_instance.chat.completions.create = AsyncMock()
         mock_openai_instance.chat.completions.create.return_value.choices = mock_openai_completion
+        mock_openai_instance.close = AsyncMock()
         
         # Create test client
-        with patch("app.api.routes.query.get_db") as mock_get_db:
-            mock_get_db.return_value = db_with_data
-            
-            client = TestClient(app)
+        with TestClient(app) as client:
             
             # Send request
             response = client.post(
@@ -83,11 +83,13 @@ class TestEndToEndIntegration:
             assert any(c["name"] == "Test Customer" for c in customers)
             assert any(c["name"] == "Another Customer" for c in customers)
     
-    @patch("openai.OpenAI")
-    def test_filtered_query_flow(self, mock_openai, db_with_data):
+    @patch("app.llm.openai_client.AsyncOpenAI")
+    def test_filtered_query_flow(self, mock_openai, override_dependencies):
         """Test a query with filters"""
         # Configure mock
         mock_openai_instance = mock_openai.return_value
+        mock_openai_instance.chat.completions.create = AsyncMock()
+        mock_openai_instance.close = AsyncMock()
         
         # Create a mock response for a filtered query
         class MockChoice:
@@ -123,10 +125,7 @@ class TestEndToEndIntegration:
         ]
         
         # Create test client
-        with patch("app.api.routes.query.get_db") as mock_get_db:
-            mock_get_db.return_value = db_with_data
-            
-            client = TestClient(app)
+        with TestClient(app) as client:
             
             # Send request
             response = client.post(
@@ -0,0 +1,94 @@
+import os
+import pytest
+from sqlalchemy import text
+from unittest.mock import patch
+
+from app.db import introspection
+from app.db.introspection import SchemaSnapshot, SchemaWatcher, ddl_fingerprint, publish_snapshot, reflect_schema, take_snapshot
+from app.llm.cache import make_cache_key
+from app.llm.schema import DATABASE_SCHEMA, get_database_schema, get_schema_digest, schema_digest
+
+
+class TestReflection:
+
+    def test_reflects_tables_keys_and_indexes(self, db_with_data):
+        """Test that reflection finds columns, keys, indexes, relationships and row counts"""
+        schema = reflect_schema(db_with_data.get_bind())
+        tables = {table["name"]: table for table in schema["tables"]}
+
+        assert set(tables) == {"customers", "orders"}
+        customers = tables["customers"]
+        assert [column["name"] for column in customers["columns"]] == ["id", "name", "email", "phone", "address"]
+        assert customers["columns"][0]["primary_key"] is True
+        assert {"name": "ix_customers_email", "columns": ["email"], "unique": True} in customers["indexes"]
+        assert customers["row_count"] == 2
+        assert schema["relationships"][0]["tables"] == ["customers", "orders"]
+        assert schema["relationships"][0]["keys"] == ["id", "customer_id"]
+
+    def test_descriptions_are_merged(self, db_with_data):
+        """Test that the hand-written descriptions are kept for matching tables and columns"""
+        schema = reflect_schema(db_with_data.get_bind())
+        orders = next(table for table in schema["tables"] if table["name"] == "orders")
+        status = next(column for column in orders["columns"] if column["name"] == "status")
+
+        assert orders["description"] == "Contains order information"
+        assert "shipped" in status["description"]
+
+    def test_row_counts_are_not_part_of_digest(self):
+        """Test that only structural changes change the schema digest"""
+        schema = {"tables": [{"name": "t", "columns": [], "row_count": 1}]}
+        grown = {"tables": [{"name": "t", "columns": [], "row_count": 1000}]}
+
+        assert schema_digest(schema) == schema_digest(grown)
+
+    def test_new_index_keeps_digest(self, db_with_data):
+        """Test that creating an index doesn't change the digest the caches are keyed by"""
+        engine = db_with_data.get_bind()
+        digest = schema_digest(reflect_schema(engine))
+
+        with engine.begin() as connection:
+            connection.execute(text("CREATE INDEX ix_orders_total_amount ON orders (total_amount)"))
+
+        assert schema_digest(reflect_schema(engine)) == digest
+
+
+class TestSnapshot:
+
+    def test_restart_reuses_snapshot(self, db_with_data, tmp_path):
+        """Test that an unchanged database is not reflected again"""
+        engine = db_with_data.get_bind()
+        path = str(tmp_path / "schema.json")
+        first = take_snapshot(engine, path)
+
+        with patch.object(introspection, "reflect_schema") as reflect:
+            second = take_snapshot(engine, path)
+
+        assert os.path.exists(path)
+        assert not reflect.called
+        assert second.digest == first.digest
+
+    def test_ddl_change_refreshes_schema(self, db_with_data, tmp_path):
+        """Test that the watcher publishes a new schema and cache key after DDL changes"""
+        engine = db_with_data.get_bind()
+        watcher = SchemaWatcher(engine, path=str(tmp_path / "schema.json"))
+        watcher.refresh()
+        digest = get_schema_digest()
+        cache_key = make_cache_key("show all customers", "gpt")
+
+        assert not watcher.refresh()
+
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE customers ADD COLUMN loyalty_tier VARCHAR"))
+        fingerprint = ddl_fingerprint(engine)
+
+        assert watcher.refresh()
+        assert watcher.snapshot.fingerprint == fingerprint
+        assert get_schema_digest() != digest
+        assert make_cache_key("show all customers", "gpt") != cache_key
+        customers = next(table for table in get_database_schema()["tables"] if table["name"] == "customers")
+        assert customers["columns"][-1]["name"] == "loyalty_tier"
+
+    def test_empty_database_keeps_current_schema(self):
+        """Test that a snapshot without tables isn't published"""
+        assert not publish_snapshot(SchemaSnapshot({"tables": [], "relationships": []}, "fingerprint"))
+        assert get_database_schema() is DATABASE_SCHEMA
@@ -2,6 +2,8 @@ import pytest
 from unittest.mock import patch, MagicMock
 import json
 
+from app.core.config import settings
+from app.llm.cache import InMemoryCache
 from app.llm.openai_client import LLMClient
 
 
@@ -128,3 +130,73 @@ class TestLLMClient:
         # Assert response indicates query is unsafe
         assert result["is_safe"] == False
         assert result["analysis"] is not None
+
+
+def batch_response(entries):
+    """Create a mock batch function call response"""
+    mock_tool_call = MagicMock()
+    mock_tool_call.function.arguments = json.dumps({"queries": entries})
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.tool_calls = [mock_tool_call]
+    return mock_response
+
+
+class TestLLMClientBatch:
+    
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch.object(settings, "BATCH_LLM_PACK_SIZE", 10)
+    @patch('app.llm.openai_client.OpenAI')
+    def test_queries_are_packed_into_one_call(self, mock_openai_class):
+        """Test that uncached queries share one LLM call and come back in input order"""
+        mock_openai_class.return_value.chat.completions.create.return_value = batch_response([
+            {"index": 1, "sql_query": "SELECT * FROM orders", "parameters": [], "explanation": "Orders"},
+            {"index": 0, "sql_query": "SELECT * FROM customers", "parameters": [], "explanation": "Customers"}
+        ])
+        client = LLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        
+        results = client.generate_sql_batch(["Show all customers", "Show all orders"])
+        
+        assert [result["sql_query"] for result in results] == ["SELECT * FROM customers", "SELECT * FROM orders"]
+        assert mock_openai_class.return_value.chat.completions.create.call_count == 1
+        # Answers are cached like single generations
+        assert client.generate_sql("show all orders")["sql_query"] == "SELECT * FROM orders"
+    
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch.object(settings, "BATCH_LLM_PACK_SIZE", 10)
+    @patch('app.llm.openai_client.OpenAI')
+    def test_cached_and_unanswered_queries(self, mock_openai_class):
+        """Test that cached queries skip the LLM and unanswered ones are generated one by one"""
+        mock_openai_class.return_value.chat.completions.create.return_value = batch_response([
+            {"index": 0, "sql_query": "SELECT * FROM orders", "parameters": [], "explanation": "Orders"}
+        ])
+        client = LLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        client._remember("Show all customers", client._lookup_cached("Show all customers")[0], {
+            "sql_query": "SELECT * FROM customers", "parameters": [], "explanation": "Customers"
+        })
+        client._request_sql = MagicMock(return_value={
+            "sql_query": "SELECT COUNT(*) FROM orders", "parameters": [], "explanation": "Count"
+        })
+        
+        results = client.generate_sql_batch(["Show all customers", "Show all orders", "Count orders"])
+        
+        assert [result["sql_query"] for result in results] == [
+            "SELECT * FROM customers", "SELECT * FROM orders", "SELECT COUNT(*) FROM orders"
+        ]
+        client._request_sql.assert_called_once_with("Count orders")
+    
+    @patch.object(settings, "USE_LOCAL_AI", True)
+    @patch('app.llm.openai_client.OpenAI')
+    def test_local_ai_is_not_packed(self, mock_openai_class):
+        """Test that providers without function calling get one call per query"""
+        client = LLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        client._request_sql = MagicMock(side_effect=lambda query: {
+            "sql_query": f"SELECT '{query}'", "parameters": [], "explanation": query
+        })
+        
+        results = client.generate_sql_batch(["a", "b"])
+        
+        assert [result["explanation"] for result in results] == ["a", "b"]
+        assert client._request_sql.call_count == 2
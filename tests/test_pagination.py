@@ -0,0 +1,92 @@
+import pytest
+
+from app.db.introspection import reflect_schema
+from app.db.pagination import plan_pagination, page_query, CursorStore
+from app.db.query import QueryExecutor
+from app.llm.schema import set_database_schema
+
+
+class TestPlanPagination:
+
+    def test_unordered_single_table_uses_keyset(self):
+        plan = plan_pagination("SELECT * FROM orders WHERE status = :status;", ["id", "status"])
+        assert plan == {"mode": "keyset", "key": "id", "descending": False, "after": None}
+
+    def test_order_by_key_uses_keyset(self):
+        plan = plan_pagination("SELECT o.id, o.status FROM orders o ORDER BY o.id DESC", ["id", "status"])
+        assert plan["mode"] == "keyset"
+        assert plan["descending"] == True
+
+    @pytest.mark.parametrize("sql,columns", [
+        ("SELECT * FROM orders ORDER BY total_amount DESC", ["id", "total_amount"]),
+        ("SELECT * FROM orders LIMIT 10", ["id"]),
+        ("SELECT c.id, o.total_amount FROM customers c JOIN orders o ON o.customer_id = c.id", ["id", "total_amount"]),
+        ("SELECT status, COUNT(*) AS n FROM orders GROUP BY status", ["status", "n"]),
+        ("SELECT customer_id AS id, status FROM orders", ["id", "status"]),
+        ("SELECT customer_id id FROM orders", ["id"]),
+        ("SELECT customer_id AS id, COUNT(*) AS n FROM orders GROUP BY customer_id", ["id", "n"]),
+        ("SELECT MAX(total_amount) AS id FROM orders", ["id"]),
+        ("SELECT * FROM (SELECT customer_id AS id FROM orders) AS t", ["id"]),
+    ])
+    def test_falls_back_to_offset(self, sql, columns):
+        assert plan_pagination(sql, columns)["mode"] == "offset"
+
+    def test_key_must_be_the_reflected_primary_key(self, db_with_data):
+        """Test that keyset needs id to be the table's primary key once the schema is reflected"""
+        schema = reflect_schema(db_with_data.get_bind())
+        set_database_schema(schema)
+        assert plan_pagination("SELECT * FROM orders", ["id", "status"])["mode"] == "keyset"
+
+        orders = next(table for table in schema["tables"] if table["name"] == "orders")
+        for column in orders["columns"]:
+            column.pop("primary_key", None)
+        set_database_schema(schema)
+        assert plan_pagination("SELECT * FROM orders", ["id", "status"])["mode"] == "offset"
+
+    def test_window_ordering_does_not_disable_keyset(self):
+        sql = "SELECT id, ROW_NUMBER() OVER (ORDER BY total_amount) AS rank FROM orders"
+        assert plan_pagination(sql, ["id", "rank"])["mode"] == "keyset"
+
+    def test_page_query_keyset(self):
+        sql, params = page_query("SELECT * FROM orders;", {"mode": "keyset", "key": "id", "descending": False, "after": 7}, 10)
+        assert sql == 'SELECT * FROM (SELECT * FROM orders) AS _page WHERE "id" > :_page_after ORDER BY "id" LIMIT :_page_limit'
+        assert params == {"_page_limit": 11, "_page_after": 7}
+
+
+class TestExecutePage:
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT * FROM orders",
+        "SELECT * FROM orders ORDER BY total_amount",
+    ])
+    def test_pages_cover_all_rows(self, db_with_data, sql):
+        executor = QueryExecutor(db_with_data)
+        seen = []
+        state = None
+        for _ in range(3):
+            page = executor.execute_page(sql, page_size=2, state=state)
+            assert page["success"] == True
+            seen.extend(row["id"] for row in page["rows"])
+            state = page["next_page"]
+            if state is None:
+                break
+        
+        assert sorted(seen) == [1, 2, 3]
+        assert state is None
+
+    def test_keyset_page_skips_offset(self, db_with_data):
+        executor = QueryExecutor(db_with_data)
+        first = executor.execute_page("SELECT * FROM orders", page_size=2)
+        
+        assert first["pagination"] == "keyset"
+        assert first["next_page"]["after"] == 2
+
+
+class TestCursorStore:
+
+    def test_save_and_load(self):
+        store = CursorStore(ttl=60, max_entries=10)
+        cursor = store.save({"page": {"mode": "offset", "offset": 2}})
+        
+        assert store.load(cursor) == {"page": {"mode": "offset", "offset": 2}}
+        assert store.load("unknown") is None
@@ -0,0 +1,71 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.llm import prompt
+from app.llm.prompt import SchemaIndex, compact_schema, estimate_tokens, schema_context
+from app.llm.schema import DATABASE_SCHEMA
+
+
+class TestSchemaIndex:
+
+    def test_table_name_keeps_all_columns(self):
+        """Test that a question naming only a table gets all of its columns"""
+        selection = SchemaIndex(DATABASE_SCHEMA).select(["Show all customers"])
+
+        assert list(selection) == ["customers"]
+        assert selection["customers"] == ["id", "name", "email", "phone", "address"]
+
+    def test_columns_are_pruned(self):
+        """Test that matched columns are kept with the primary key"""
+        selection = SchemaIndex(DATABASE_SCHEMA).select(["Which orders were shipped last month?"])
+
+        assert dict(selection) == {"orders": ["id", "order_date", "status"]}
+
+    def test_synonyms_and_join_keys(self):
+        """Test that synonyms select tables and columns and foreign keys come along"""
+        selection = SchemaIndex(DATABASE_SCHEMA).select(["Total spent by each client"])
+
+        assert "customers" in selection
+        assert selection["orders"] == ["id", "customer_id", "total_amount"]
+
+    def test_unmatched_question_gets_full_schema(self):
+        """Test that a question matching nothing falls back to every table"""
+        selection = SchemaIndex(DATABASE_SCHEMA).select(["hello there"])
+
+        assert list(selection) == ["customers", "orders"]
+        assert len(selection["orders"]) == 6
+
+
+class TestCompactSchema:
+
+    def test_ddl_form(self):
+        """Test that the schema is rendered as DDL-like lines with references and value lists"""
+        text = compact_schema(DATABASE_SCHEMA)
+
+        assert "customers(id INTEGER, name STRING, email STRING, phone STRING, address STRING)" in text
+        assert "customer_id INTEGER REFERENCES customers(id)" in text
+        assert "-- orders.status: pending, processing, shipped, delivered" in text
+
+    def test_smaller_than_json(self):
+        """Test that the compact form costs far fewer tokens than the JSON schema"""
+        assert estimate_tokens(compact_schema(DATABASE_SCHEMA)) * 3 < estimate_tokens(json.dumps(DATABASE_SCHEMA))
+
+    @patch.object(settings, "PROMPT_SCHEMA_PRUNING", True)
+    def test_schema_context_records_savings(self):
+        """Test that the tokens saved per request are recorded"""
+        before = prompt.prompt_stats.stats()
+
+        text = schema_context(["Show customer emails"])
+
+        after = prompt.prompt_stats.stats()
+        assert text.startswith("customers(id INTEGER, email STRING)")
+        assert "orders" not in text
+        assert after["requests"] == before["requests"] + 1
+        assert after["tokens_saved"] > before["tokens_saved"]
+
+    @patch.object(settings, "PROMPT_SCHEMA_PRUNING", False)
+    def test_pruning_can_be_disabled(self):
+        """Test that the full compact schema is sent with pruning disabled"""
+        assert schema_context(["Show customer emails"]) == compact_schema(DATABASE_SCHEMA)
@@ -1,3 +1,4 @@
+import datetime
 import pytest
 from app.db.query import QueryExecutor
 
@@ -25,7 +26,8 @@ class TestQueryExecutor:
         # Assertions
         assert modified_sql == "SELECT * FROM customers WHERE id = :customer_id"
         assert "customer_id" in params_dict
-        assert params_dict["customer_id"] == 1.0  # Converted to float
+        assert params_dict["customer_id"] == 1  # Integral text is converted to int
+        assert isinstance(params_dict["customer_id"], int)
     
     def test_apply_parameters_with_date(self, db_session):
         """Test applying date parameters to SQL query"""
@@ -48,7 +50,7 @@ class TestQueryExecutor:
         # Assertions
         assert modified_sql == "SELECT * FROM orders WHERE order_date = :order_date"
         assert "order_date" in params_dict
-        assert params_dict["order_date"] == "2023-01-01"
+        assert params_dict["order_date"] == datetime.date(2023, 1, 1)
     
     def test_execute_query_select(self, db_with_data):
         """Test executing a SELECT query"""
@@ -112,3 +114,53 @@ class TestQueryExecutor:
         # Assertions
         assert result["success"] == False
         assert "error" in result
+    
+    def test_execute_query_columnar(self, db_with_data):
+        """Test the columnar result format"""
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_query("SELECT id, status FROM orders ORDER BY id", result_format="columns")
+        
+        assert result["success"] == True
+        assert result["columns"] == ["id", "status"]
+        assert result["data"] == {"id": [1, 2, 3], "status": ["delivered", "shipped", "pending"]}
+        assert result["row_count"] == 3
+        assert "rows" not in result
+    
+    def test_execute_speculative_row_cap(self, db_with_data):
+        """Test that speculative execution stops at the row cap"""
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_speculative("SELECT * FROM orders ORDER BY id", row_cap=2)
+        
+        assert result["success"] == True
+        assert result["row_count"] == 2
+        assert result["truncated"] == True
+        assert executor.execute_speculative("SELECT * FROM orders", row_cap=3)["truncated"] == False
+    
+    def test_execute_speculative_is_read_only(self, db_with_data):
+        """Test that speculative execution can't modify data"""
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_speculative(
+            "UPDATE customers SET name = :name WHERE id = 1",
+            [{"name": "name", "value": "Changed", "type": "string"}]
+        )
+        
+        assert result["success"] == False
+        verify_result = executor.execute_query("SELECT name FROM customers WHERE id = 1")
+        assert verify_result["rows"][0]["name"] == "Test Customer"
+    
+    def test_stream_query_batches(self, db_with_data):
+        """Test that streaming yields the columns, then rows in batches"""
+        executor = QueryExecutor(db_with_data)
+        
+        batches = list(executor.stream_query(
+            "SELECT id, status FROM orders WHERE total_amount > :min_amount ORDER BY id",
+            [{"name": "min_amount", "value": "0", "type": "number"}],
+            batch_size=2
+        ))
+        
+        assert batches[0] == {"columns": ["id", "status"]}
+        assert [len(batch["rows"]) for batch in batches[1:]] == [2, 1]
+        assert batches[1]["rows"][0] == [1, "delivered"]
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.api.routes.query import cancel_on_disconnect
+from app.db.limits import QueryBudget, QueryBudgetExceeded
+from app.db.query import QueryExecutor
+
+ENDLESS_QUERY = "WITH RECURSIVE counter(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM counter) SELECT COUNT(*) FROM counter"
+
+
+class TestQueryBudget:
+
+    def test_timeout_interrupts_query(self, db_with_data):
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_query(ENDLESS_QUERY, budget=QueryBudget(timeout=0.2))
+        
+        assert result["success"] == False
+        assert result["error_type"] == "timeout"
+        assert result["limit"] == 0.2
+        # The connection is usable again afterwards
+        assert executor.execute_query("SELECT COUNT(*) AS n FROM orders")["rows"][0]["n"] == 3
+
+    def test_row_cap(self, db_with_data):
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_query("SELECT * FROM orders", budget=QueryBudget(max_rows=2))
+        
+        assert result["error_type"] == "max_rows"
+        assert executor.execute_query("SELECT * FROM orders", budget=QueryBudget(max_rows=3))["row_count"] == 3
+
+    def test_byte_cap(self, db_with_data):
+        executor = QueryExecutor(db_with_data)
+        
+        result = executor.execute_query("SELECT name, email, address FROM customers", budget=QueryBudget(max_bytes=40))
+        
+        assert result["error_type"] == "max_bytes"
+
+    def test_cancel_from_another_thread(self, db_with_data):
+        executor = QueryExecutor(db_with_data)
+        budget = QueryBudget(timeout=10)
+        threading.Timer(0.1, budget.cancel).start()
+        
+        result = executor.execute_query(ENDLESS_QUERY, budget=budget)
+        
+        assert result["error_type"] == "cancelled"
+
+    def test_stream_timeout(self, db_with_data):
+        """Test that a streamed query is bounded by the budget's time limit"""
+        executor = QueryExecutor(db_with_data)
+        
+        with pytest.raises(QueryBudgetExceeded) as exc_info:
+            list(executor.stream_query(ENDLESS_QUERY, budget=QueryBudget(timeout=0.2)))
+        
+        assert exc_info.value.error_type == "timeout"
+        assert executor.execute_query("SELECT COUNT(*) AS n FROM orders")["rows"][0]["n"] == 3
+
+
+class TestCancelOnDisconnect:
+
+    def test_client_disconnect_cancels_budget(self):
+        class DisconnectedRequest:
+            async def is_disconnected(self):
+                return True
+
+        budget = QueryBudget()
+
+        async def query():
+            while not budget.cancelled:
+                await asyncio.sleep(0.01)
+            return {"success": False, "error_type": "cancelled"}
+
+        result = asyncio.run(cancel_on_disconnect(DisconnectedRequest(), budget, query()))
+        
+        assert budget.cancelled
+        assert result["error_type"] == "cancelled"
@@ -0,0 +1,107 @@
+import pytest
+
+from app.db.models import Customer
+from app.db.query import QueryExecutor
+from app.db.result_cache import ResultCache, make_result_key, written_tables
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResultCacheKeys:
+
+    def test_key_ignores_whitespace_and_keyword_case(self):
+        assert make_result_key("SELECT *  FROM orders WHERE id = :id", {"id": 1}) == \
+            make_result_key("select * from orders\nwhere id = :id;", {"id": 1})
+
+    def test_key_depends_on_parameters_and_format(self):
+        key = make_result_key("SELECT * FROM orders WHERE id = :id", {"id": 1})
+        assert key != make_result_key("SELECT * FROM orders WHERE id = :id", {"id": 2})
+        assert key != make_result_key("SELECT * FROM orders WHERE id = :id", {"id": 1}, "columns")
+
+    def test_writes_are_not_cacheable(self):
+        assert make_result_key("UPDATE orders SET status = :status", {"status": "x"}) is None
+
+    @pytest.mark.parametrize("statement,tables", [
+        ("SELECT * FROM orders", frozenset()),
+        ("INSERT INTO customers (name) VALUES (?)", frozenset({"customers"})),
+        ("UPDATE orders SET status=? WHERE orders.id = ?", frozenset({"orders"})),
+        ("DELETE FROM \"orders\" WHERE id = 1", frozenset({"orders"})),
+        ("DROP TABLE IF EXISTS customers", frozenset({"customers"})),
+        ("VACUUM", None),
+    ])
+    def test_written_tables(self, statement, tables):
+        assert written_tables(statement) == tables
+
+
+class TestResultCache:
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = ResultCache(ttl=10, max_bytes=10000, clock=clock)
+        cache.set("key", {"rows": [1]}, frozenset({"orders"}), cache.version({"orders"}))
+        
+        assert cache.get("key") == {"rows": [1]}
+        clock.now += 11
+        assert cache.get("key") is None
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        cache = ResultCache(ttl=60, max_bytes=60)
+        for key in ("a", "b", "c"):
+            cache.set(key, {"rows": [key * 10]}, frozenset({"orders"}), cache.version({"orders"}))
+            cache.get("a")
+        
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.stats()["bytes"] <= 60
+
+    def test_invalidate_by_table(self):
+        cache = ResultCache(ttl=60, max_bytes=10000)
+        cache.set("orders", {"rows": []}, frozenset({"orders"}), cache.version({"orders"}))
+        cache.set("customers", {"rows": []}, frozenset({"customers"}), cache.version({"customers"}))
+        
+        cache.invalidate({"orders"})
+        
+        assert cache.get("orders") is None
+        assert cache.get("customers") is not None
+
+    def test_results_read_before_a_write_are_not_stored(self):
+        cache = ResultCache(ttl=60, max_bytes=10000)
+        version = cache.version({"orders"})
+        cache.invalidate({"orders"})
+        cache.set("key", {"rows": []}, frozenset({"orders"}), version)
+        
+        assert cache.get("key") is None
+
+
+class TestExecutorResultCache:
+
+    def test_repeated_select_is_cached_until_a_write(self, db_with_data):
+        cache = ResultCache(ttl=60, max_bytes=100000)
+        executor = QueryExecutor(db_with_data, result_cache=cache)
+        
+        sql = "SELECT name FROM customers WHERE id = :id"
+        params = [{"name": "id", "value": "1", "type": "number"}]
+        first = executor.execute_query(sql, params)
+        assert executor.execute_query(sql, params) == first
+        assert cache.hits == 1
+        
+        executor.execute_query("UPDATE customers SET name = 'Changed' WHERE id = 1")
+        db_with_data.commit()
+        
+        assert executor.execute_query(sql, params)["rows"][0]["name"] == "Changed"
+
+    def test_orm_write_invalidates(self, db_with_data):
+        cache = ResultCache(ttl=60, max_bytes=100000)
+        executor = QueryExecutor(db_with_data, result_cache=cache)
+        
+        assert executor.execute_query("SELECT COUNT(*) AS n FROM customers")["rows"][0]["n"] == 2
+        db_with_data.add(Customer(id=3, name="New", email="new@example.com"))
+        db_with_data.commit()
+        
+        assert executor.execute_query("SELECT COUNT(*) AS n FROM customers")["rows"][0]["n"] == 3
@@ -0,0 +1,110 @@
+import datetime
+import os
+
+import pytest
+from sqlalchemy import text
+
+from app.db.base import create_database_engine
+from app.db.introspection import reflect_schema
+from app.db.result_cache import ResultCache
+from app.db.rollups import ROLLUP_TABLES, TRIGGER_DDL, drop_rollup_triggers, install_rollups_on
+from app.db.synthetic import bulk_load
+from app.llm.prompt import SchemaIndex
+
+TOTALS_SQL = {
+    "customer_order_totals": (
+        "SELECT customer_id, COUNT(*), ROUND(SUM(total_amount), 2) FROM orders GROUP BY customer_id ORDER BY 1",
+        "SELECT customer_id, order_count, ROUND(total_amount, 2) FROM customer_order_totals ORDER BY 1",
+    ),
+    "daily_order_status": (
+        "SELECT order_date, status, COUNT(*), ROUND(SUM(total_amount), 2) FROM orders "
+        "GROUP BY order_date, status ORDER BY 1, 2",
+        "SELECT order_date, status, order_count, ROUND(total_amount, 2) FROM daily_order_status ORDER BY 1, 2",
+    ),
+}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{os.path.join(tmp_path, 'rollups.db')}")
+    bulk_load(engine, 50, 1000, today=datetime.date(2024, 6, 30))
+    assert install_rollups_on(engine)
+    yield engine
+    engine.dispose()
+
+
+def assert_in_sync(engine):
+    with engine.connect() as connection:
+        for table, (expected, actual) in TOTALS_SQL.items():
+            assert connection.execute(text(expected)).all() == connection.execute(text(actual)).all(), table
+
+
+class TestRollups:
+
+    def test_rollups_match_orders(self, engine):
+        """Test that the installed rollups hold the same totals as aggregating orders"""
+        assert_in_sync(engine)
+
+    def test_triggers_follow_writes(self, engine):
+        """Test that inserts, updates and deletes on orders keep the rollups in sync"""
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO orders (customer_id, order_date, total_amount, status) "
+                "VALUES (1, '2030-01-01', 10.5, 'pending')"
+            ))
+            connection.execute(text("UPDATE orders SET status = 'shipped', total_amount = 12 WHERE id <= 20"))
+            connection.execute(text("UPDATE orders SET customer_id = 2 WHERE id BETWEEN 21 AND 40"))
+            connection.execute(text("DELETE FROM orders WHERE id BETWEEN 41 AND 60"))
+        assert_in_sync(engine)
+
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM orders WHERE order_date = '2030-01-01'"))
+            remaining = connection.execute(text(
+                "SELECT COUNT(*) FROM daily_order_status WHERE order_date = '2030-01-01'"
+            )).scalar()
+        # Emptied groups are removed rather than left at zero
+        assert remaining == 0
+        assert_in_sync(engine)
+
+    def test_bulk_load_rebuilds_installed_rollups(self, engine):
+        result = bulk_load(engine, 20, 300, replace=True)
+
+        assert result["orders"] == 300
+        with engine.connect() as connection:
+            triggers = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+        assert triggers == set(TRIGGER_DDL)
+        assert_in_sync(engine)
+
+    def test_missing_triggers_rebuild_rollups(self, engine):
+        """Test that writes made while the triggers were gone are picked up on install"""
+        with engine.begin() as connection:
+            assert drop_rollup_triggers(connection)
+            connection.execute(text("DELETE FROM orders WHERE customer_id = 1"))
+
+        assert install_rollups_on(engine)
+        assert_in_sync(engine)
+
+    def test_orders_writes_invalidate_rollup_results(self, engine):
+        cache = ResultCache(ttl=60, max_bytes=1024 * 1024)
+        version = cache.version(["customer_order_totals"])
+        cache.set("totals", {"success": True}, frozenset(["customer_order_totals"]), version)
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE orders SET total_amount = 1 WHERE id = 1"))
+
+        assert cache.get("totals") is None
+        assert cache.version(["customer_order_totals"]) != version
+
+
+class TestRollupSchema:
+
+    def test_reflected_with_descriptions(self, engine):
+        schema = reflect_schema(engine)
+
+        tables = {table["name"]: table for table in schema["tables"]}
+        assert set(ROLLUP_TABLES) <= set(tables)
+        assert "instead of aggregating orders" in tables["daily_order_status"]["description"]
+
+    def test_selected_for_aggregate_questions(self, engine):
+        index = SchemaIndex(reflect_schema(engine))
+
+        assert "daily_order_status" in index.select(["How many orders per status each day?"])
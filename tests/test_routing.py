@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.db.query import QueryExecutor
+from app.db.routing import EngineRouter, is_select
+
+READ_ONLY_URL = "sqlite:///file:./test.db?mode=ro&uri=true"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engines():
+    created = [create_engine(url) for url in ("sqlite://", READ_ONLY_URL, READ_ONLY_URL)]
+    yield created
+    for engine in created:
+        engine.dispose()
+
+
+class TestEngineRouter:
+
+    def test_round_robin(self, engines):
+        primary, first, second = engines
+        router = EngineRouter(primary, [first, second])
+        
+        assert [router.read_engine() for _ in range(4)] == [first, second, first, second]
+
+    def test_least_busy(self, engines):
+        primary, first, second = engines
+        router = EngineRouter(primary, [first, second], strategy="least_busy")
+        
+        with router.use(first):
+            assert router.read_engine() is second
+
+    def test_failed_engine_is_skipped_until_health_check(self, db_with_data, engines):
+        primary, first, _ = engines
+        clock = FakeClock()
+        router = EngineRouter(primary, [first], health_check_interval=10, clock=clock)
+        
+        router.mark_failed(first)
+        assert router.read_engine() is primary
+        
+        clock.now = 11
+        assert router.read_engine() is first
+
+    def test_is_select(self):
+        assert is_select("SELECT * FROM orders")
+        assert is_select("WITH t AS (SELECT 1) SELECT * FROM t")
+        assert not is_select("UPDATE orders SET status = 'x'")
+
+
+class TestQueryExecutorRouting:
+
+    def test_selects_go_to_read_engine(self, db_with_data, engines):
+        router = EngineRouter(db_with_data.get_bind(), [engines[1]])
+        executor = QueryExecutor(db_with_data, router=router)
+        
+        result = executor.execute_query("SELECT COUNT(*) AS n FROM orders")
+        assert result["rows"][0]["n"] == 3
+        assert router.stats()["read_engines"][0]["queries"] == 1
+        
+        update = executor.execute_query("UPDATE orders SET status = 'shipped' WHERE id = 3")
+        assert update["success"] == True
+        assert router.stats()["read_engines"][0]["queries"] == 1
+
+    def test_falls_back_to_primary_when_read_engine_fails(self, db_with_data):
+        broken = create_engine("sqlite:///file:./missing.db?mode=ro&uri=true")
+        router = EngineRouter(db_with_data.get_bind(), [broken])
+        executor = QueryExecutor(db_with_data, router=router)
+        
+        result = executor.execute_query("SELECT COUNT(*) AS n FROM orders")
+        
+        assert result["rows"][0]["n"] == 3
+        assert router.stats()["read_engines"][0]["healthy"] == False
+
+    def test_engine_in_flight_until_rows_are_fetched(self, db_with_data, engines):
+        """Test that a read engine counts as busy while its rows are still being returned"""
+        router = EngineRouter(db_with_data.get_bind(), [engines[1]], strategy="least_busy")
+        executor = QueryExecutor(db_with_data, router=router)
+        
+        batches = executor.stream_query("SELECT * FROM orders", batch_size=1)
+        next(batches)
+        assert router.stats()["read_engines"][0]["in_flight"] == 1
+        
+        list(batches)
+        assert router.stats()["read_engines"][0]["in_flight"] == 0
+        executor.execute_query("SELECT * FROM orders")
+        assert router.stats()["read_engines"][0]["in_flight"] == 0
@@ -0,0 +1,72 @@
+import pytest
+
+from app.llm.semantic_cache import SemanticCache, tokenize
+
+
+SAMPLE_RESPONSE = {
+    "sql_query": "SELECT * FROM customers",
+    "parameters": [],
+    "explanation": "Retrieves all customers"
+}
+
+
+class TestSemanticCache:
+
+    def test_tokenize_drops_filler_words(self):
+        """Test that paraphrases reduce to the same content words"""
+        assert tokenize("Show all customers") == tokenize("List every customer") == ["customer"]
+
+    def test_paraphrase_hit(self):
+        """Test that a paraphrased question reuses the cached SQL"""
+        cache = SemanticCache(threshold=0.9, max_entries=10, dim=256)
+        cache.set("show all customers", SAMPLE_RESPONSE, "gpt")
+
+        assert cache.get("List every customer", "gpt") == SAMPLE_RESPONSE
+        assert cache.stats()["hits"] == 1
+
+    def test_different_literals_miss(self):
+        """Test that questions differing only by a number don't match"""
+        cache = SemanticCache(threshold=0.9, max_entries=10, dim=256)
+        cache.set("orders over 100", SAMPLE_RESPONSE, "gpt")
+
+        assert cache.get("orders over 250", "gpt") is None
+        assert cache.get("orders greater than 100", "gpt") == SAMPLE_RESPONSE
+
+    def test_different_column_values_miss(self):
+        """Test that questions differing only by a value listed in the schema don't match"""
+        cache = SemanticCache(threshold=0.9, max_entries=10, dim=256)
+        cache.set("pending orders placed by customers living in springfield", SAMPLE_RESPONSE, "gpt")
+
+        assert cache.get("delivered orders placed by customers living in springfield", "gpt") is None
+        assert cache.get("Pending orders placed by customers living in Springfield", "gpt") == SAMPLE_RESPONSE
+
+    def test_unused_namespaces_are_forgotten(self):
+        """Test that namespaces without entries don't pile up"""
+        cache = SemanticCache(threshold=0.9, max_entries=2, dim=256)
+        for schema in range(10):
+            cache.set("show all customers", SAMPLE_RESPONSE, f"gpt:{schema}")
+
+        assert len(cache._namespace_ids) <= 3
+        assert cache.get("show all customers", "gpt:0") is None
+        assert cache.get("show all customers", "gpt:9") == SAMPLE_RESPONSE
+
+    def test_namespaces_are_isolated(self):
+        """Test that entries from another model/schema never match"""
+        cache = SemanticCache(threshold=0.9, max_entries=10, dim=256)
+        cache.set("show all customers", SAMPLE_RESPONSE, "gpt")
+
+        assert cache.get("show all customers", "mistral") is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is replaced when full"""
+        clock_values = iter(range(100))
+        cache = SemanticCache(threshold=0.9, max_entries=2, dim=256, clock=lambda: next(clock_values))
+        cache.set("show all customers", SAMPLE_RESPONSE)
+        cache.set("show all orders", SAMPLE_RESPONSE)
+        cache.get("customers")
+        cache.set("pending orders", SAMPLE_RESPONSE)
+
+        assert len(cache) == 2
+        assert cache.get("orders") is None
+        assert cache.get("customers") is not None
+        assert cache.stats()["evictions"] == 1
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight, ThreadSingleFlight
+from app.db.query import AsyncQueryExecutor, inflight_queries
+from app.llm.cache import InMemoryCache
+from app.llm.openai_client import AsyncLLMClient
+from tests.conftest import TEST_ASYNC_DATABASE_URL
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_call(self):
+        """Test that callers with the same key await one call"""
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        async def run():
+            results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+            # Finished calls aren't reused
+            await flight.do("key", fetch)
+            return results
+
+        results = asyncio.run(run())
+
+        assert results == [{"value": 42}] * 5
+        assert len(calls) == 2
+        assert flight.stats() == {"calls": 2, "shared": 4, "in_flight": 0}
+
+    def test_exceptions_reach_every_caller(self):
+        """Test that a failed call fails all callers sharing it"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_caller_keeps_shared_call(self):
+        """Test that cancelling the first caller doesn't cancel the call for the others"""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("key", fetch))
+            second = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == "done"
+
+    def test_threads_share_one_call(self):
+        """Test that threads with the same key wait for one call"""
+        flight = ThreadSingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(1)
+            return "value"
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", fetch))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while flight.stats()["shared"] < 3:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["value"] * 4
+        assert len(calls) == 1
+
+
+class TestCoalescing:
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch("app.llm.openai_client.AsyncOpenAI")
+    def test_identical_questions_share_llm_call(self, mock_openai_class):
+        """Test that simultaneous identical questions cost one LLM call"""
+        client = AsyncLLMClient(cache=InMemoryCache(ttl=60, max_entries=10))
+        calls = []
+
+        async def request_sql(query):
+            calls.append(query)
+            await asyncio.sleep(0.01)
+            return {"sql_query": "SELECT * FROM customers", "parameters": [], "explanation": "Customers"}
+
+        client._request_sql = request_sql
+
+        async def run():
+            return await asyncio.gather(*(
+                client.generate_sql(query) for query in ["Show customers", "show customers?", "Show customers"]
+            ))
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(result["sql_query"] == "SELECT * FROM customers" for result in results)
+        # Every caller gets its own copy
+        assert results[0] is not results[1]
+
+    def test_identical_queries_share_execution(self, db_with_data):
+        """Test that simultaneous identical SELECTs run once"""
+        engine = create_async_engine(TEST_ASYNC_DATABASE_URL, poolclass=NullPool)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        before = inflight_queries.stats()
+
+        async def execute():
+            async with session_factory() as db:
+                return await AsyncQueryExecutor(db).execute_query("SELECT * FROM customers")
+
+        async def run():
+            try:
+                return await asyncio.gather(execute(), execute(), execute())
+            finally:
+                await engine.dispose()
+
+        results = asyncio.run(run())
+        after = inflight_queries.stats()
+
+        assert all(result["success"] and result["row_count"] == 2 for result in results)
+        assert after["calls"] - before["calls"] == 1
+        assert after["shared"] - before["shared"] == 2
@@ -0,0 +1,103 @@
+import asyncio
+import os
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.base import _engine_options, create_async_database_engine, statement_cache_args
+from app.db.query import QueryExecutor
+from app.db.statement_cache import StatementCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class TestStatementCache:
+
+    def test_hits_reuse_compiled_statement(self):
+        """Test that the same SQL and parameter signature share one statement"""
+        cache = StatementCache(max_entries=10, clock=FakeClock())
+        parameters = [{"name": "id", "value": "1", "type": "number"}]
+
+        first = cache.get("SELECT * FROM customers WHERE id = :id", parameters)
+        second = cache.get("SELECT * FROM customers WHERE id = :id", [{"name": "id", "value": "2", "type": "number"}])
+
+        assert first is second
+        assert second.bind([{"name": "id", "value": "2", "type": "number"}]) == {"id": 2.0}
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["time_saved_ms"] > 0
+
+    def test_parameter_types_are_part_of_key(self):
+        """Test that a different coercion plan gets its own entry"""
+        cache = StatementCache(max_entries=10)
+
+        as_number = cache.get("SELECT :v", [{"name": "v", "value": "1", "type": "number"}])
+        as_string = cache.get("SELECT :v", [{"name": "v", "value": "1", "type": "string"}])
+
+        assert as_number is not as_string
+        assert as_string.bind([{"name": "v", "value": "1", "type": "string"}]) == {"v": "1"}
+
+    def test_lru_eviction(self):
+        """Test that the least recently used statement is evicted"""
+        cache = StatementCache(max_entries=2)
+        cache.get("SELECT 1")
+        cache.get("SELECT 2")
+        cache.get("SELECT 1")
+        cache.get("SELECT 3")
+
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+        cache.get("SELECT 1")
+        assert cache.stats()["hits"] == 2
+
+    def test_executor_uses_cache(self, db_with_data):
+        """Test that repeated executions are served from the statement cache"""
+        cache = StatementCache(max_entries=10)
+        executor = QueryExecutor(db_with_data, statement_cache=cache)
+        parameters = [{"name": "customer_id", "value": "1", "type": "number"}]
+
+        for _ in range(3):
+            result = executor.execute_query("SELECT * FROM customers WHERE id = :customer_id", parameters)
+            assert result["success"]
+
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 2
+
+
+class TestDriverStatementCache:
+
+    def test_driver_arguments(self):
+        """Test that each driver gets its prepared statement setting"""
+        assert statement_cache_args("sqlite") == {"cached_statements": settings.DB_STATEMENT_CACHE_SIZE}
+        assert statement_cache_args("postgresql+psycopg") == {"prepare_threshold": settings.PG_PREPARE_THRESHOLD}
+        assert statement_cache_args("postgresql") == {}
+        assert _engine_options("sqlite:///./app.db")["connect_args"]["cached_statements"] == settings.DB_STATEMENT_CACHE_SIZE
+
+    def test_asyncpg_cache_in_url(self):
+        """Test that asyncpg engines get SQLAlchemy's prepared statement cache size"""
+        try:
+            engine = create_async_database_engine("postgresql://user@localhost/db")
+        except ImportError:
+            return
+        assert engine.url.query["prepared_statement_cache_size"] == str(settings.DB_STATEMENT_CACHE_SIZE)
+
+    def test_async_sqlite_accepts_arguments(self, tmp_path):
+        """Test that aiosqlite passes the statement cache size through to sqlite3"""
+        engine = create_async_database_engine(f"sqlite:///{os.path.join(tmp_path, 'cache.db')}")
+
+        async def run():
+            try:
+                async with engine.connect() as connection:
+                    return (await connection.execute(text("SELECT 1"))).scalar()
+            finally:
+                await engine.dispose()
+
+        assert asyncio.run(run()) == 1
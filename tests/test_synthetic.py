@@ -0,0 +1,58 @@
+import datetime
+import os
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.db.base import create_database_engine
+from app.db.init_db import parse_count
+from app.db.synthetic import bulk_load, generate_orders
+
+TODAY = datetime.date(2024, 6, 30)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{os.path.join(tmp_path, 'bulk.db')}")
+    yield engine
+    engine.dispose()
+
+
+class TestSyntheticData:
+
+    def test_orders_are_dated_in_id_order(self):
+        """Test that order dates ascend, stay in range and are reproducible"""
+        rows = [row for batch in generate_orders(5000, 100, days=365, today=TODAY, batch_size=1000) for row in batch]
+
+        dates = [row[1] for row in rows]
+        assert dates == sorted(dates)
+        assert dates[0] >= (TODAY - datetime.timedelta(days=365)).isoformat() and dates[-1] <= TODAY.isoformat()
+        assert all(1 <= row[0] <= 100 for row in rows)
+        assert rows[:10] == next(generate_orders(5000, 100, days=365, today=TODAY, batch_size=1000))[:10]
+
+    def test_bulk_load(self, engine):
+        """Test that the loader fills the tables, rebuilds the indexes and skips a loaded database"""
+        result = bulk_load(engine, 200, 3000, today=TODAY, batch_size=500)
+
+        assert (result["customers"], result["orders"]) == (200, 3000)
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(DISTINCT email) FROM customers")).scalar() == 200
+            assert connection.execute(text("SELECT COUNT(*) FROM orders")).scalar() == 3000
+            statuses = {row[0] for row in connection.execute(text("SELECT DISTINCT status FROM orders"))}
+            # A few customers place many orders
+            busiest = connection.execute(text(
+                "SELECT COUNT(*) AS n FROM orders GROUP BY customer_id ORDER BY n DESC LIMIT 1"
+            )).scalar()
+        assert statuses <= {"pending", "processing", "shipped", "delivered"} and "delivered" in statuses
+        assert busiest > 3 * 3000 / 200
+        assert {index["name"] for index in inspect(engine).get_indexes("customers")} >= {"ix_customers_email"}
+
+        assert bulk_load(engine, 10, 10)["orders"] == 0
+        assert bulk_load(engine, 10, 20, replace=True)["orders"] == 20
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM customers")).scalar() == 10
+
+    def test_parse_count(self):
+        assert parse_count("10k") == 10_000
+        assert parse_count("1.5m") == 1_500_000
+        assert parse_count("42") == 42
@@ -0,0 +1,126 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from app.core.config import settings
+from app.llm.cache import InMemoryCache
+from app.llm.openai_client import LLMClient
+from app.llm.template_cache import TemplateCache, extract_literals, question_shape
+
+AMOUNT_RESPONSE = {
+    "sql_query": "SELECT * FROM orders WHERE total_amount > :amount AND status = :status",
+    "parameters": [
+        {"name": "amount", "value": "100", "type": "number"},
+        {"name": "status", "value": "shipped", "type": "string"}
+    ],
+    "explanation": "Shipped orders with a total over 100"
+}
+
+
+class TestLiteralExtraction:
+
+    def test_literals_and_shape(self):
+        """Test that numbers, dates, quoted strings and listed values become slots"""
+        question = "Orders by 'Bob Smith' over $1,200.50 since 2024-03-01 that are shipped"
+        slots = extract_literals(question, {"shipped": ("shipped", "orders.status")})
+
+        assert [(slot.kind, slot.value) for slot in slots] == [
+            ("string", "Bob Smith"),
+            ("number", "1200.50"),
+            ("date", "2024-03-01"),
+            ("value:orders.status", "shipped"),
+        ]
+        assert question_shape(question, slots) == (
+            "orders by <string> over <number> since <date> that are <value:orders.status>"
+        )
+
+    def test_apostrophes_are_not_quotes(self):
+        """Test that possessives don't start a quoted string"""
+        assert extract_literals("Show John's orders and Mary's") == []
+
+
+class TestTemplateCache:
+
+    def test_new_literals_are_bound(self):
+        """Test that a question differing only by literals reuses the SQL with new values"""
+        cache = TemplateCache(min_confidence=0.8, max_entries=10)
+        assert cache.learn("Shipped orders over $100", AMOUNT_RESPONSE, "gpt")
+
+        result = cache.get("pending orders over $250", "gpt")
+
+        assert result["sql_query"] == AMOUNT_RESPONSE["sql_query"]
+        assert result["parameters"] == [
+            {"name": "amount", "value": "250", "type": "number"},
+            {"name": "status", "value": "pending", "type": "string"}
+        ]
+        assert result["explanation"] == "pending orders with a total over 250"
+        assert cache.stats()["hits"] == 1
+
+    def test_like_pattern_keeps_wildcards(self):
+        """Test that a LIKE parameter built around a literal gets the new literal"""
+        cache = TemplateCache(min_confidence=0.8, max_entries=10)
+        cache.learn("Customers named 'Smith'", {
+            "sql_query": "SELECT * FROM customers WHERE name LIKE :name",
+            "parameters": [{"name": "name", "value": "%Smith%", "type": "string"}],
+            "explanation": "Customers whose name contains Smith"
+        }, "gpt")
+
+        assert cache.get("Customers named 'Jones'", "gpt")["parameters"][0]["value"] == "%Jones%"
+
+    def test_literal_in_sql_must_match(self):
+        """Test that a literal written into the SQL only matches the same value"""
+        cache = TemplateCache(min_confidence=0.8, max_entries=10)
+        cache.learn("Top 5 orders over 100", {
+            "sql_query": "SELECT * FROM orders WHERE total_amount > :amount ORDER BY total_amount DESC LIMIT 5",
+            "parameters": [{"name": "amount", "value": "100", "type": "number"}],
+            "explanation": "Five largest orders over 100"
+        }, "gpt")
+
+        assert cache.get("Top 10 orders over 100", "gpt") is None
+        assert cache.get("Top 5 orders over 300", "gpt")["parameters"][0]["value"] == "300"
+        assert cache.stats()["low_confidence"] == 1
+
+    def test_ambiguous_template_falls_back(self):
+        """Test that a parameter matching several literals isn't trusted"""
+        cache = TemplateCache(min_confidence=0.8, max_entries=10)
+        cache.learn("Orders between 100 and 100", {
+            "sql_query": "SELECT * FROM orders WHERE total_amount BETWEEN :low AND :high",
+            "parameters": [
+                {"name": "low", "value": "100", "type": "number"},
+                {"name": "high", "value": "100", "type": "number"}
+            ],
+            "explanation": "Orders of exactly 100"
+        }, "gpt")
+
+        assert cache.get("Orders between 100 and 500", "gpt") is None
+
+    def test_unsafe_sql_is_not_learned(self):
+        """Test that only SQL passing validation becomes a template"""
+        cache = TemplateCache(min_confidence=0.8, max_entries=10)
+
+        assert not cache.learn("Delete orders over 100", {
+            "sql_query": "DELETE FROM orders WHERE total_amount > :amount",
+            "parameters": [{"name": "amount", "value": "100", "type": "number"}],
+            "explanation": "Deletes orders"
+        }, "gpt")
+        assert len(cache) == 0
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch('app.llm.openai_client.OpenAI')
+    def test_client_skips_llm_call(self, mock_openai_class):
+        """Test that the LLM client answers a same-shape question without calling the LLM"""
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.tool_calls = [MagicMock()]
+        response.choices[0].message.tool_calls[0].function.arguments = json.dumps(AMOUNT_RESPONSE)
+        mock_openai_class.return_value.chat.completions.create.return_value = response
+        client = LLMClient(
+            cache=InMemoryCache(ttl=60, max_entries=10),
+            template_cache=TemplateCache(min_confidence=0.8, max_entries=10)
+        )
+
+        client.generate_sql("Shipped orders over $100")
+        result = client.generate_sql("Delivered orders over $75")
+
+        assert mock_openai_class.return_value.chat.completions.create.call_count == 1
+        assert [parameter["value"] for parameter in result["parameters"]] == ["75", "delivered"]
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.core.config import settings
+from app.llm.openai_client import LLMClient
+from app.llm.validator import SQLValidator, referenced_tables, validate_sql
+
+
+class TestSQLValidator:
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT * FROM customers LIMIT 5",
+        "SELECT * FROM customers WHERE id = :customer_id",
+        "SELECT c.name, SUM(o.total_amount) AS total_sales FROM customers c "
+        "JOIN orders o ON c.id = o.customer_id GROUP BY c.name ORDER BY total_sales DESC",
+        "SELECT * FROM orders WHERE order_date >= date('now', '-7 days')",
+        "SELECT * FROM customers WHERE name LIKE '%' || :name || '%'",
+        "SELECT t.cnt FROM (SELECT customer_id, COUNT(*) AS cnt FROM orders GROUP BY customer_id) AS t",
+        "WITH recent AS (SELECT * FROM orders) SELECT r.status FROM recent r;",
+    ])
+    def test_safe_queries(self, sql):
+        """Test that ordinary generated SELECTs pass"""
+        result = validate_sql(sql)
+        assert result["is_safe"] == True, result["analysis"]
+
+    @pytest.mark.parametrize("sql,issue", [
+        ("DELETE FROM customers", "Only SELECT"),
+        ("SELECT * FROM customers; DROP TABLE customers", "single statement"),
+        ("PRAGMA table_info(customers)", "PRAGMA"),
+        ("ATTACH DATABASE :path AS other", "ATTACH"),
+        ("SELECT * FROM customers WHERE id = '1'", "bound parameter"),
+        ("SELECT * FROM customers WHERE id = ?", "named parameters"),
+        ("SELECT * FROM users", "Unknown table users"),
+        ("SELECT password FROM customers", "Unknown column password"),
+        ("SELECT c.secret FROM customers c", "Unknown column c.secret"),
+        ("SELECT * FROM customers -- WHERE id = 1", "comments"),
+        ("SELECT m.name FROM (SELECT 1 AS x) AS secrets JOIN secrets AS m ON 1=1", "Unknown table secrets"),
+        ("SELECT m.sql FROM (SELECT 1) AS sqlite_master JOIN sqlite_master AS m", "Unknown table sqlite_master"),
+    ])
+    def test_unsafe_queries(self, sql, issue):
+        """Test that each rule rejects the query"""
+        result = validate_sql(sql)
+        assert result["is_safe"] == False
+        assert issue in result["analysis"]
+
+    def test_parameters_match_placeholders(self):
+        """Test that placeholders and bound parameters must agree"""
+        sql = "SELECT * FROM orders WHERE status = :status"
+
+        assert validate_sql(sql, [{"name": "status", "value": "pending", "type": "string"}])["is_safe"]
+        assert "Missing value for parameter :status" in validate_sql(sql, [])["analysis"]
+
+    def test_custom_schema(self):
+        """Test that the allowed tables come from the schema description"""
+        validator = SQLValidator({"tables": [{"name": "products", "columns": [{"name": "sku"}]}]})
+        assert validator.validate("SELECT sku FROM products")["is_safe"]
+        assert not validator.validate("SELECT * FROM customers")["is_safe"]
+
+    def test_referenced_tables(self):
+        """Test extraction of the tables a query reads"""
+        assert referenced_tables("SELECT * FROM customers c, orders o WHERE c.id = o.customer_id") == {"customers", "orders"}
+        assert referenced_tables("SELECT * FROM orders JOIN customers ON 1 = 1") == {"customers", "orders"}
+
+
+class TestLLMClientValidation:
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch("app.llm.openai_client.OpenAI")
+    def test_local_validation_skips_llm(self, mock_openai_class):
+        """Test that validation makes no LLM call by default"""
+        client = LLMClient()
+        result = client.validate_sql("SELECT * FROM customers")
+
+        assert result["is_safe"] == True
+        assert not mock_openai_class.return_value.chat.completions.create.called
+
+    @patch.object(settings, "USE_LOCAL_AI", False)
+    @patch.object(settings, "OPENAI_API_KEY", "sk-test")
+    @patch.object(settings, "SQL_VALIDATION_LLM_REVIEW", True)
+    @patch("app.llm.openai_client.OpenAI")
+    def test_llm_second_opinion(self, mock_openai_class):
+        """Test that the optional LLM review can still reject a query"""
+        response = MagicMock()
+        response.choices[0].message.content = "Possible SQL injection vulnerability."
+        mock_openai_class.return_value.chat.completions.create.return_value = response
+
+        client = LLMClient()
+        assert client.validate_sql("SELECT * FROM customers")["is_safe"] == False
+        assert client.validate_sql("DROP TABLE customers")["is_safe"] == False
+        assert mock_openai_class.return_value.chat.completions.create.call_count == 1